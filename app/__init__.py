@@ -1,7 +1,5 @@
 from flask import Flask
 from werkzeug.middleware.proxy_fix import ProxyFix
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload
 
 from config import Config, config_by_name, configure_logging
 from .context_processors import app_context_Processor
@@ -10,6 +8,7 @@ from .models import AppUser, UserRole, create_db_defaults
 from .utils.date_time import timezone
 from .utils.hooks import register_hooks
 from .utils.helpers.loggers import console_log
+from .utils.helpers.money import format_monetary_value
 from .extensions import db
 
 
@@ -34,6 +33,7 @@ def create_app(config_name=Config.ENV, create_defaults=True):
     
     app.config.from_object(config_by_name[config_name])
     app.context_processor(app_context_Processor)
+    app.add_template_filter(format_monetary_value, "money")  # {{ amount|money }}
     
     # Initialize Flask extensions
     initialize_extensions(app=app)
@@ -41,9 +41,8 @@ def create_app(config_name=Config.ENV, create_defaults=True):
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            stmt = select(AppUser).options(joinedload(AppUser.roles)).filter_by(id=int(user_id))
-            result = db.session.execute(stmt).unique()  # <-- call unique() here
-            return result.scalar_one_or_none()
+            # Roles are checked against the cached principal, not loaded here
+            return db.session.get(AppUser, int(user_id))
         except Exception as e:
             app.logger.error(f"Error loading user {user_id}: {e}")
             return None
@@ -59,6 +58,10 @@ def create_app(config_name=Config.ENV, create_defaults=True):
     from .blueprints import register_all_blueprints
     register_all_blueprints(app)
     
+    # Register CLI commands
+    from .commands import register_commands
+    register_commands(app)
+    
     # initialize database defaults values
     if create_defaults:
         create_db_defaults(app)
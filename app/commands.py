@@ -0,0 +1,108 @@
+"""
+CLI commands of the application (`flask <group> <command>`).
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import json
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+
+
+webhooks_cli = AppGroup("webhooks", help="Payment webhook inbox.")
+
+
+@webhooks_cli.command("process")
+@click.option("--limit", default=100, show_default=True, help="Maximum number of events to apply.")
+def process_webhooks(limit: int):
+    """Apply webhook events that are waiting or due for a retry."""
+    from .utils.payments.webhooks import process_due_webhook_events
+    
+    processed = process_due_webhook_events(limit)
+    click.echo(f"Processed {processed} webhook event(s).")
+
+
+@webhooks_cli.command("stats")
+def webhook_stats():
+    """Show the state of the webhook inbox."""
+    from .utils.payments.webhooks import get_webhook_metrics
+    
+    click.echo(json.dumps(get_webhook_metrics(), indent=2, default=str))
+
+
+payments_cli = AppGroup("payments", help="Gateway payments.")
+
+
+@payments_cli.command("reconcile")
+@click.option("--min-age", type=int, default=None, help="Only payments pending for at least this many minutes.")
+@click.option("--batch-size", type=int, default=None, help="Payments verified and committed together.")
+@click.option("--concurrency", type=int, default=None, help="Gateway calls in flight per provider (0: one at a time).")
+@click.option("--limit", type=int, default=None, help="Maximum number of payments to check.")
+def reconcile_payments(min_age: int, batch_size: int, concurrency: int, limit: int):
+    """Settle pending payments with the gateway's verdict."""
+    from .utils.payments.reconciliation import reconcile_pending_payments
+    
+    def show_progress(stats: dict):
+        click.echo(f"checked {stats['checked']}, settled {stats['settled']}, "
+                   f"still pending {stats['still_pending']}, errors {stats['errors']}")
+    
+    stats = reconcile_pending_payments(min_age, batch_size, concurrency, limit, progress=show_progress)
+    click.echo(json.dumps(stats, indent=2, default=str))
+
+
+@payments_cli.command("stats")
+def reconciliation_stats():
+    """Show the payments waiting to be reconciled."""
+    from .utils.payments.reconciliation import get_reconciliation_metrics
+    
+    click.echo(json.dumps(get_reconciliation_metrics(), indent=2, default=str))
+
+
+stats_cli = AppGroup("stats", help="Admin dashboard statistics.")
+
+
+@stats_cli.command("rebuild")
+def rebuild_dashboard_stats():
+    """Recompute the dashboard rollups from the source tables."""
+    from .extensions import db
+    from .utils.helpers.stats import rebuild_stats
+    
+    result = rebuild_stats()
+    db.session.commit()
+    click.echo(f"Rebuilt {result['daily_rows']} daily row(s) and {result['counters']} counter(s).")
+
+
+@stats_cli.command("fold")
+@click.option("--batch-size", type=int, default=None, help="Changes folded per transaction.")
+def fold_dashboard_stats(batch_size: int):
+    """Add the changes recorded since the last run to the rollups."""
+    from .utils.helpers.stats import FOLD_BATCH_SIZE, fold_stat_deltas
+    
+    folded = fold_stat_deltas(batch_size or FOLD_BATCH_SIZE)
+    click.echo(f"Folded {folded} change(s).")
+
+
+media_cli = AppGroup("media", help="Media uploads.")
+
+
+@media_cli.command("process")
+@click.option("--limit", default=100, show_default=True, help="Maximum number of uploads to process.")
+@click.option("--retry-failed", is_flag=True, help="Also retry uploads that failed.")
+def process_media_uploads(limit: int, retry_failed: bool):
+    """Store uploads left pending, e.g. by a restarted worker."""
+    from .utils.media import process_pending_media
+    
+    processed = process_pending_media(limit, retry_failed=retry_failed)
+    click.echo(f"Processed {processed} upload(s).")
+
+
+def register_commands(app: Flask) -> None:
+    app.cli.add_command(webhooks_cli)
+    app.cli.add_command(payments_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(media_cli)
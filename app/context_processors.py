@@ -4,7 +4,7 @@ from .utils.helpers.loggers import console_log
 from .utils.helpers.settings import get_all_general_settings
 from .utils.helpers.category import get_cached_categories
 from .utils.helpers.user import get_app_user_info
-from .utils.helpers.nav_menu import get_cached_menu_items, get_all_nav_menus
+from .utils.helpers.nav_menu import get_cached_menu_items, get_cached_nav_menus
 from .utils.helpers.money import format_monetary_value
 from .extensions import db
 
@@ -14,10 +14,10 @@ def app_context_Processor():
     current_user_info = get_app_user_info(user_id)
     general_settings = get_all_general_settings()
     
-    nav_menus = get_all_nav_menus()  # NavigationMenu objects
+    nav_menus = get_cached_nav_menus()  # NavigationMenu dicts
     
     # For backward compatibility, you extract a default menu:
-    default_menu = nav_menus[0].to_dict(include_items=True, items_children=True) if nav_menus else {}
+    default_menu = nav_menus[0] if nav_menus else {}
     
     return {
         'CURRENT_USER': current_user_info,
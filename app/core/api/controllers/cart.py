@@ -8,6 +8,7 @@ from ....extensions import db
 from ....models import Cart, CartItem
 from ....utils.helpers.cart import add_to_cart, get_cart_items, get_user_cart
 from ....utils.helpers.http_response import error_response, success_response
+from ....utils.helpers.pagination import KeysetPagination, InvalidCursorError
 from ....utils.helpers.loggers import console_log, log_exception
 
 class CartController:
@@ -57,10 +58,14 @@ class CartController:
                 'total_pages': pagination.pages,
                 'current_page': pagination.page,
                 'items_per_page': pagination.per_page,
-                "cart_items": pagination.items
+                "cart_items": [item.to_dict() for item in pagination.items]
             }
+            if isinstance(pagination, KeysetPagination):
+                extra_data.update(pagination.to_dict())
             
             api_response = success_response("Items fetched successfully", 200, extra_data)
+        except InvalidCursorError as e:
+            api_response = error_response(e.description, 400)
         except (DataError, DatabaseError) as e:
             log_exception('Database error occurred fetching cart items', e)
             api_response = error_response('Database Error.', 500)
@@ -8,11 +8,13 @@ from ....extensions import db
 from ....utils.helpers.user import get_current_user
 from ....utils.helpers.loggers import log_exception, console_log
 from ....utils.helpers.http_response import error_response, success_response
-from ....utils.helpers.settings import get_general_setting, get_active_payment_gateway, get_payment_method_setting
+from ....utils.helpers.settings import get_general_setting, get_payment_method_setting
+from ....utils.helpers.payments import fetch_user_payments, fetch_user_transactions
 from ....utils.payments.exceptions import SignatureError, TransactionMissingError
 from ....utils.payments.payment_manager import PaymentManager
+from ....utils.payments.webhooks import enqueue_webhook_event, dispatch_webhook_event
 from ....enums import PaymentMethods, PaymentType, PaymentStatus, PaymentMethodSettingKeys
-from ....models import Payment
+from ....models import Payment, Transaction
 
 class PaymentController:
     
@@ -22,7 +24,7 @@ class PaymentController:
             current_user = get_current_user()
             payment_manager: PaymentManager = PaymentManager()
             
-            active_payment_gateway = get_active_payment_gateway()
+            active_payment_gateway = payment_manager.payment_gateway
             if not active_payment_gateway:
                 return error_response("Payment gateway has not been set up.", 400)
             
@@ -68,7 +70,7 @@ class PaymentController:
             current_user = get_current_user()
             payment_manager: PaymentManager = PaymentManager()
             
-            active_payment_gateway = get_active_payment_gateway()
+            active_payment_gateway = payment_manager.payment_gateway
             if not active_payment_gateway:
                 return error_response("Payment gateway has not been set up.", 400)
             
@@ -115,15 +117,63 @@ class PaymentController:
         
         return api_response
     
+    @staticmethod
+    def get_payments():
+        """Get the current user's payments, with amounts in their currency."""
+        try:
+            current_user = get_current_user()
+            pagination = fetch_user_payments(current_user.id)
+            
+            extra_data = {
+                'total_items': pagination.total,
+                'total_pages': pagination.pages,
+                'current_page': pagination.page,
+                'items_per_page': pagination.per_page,
+                'payments': Payment.to_dict_many(pagination.items),
+            }
+            api_response = success_response("Payments fetched successfully", 200, extra_data)
+        except (DataError, DatabaseError) as e:
+            log_exception('Database error occurred fetching payments', e)
+            api_response = error_response('Database Error.', 500)
+        except Exception as e:
+            log_exception("An exception occurred fetching payments:", e)
+            api_response = error_response("An unexpected error occurred.", 500)
+        
+        return api_response
+    
+    @staticmethod
+    def get_transactions():
+        """Get the current user's transactions, with amounts in their currency."""
+        try:
+            current_user = get_current_user()
+            pagination = fetch_user_transactions(current_user.id)
+            
+            extra_data = {
+                'total_items': pagination.total,
+                'total_pages': pagination.pages,
+                'current_page': pagination.page,
+                'items_per_page': pagination.per_page,
+                'transactions': Transaction.to_dict_many(pagination.items),
+            }
+            api_response = success_response("Transactions fetched successfully", 200, extra_data)
+        except (DataError, DatabaseError) as e:
+            log_exception('Database error occurred fetching transactions', e)
+            api_response = error_response('Database Error.', 500)
+        except Exception as e:
+            log_exception("An exception occurred fetching transactions:", e)
+            api_response = error_response("An unexpected error occurred.", 500)
+        
+        return api_response
+    
     @staticmethod
     def handle_webhook():
         """
         Handle payment gateway webhooks.
 
-        Verifies webhook signature, processes payment status updates, and handles 
-        successful payments (wallet top-up, order payment, subscription activation).
-        
-        This method verifies the signature of the webhook request, checks if the event is a successful payment event, and if so, updates the database and records the payment in the database. If an error occurs at any point, it returns an error response with an appropriate status code and message.
+        Verifies webhook signature, stores the event in the webhook inbox and
+        acknowledges it at once. The event (payment status updates, wallet
+        top-up, order payment, subscription activation) is applied by the
+        webhook workers; events already received are acknowledged and dropped.
 
         Returns:
             tuple[Response, int]: Flask response and status code
@@ -133,7 +183,7 @@ class PaymentController:
             
             payload = request.get_json() # Get webhook data and headers
             
-            console_log("Webhook payload", payload)
+            console_log("Webhook payload", payload, level="DEBUG")
             
             processor = payment_manager.get_payment_processor()  # Get the payment processor for the selected gateway
             
@@ -146,9 +196,13 @@ class PaymentController:
             
             console_log("Parsed Webhook Data", webhook_data)
             
-            api_response = payment_manager.handle_gateway_webhook(webhook_data)
+            event_id = enqueue_webhook_event(payment_manager.payment_gateway["provider"], payload, webhook_data)
+            if event_id is None:
+                return success_response("Webhook already received", 200)
+            
+            dispatch_webhook_event(event_id)
             
-            console_log("api_response", api_response)
+            api_response = success_response("Webhook received", 200)
             
         except SignatureError as e:
             log_exception("Invalid webhook signature", e)
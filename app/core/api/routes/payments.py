@@ -28,6 +28,30 @@ def verify_payment():
     return PaymentController.verify_payment()
 
 
+@api_bp.route('/payments', methods=['GET'])
+@jwt_required()
+def get_payments():
+    """
+    Lists the current user's payments, newest first.
+
+    Returns:
+        json: A JSON object containing a page of payments.
+    """
+    return PaymentController.get_payments()
+
+
+@api_bp.route('/transactions', methods=['GET'])
+@jwt_required()
+def get_transactions():
+    """
+    Lists the current user's transactions, newest first.
+
+    Returns:
+        json: A JSON object containing a page of transactions.
+    """
+    return PaymentController.get_transactions()
+
+
 @api_bp.route('/payments/webhook', methods=['POST'])
 def handle_webhook():
     """
@@ -8,6 +8,7 @@ from ....extensions import db
 from ....models import Category
 from ....utils.helpers.category import fetch_all_categories, fetch_category, save_category
 from ....utils.helpers.http_response import error_response, success_response
+from ....utils.helpers.pagination import KeysetPagination, InvalidCursorError
 from ....utils.helpers.loggers import console_log, log_exception
 from ....utils.forms.web_admin.products import generate_category_field
 
@@ -31,9 +32,13 @@ class AdminCategoryController:
                 "current_page": pagination.page,
                 "total_pages": pagination.pages,
             }
+            if isinstance(pagination, KeysetPagination):
+                extra_data.update(pagination.to_dict())
             
             api_response = success_response("Categories fetched successfully", 200, extra_data)
             
+        except InvalidCursorError as e:
+            api_response = error_response(e.description, 400)
         except (DataError, DatabaseError) as e:
             log_exception('Database error occurred fetching categories', e)
             api_response = error_response('Database Error.', 500)
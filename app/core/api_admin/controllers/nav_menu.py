@@ -7,7 +7,7 @@ from config import Config
 from ....extensions import db
 from ....models import NavigationMenu, NavMenuItem, Category, Tag
 from ....utils.helpers.pages import get_predefined_pages
-from ....utils.helpers.nav_menu import get_nav_menu
+from ....utils.helpers.nav_menu import get_nav_menu, nav_menu_cache
 from ....utils.helpers.category import fetch_all_categories, fetch_category, save_category
 from ....utils.helpers.http_response import error_response, success_response
 from ....utils.helpers.loggers import console_log, log_exception
@@ -165,6 +165,8 @@ class NavMenuController:
                             current_item.parent_id = parent_item.id
             
                 db.session.commit()
+            
+            nav_menu_cache.invalidate()
                 
             return success_response("Navigation menu saved successfully", 200)
         except Exception as e:
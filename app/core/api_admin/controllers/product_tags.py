@@ -7,6 +7,7 @@ from ....extensions import db
 from ....models import Tag
 from ....utils.helpers.product_tags import fetch_all_tags, fetch_tag, get_tag_suggestions, save_tag, save_tags
 from ....utils.helpers.http_response import error_response, success_response
+from ....utils.helpers.pagination import KeysetPagination, InvalidCursorError
 from ....utils.helpers.loggers import console_log, log_exception
 
 class AdminTagController:
@@ -28,9 +29,13 @@ class AdminTagController:
                 "current_page": pagination.page,
                 "total_pages": pagination.pages,
             }
+            if isinstance(pagination, KeysetPagination):
+                extra_data.update(pagination.to_dict())
             
             api_response = success_response("Tags fetched successfully", 200, extra_data)
             
+        except InvalidCursorError as e:
+            api_response = error_response(e.description, 400)
         except (DataError, DatabaseError) as e:
             log_exception('Database error occurred fetching tags', e)
             api_response = error_response('Database Error.', 500)
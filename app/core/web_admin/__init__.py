@@ -10,5 +10,5 @@ from flask import Blueprint, render_template
 
 web_admin_bp: Blueprint = Blueprint('web_admin', __name__, url_prefix='/shop-admin')
 
-from .routes import home, auth, nav_menu, users, products, categories, tags, settings, orders
+from .routes import home, auth, nav_menu, users, products, categories, tags, settings, orders, diagnostics
 from .error_handlers import status_codes
\ No newline at end of file
@@ -6,4 +6,4 @@ License: GNU, see LICENSE for more details.
 Package: StoreZed
 """
 
-from . import home, auth, users, products, categories, tags, settings, nav_menu, orders
\ No newline at end of file
+from . import home, auth, users, products, categories, tags, settings, nav_menu, orders, diagnostics
\ No newline at end of file
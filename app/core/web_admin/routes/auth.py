@@ -36,7 +36,7 @@ def sign_up():
     
     if request.method == 'POST':
         if form.validate_on_submit():
-            console_log('Form', request.form)
+            console_log('Form', request.form, level="DEBUG")
             try:
                 username = form.username.data
                 email = form.email.data
@@ -11,6 +11,7 @@ from ....utils.forms.web_admin.categories import CategoryForm
 from ....utils.helpers.media import save_media
 from ....utils.helpers.basics import redirect_url, get_or_404
 from ....utils.helpers.loggers import console_log, log_exception
+from ....utils.helpers.user import get_principal
 from ....utils.helpers.category import fetch_all_categories, fetch_category, save_category
 from ....utils.decorators import session_roles_required, web_admin_login_required
 
@@ -23,18 +24,22 @@ def categories():
     search_term = request.args.get("search", "").strip()
     page_name = "categories"
     
-    current_user_roles = current_user.role_names
+    current_user_roles = get_principal(current_user.id).roles
     current_user_id = current_user.id
     
     pagination = fetch_all_categories(page_num=page_num, paginate=True, parent_only=False, search_term=search_term)
     
-    console_log('pagination', pagination.items)
+    console_log('pagination', pagination.items, level="DEBUG")
     
     # Extract paginated categories and pagination info
     all_categories = pagination.items
     total_pages = pagination.pages
     
-    return render_template('web_admin/pages/categories/categories.html', all_categories=all_categories, pagination=pagination, total_pages=total_pages, search_term=search_term, page_name=page_name)
+    # Thumbnails of the whole page from the cached tree, in at most one query
+    tree = Category.get_tree()
+    thumbnails = tree.get_thumbnails(node for node in map(tree.get, (category.id for category in all_categories)) if node)
+    
+    return render_template('web_admin/pages/categories/categories.html', all_categories=all_categories, pagination=pagination, total_pages=total_pages, thumbnails=thumbnails, search_term=search_term, page_name=page_name)
 
 
 @web_admin_bp.route("/categories/new", methods=['GET', 'POST'], strict_slashes=False)
@@ -0,0 +1,62 @@
+"""
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import os
+
+from flask import current_app, redirect, render_template, request, url_for, flash
+
+from ....utils.decorators.auth import session_roles_required
+from ....utils.instrumentation import request_histograms, get_slow_queries, clear_slow_queries as clear_slow_query_log
+from ....utils.helpers.http_response import error_response, success_response
+from ....utils.helpers.loggers import log_exception
+
+from .. import web_admin_bp
+
+
+@web_admin_bp.route("/diagnostics/metrics", methods=['GET'])
+@session_roles_required("Super Admin", "Admin")
+def request_metrics():
+    """
+    Latency, SQL and template histograms of this worker, per endpoint.
+    
+    Each gunicorn worker keeps its own histograms: the `pid` tells which
+    worker answered.
+    """
+    try:
+        metrics = request_histograms.to_dict()
+        endpoint = request.args.get("endpoint")
+        if endpoint:
+            metrics = {endpoint: metrics.get(endpoint, {})}
+        
+        api_response = success_response("Metrics fetched successfully", 200, {"pid": os.getpid(), "endpoints": metrics})
+    except Exception as e:
+        log_exception('An exception occurred fetching request metrics', e)
+        api_response = error_response("An unexpected error occurred.", 500)
+    
+    return api_response
+
+
+@web_admin_bp.route("/diagnostics/slow-queries", methods=['GET'])
+@session_roles_required("Super Admin", "Admin")
+def slow_queries():
+    """Slow queries recorded by the worker serving the page."""
+    return render_template(
+        'web_admin/pages/diagnostics/slow_queries.html',
+        slow_queries=get_slow_queries(),
+        threshold_ms=current_app.config.get("SLOW_QUERY_THRESHOLD_MS"),
+        buffer_size=current_app.config.get("SLOW_QUERY_BUFFER_SIZE"),
+        explain=current_app.config.get("SLOW_QUERY_EXPLAIN"),
+        pid=os.getpid(),
+    )
+
+
+@web_admin_bp.route("/diagnostics/slow-queries/clear", methods=['POST'])
+@session_roles_required("Super Admin", "Admin")
+def clear_slow_queries():
+    clear_slow_query_log()
+    flash("Slow query log cleared for this worker", "success")
+    return redirect(url_for('web_admin.slow_queries'))
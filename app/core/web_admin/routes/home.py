@@ -11,7 +11,8 @@ from flask_login import login_required, current_user
 
 from ....extensions import db
 from ....utils.decorators.auth import session_roles_required
-from ....utils.helpers.stats import get_stats_for_admin
+from ....utils.helpers.stats import get_stats_for_admin, get_stat_series
+from ....utils.helpers.http_response import error_response, success_response
 from ....utils.helpers.loggers import log_exception, console_log
 
 from .. import web_admin_bp
@@ -22,8 +23,8 @@ def dashboard():
     stats = {}
     try:
         stats = get_stats_for_admin()
-        console_log("stats", stats)
-        console_log("current_user from dashboard", current_user)
+        console_log("stats", stats, level="DEBUG")
+        console_log("current_user from dashboard", current_user, level="DEBUG")
     except Exception as e:
         log_exception('An exception occurred fetching admin stats', e)
         flash('An unexpected error occurred. Please try again later.', 'danger')
@@ -33,7 +34,27 @@ def dashboard():
 
 
 
+@web_admin_bp.route("/dashboard/stats/series", methods=['GET'])
+@session_roles_required("Super Admin", "Admin")
+def stats_series():
+    """Daily values of a metric, for the dashboard charts."""
+    try:
+        metric = request.args.get("metric", "payments")
+        days = min(request.args.get("days", 30, type=int), 366)
+        dimension = request.args.get("dimension") or None
+        
+        series = get_stat_series(metric, days, dimension)
+        api_response = success_response("Stats fetched successfully", 200, {"metric": metric, "series": series})
+    except ValueError as e:
+        api_response = error_response(str(e), 400)
+    except Exception as e:
+        log_exception('An exception occurred fetching stats series', e)
+        api_response = error_response("An unexpected error occurred.", 500)
+    
+    return api_response
+
+
 @web_admin_bp.route("/", methods=['GET'], strict_slashes=False)
 def index():
-    console_log("current_user from index", current_user)
+    console_log("current_user from index", current_user, level="DEBUG")
     return redirect(url_for('web_admin.dashboard'))
\ No newline at end of file
@@ -22,7 +22,7 @@ def nav_menus():
     categories = fetch_all_categories()
     tags = fetch_all_tags()
     
-    console_log("nav_menus", nav_menus)
+    console_log("nav_menus", nav_menus, level="DEBUG")
     
     return render_template('web_admin/pages/appearance/nav_menu/nav_menus.html', nav_menus=nav_menus, main_menu=main_menu, categories=categories, tags=tags)
 
@@ -22,8 +22,10 @@ def order_list():
     search_term = request.args.get('search', '').strip()
     
     
-    # Paginate the query and Extract paginated orders and pagination info
-    pagination = fetch_customer_orders(page_num=page_num, status_filter=status_filter, search_term=search_term)
+    # Paginate the query and Extract paginated orders and pagination info.
+    # Orders are paged by cursor (`?after=`/`?before=`) unless an explicit `?page=` is asked for
+    keyset = 'page' not in request.args
+    pagination = fetch_customer_orders(page_num=page_num, status_filter=status_filter, search_term=search_term, keyset=keyset, with_total=keyset)
     all_orders = pagination.items
     total_pages = pagination.pages
     
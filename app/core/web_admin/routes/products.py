@@ -17,6 +17,7 @@ from .. import web_admin_bp
 from ....extensions import db
 from ....utils.helpers.basics import redirect_url
 from ....utils.helpers.loggers import console_log, log_exception
+from ....utils.helpers.user import get_principal
 from ....utils.decorators import web_admin_login_required
 from ....utils.helpers.products import fetch_all_products, fetch_product, save_product
 
@@ -28,7 +29,7 @@ def products():
     page_num = request.args.get("page", 1, type=int)
     search_term = request.args.get("search", "").strip()
     
-    current_user_roles = current_user.role_names
+    current_user_roles = get_principal(current_user.id).roles
     current_user_id = current_user.id
     
     if 'trader' in current_user_roles:
@@ -36,7 +37,7 @@ def products():
     else:
         pagination = fetch_all_products(page_num=page_num, search_term=search_term)
         
-    console_log('pagination', pagination.items)
+    console_log('pagination', pagination.items, level="DEBUG")
     
     # Extract paginated products and pagination info
     all_products = pagination.items
@@ -64,7 +65,7 @@ def add_new_product():
     
     if request.method == 'POST':
         if form.validate_on_submit():
-            console_log('form', request.form)
+            console_log('form', request.form, level="DEBUG")
             try:
                 form_data = request.form
                 product = save_product(form_data)
@@ -106,7 +107,7 @@ def edit_product(slug):
     
     if request.method == 'POST':
         if form.validate_on_submit():
-            console_log('form', request.form)
+            console_log('form', request.form, level="DEBUG")
             try:
                 form_data = request.form
                 product = save_product(form_data)
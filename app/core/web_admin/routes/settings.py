@@ -25,7 +25,7 @@ def general_settings():
     
     # Fetch all settings in a single query
     settings = get_all_general_settings()
-    console_log("SETTINGS", settings)
+    console_log("SETTINGS", settings, level="DEBUG")
     
     form: GeneralSettingsForm = GeneralSettingsForm(
         # Pre-fill form with existing settings
@@ -9,6 +9,7 @@ from ....models import Tag
 from ....utils.forms.web_admin.tags import TagForm
 from ....utils.helpers.basics import redirect_url, get_or_404
 from ....utils.helpers.loggers import console_log, log_exception
+from ....utils.helpers.user import get_principal
 from ....utils.helpers.product_tags import fetch_all_tags, fetch_tag, save_tag
 from ....utils.decorators import session_roles_required, web_admin_login_required
 
@@ -21,12 +22,12 @@ def tags():
     search_term = request.args.get("search", "").strip()
     page_name = "tags"
     
-    current_user_roles = current_user.role_names
+    current_user_roles = get_principal(current_user.id).roles
     current_user_id = current_user.id
     
     pagination = fetch_all_tags(page_num=page_num, paginate=True, search_term=search_term)
     
-    console_log('pagination', pagination.items)
+    console_log('pagination', pagination.items, level="DEBUG")
     
     # Extract paginated tags and pagination info
     all_tags = pagination.items
@@ -9,7 +9,6 @@ Package: StoreZed
 from slugify import slugify
 from flask import request, render_template, flash, redirect, url_for
 from sqlalchemy.exc import ( IntegrityError, DataError, DatabaseError, InvalidRequestError, OperationalError )
-from sqlalchemy.orm import joinedload
 from werkzeug.security import generate_password_hash
 
 from .. import web_admin_bp
@@ -30,14 +29,14 @@ def users():
         page_num = request.args.get("page", 1, type=int)
         search_term = request.args.get("search", "").strip()
         
-        query = AppUser.query.options(joinedload(AppUser.roles).joinedload(UserRole.role), joinedload(AppUser.profile), joinedload(AppUser.address))
+        query = AppUser.query_for()  # what the user rows display, loaded for the whole page
         
         # Apply search filters
         query = AppUser.add_search_filters(query, search_term)
         
         pagination = query.paginate(page=page_num, per_page=10, error_out=False)
         
-        console_log('pagination', pagination.items)
+        console_log('pagination', pagination.items, level="DEBUG")
     
         # Extract paginated users and pagination info
         all_users = pagination.items
@@ -63,7 +62,7 @@ def add_new_user():
     
     if request.method == 'POST':
         if form.validate_on_submit():
-            console_log('form', request.form)
+            console_log('form', request.form, level="DEBUG")
             try:
                 current_user = get_current_user()
                 
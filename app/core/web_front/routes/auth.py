@@ -34,7 +34,7 @@ def sign_up():
     
     if request.method == 'POST':
         if form.validate_on_submit():
-            console_log('Form', request.form)
+            console_log('Form', request.form, level="DEBUG")
             try:
                 username = form.username.data
                 email = form.email.data
@@ -105,7 +105,7 @@ def login():
     
     if request.method == 'POST':
         if form.validate_on_submit():
-            console_log('Form', data=request.form)
+            console_log('Form', data=request.form, level="DEBUG")
             try:
                 email_username = form.email_username.data
                 pwd = form.pwd.data
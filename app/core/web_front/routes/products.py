@@ -27,7 +27,7 @@ def products():
     
     pagination = fetch_all_products(page_num=page_num, search_term=search_term)
     
-    console_log('pagination', pagination.items)
+    console_log('pagination', pagination.items, level="DEBUG")
     
     # Extract paginated products and pagination info
     all_products = pagination.items
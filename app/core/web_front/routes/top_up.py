@@ -13,7 +13,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from ....extensions import db
 from ....enums import PaymentMethods, PaymentMethodSettingKeys, PaymentType
 from ....utils.decorators.auth import login_required
-from ....utils.helpers.settings import get_active_payment_gateway, get_payment_method_setting
+from ....utils.helpers.settings import get_payment_method_setting
 from ....utils.helpers.loggers import log_exception, console_log
 from ....utils.forms import handle_form_errors
 from ....utils.forms.web_front.payments import TopUpForm
@@ -30,7 +30,7 @@ def top_up():
     
     payment_manager:PaymentManager = PaymentManager()
     
-    active_payment_gateway = get_active_payment_gateway()
+    active_payment_gateway = payment_manager.payment_gateway
     if not active_payment_gateway:
         flash("Payment gateway is not set up. Please contact admin.", "danger")
         return redirect(url_for("web_front.index"))
@@ -1,4 +1,4 @@
 from .auth import RoleNames
 from .orders import OrderStatus
-from .payments import PaymentMethods, PaymentStatus, PaymentType, TransactionType, PaymentGatewayName, TransferStatus
+from .payments import PaymentMethods, PaymentStatus, PaymentType, TransactionType, WalletEntryType, PaymentGatewayName, TransferStatus
 from .settings import GeneralSettingsKeys, PaymentMethodSettingKeys
\ No newline at end of file
@@ -58,6 +58,15 @@ class TransactionType(Enum):
     def __str__(self) -> str:
         return self.value  # Ensures usage as strings in queries
 
+class WalletEntryType(Enum):
+    """ENUMS for the entry_type field in WalletEntry Model"""
+    CREDIT = "credit"
+    DEBIT = "debit"
+    REFUND = "refund"
+    
+    def __str__(self) -> str:
+        return self.value
+
 class PaymentGatewayName(Enum):
     """ENUMS for the payment gateway"""
     BITPAY = "BitPay"
@@ -25,7 +25,7 @@ mail = Mail()
 db = SQLAlchemy()
 migration = Migrate()
 jwt_extended = JWTManager()
-app_cache = Cache(config={'CACHE_TYPE': 'simple'})
+app_cache = Cache() # backend is picked from the CACHE_* settings in Config
 login_manager = LoginManager()
 
 def initialize_extensions(app: Flask):
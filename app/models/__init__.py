@@ -14,17 +14,21 @@ from sqlalchemy.orm import aliased
 
 from .media import Media
 from .user import AppUser, Profile, Address, TempUser
-from .role import Role, UserRole,  user_roles
-from .wallet import Wallet
-from .category import Category
-from .product import Product, Tag, product_category, product_tag, ProductVariant
+from .role import Role, UserRole, PrincipalVersion,  user_roles
+from .wallet import Wallet, WalletEntry
+from .category import Category, CategoryClosure
+from .product import Product, Tag, product_category, product_tag, ProductVariant, SearchIndexVersion
 from .order import CustomerOrder, OrderItem
 from .cart import Cart, CartItem
 from .payment import Payment, Transaction
+from .webhook import WebhookEvent
+from .exchange_rate import ExchangeRateSnapshot
 from .subscription import Subscription, SubscriptionPlan
 from .nav_menu import NavigationMenu, NavMenuItem
-from .settings import GeneralSetting, PaymentMethodSettings
-from .defaults import create_default_super_admin, create_roles, initialize_settings, initialize_payment_method_settings, initialize_nav_menu
+from .settings import GeneralSetting, PaymentMethodSettings, SettingsVersion
+from .sequence import SequenceCounter
+from .stats import DailyStat, StatCounter, StatDelta
+from .defaults import create_default_super_admin, create_roles, initialize_settings, initialize_payment_method_settings, initialize_nav_menu, initialize_category_closure, initialize_order_numbers, initialize_stats
 
 
 def create_db_defaults(app: Flask) -> None:
@@ -33,4 +37,7 @@ def create_db_defaults(app: Flask) -> None:
         create_default_super_admin()
         initialize_nav_menu()
         initialize_settings()
-        initialize_payment_method_settings()
\ No newline at end of file
+        initialize_payment_method_settings()
+        initialize_category_closure()
+        initialize_order_numbers()
+        initialize_stats()
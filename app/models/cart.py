@@ -9,11 +9,18 @@ from ..utils.date_time import DateTimeUtils
 from ..enums import OrderStatus, PaymentStatus
 from .user import AppUser
 from .product import Product
+from .serialization import SerializableMixin
 
 
-class Cart(db.Model):
+class Cart(SerializableMixin, db.Model):
     __tablename__ = 'cart'
     
+    # Relationships read by `to_dict` (see `models.serialization`)
+    serialization_profiles = {
+        "default": ("items",),
+        "user": (("app_user", "default"),),
+    }
+    
     id = db.Column(db.Integer(), primary_key=True)
     user_id = db.Column(db.Integer(), db.ForeignKey('app_user.id'), nullable=False, index=True)
     
@@ -67,7 +74,7 @@ class Cart(db.Model):
         return data
 
 
-class CartItem(db.Model):
+class CartItem(SerializableMixin, db.Model):
     
     id = db.Column(db.Integer(), primary_key=True)
     cart_id = db.Column(db.Integer(), db.ForeignKey('cart.id'), nullable=False)
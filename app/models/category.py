@@ -5,14 +5,16 @@ Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
 License: GNU, see LICENSE for more details.
 Package: StoreZed
 """
-from sqlalchemy import inspect, or_
-from sqlalchemy.orm import backref
+from flask import has_app_context
+from sqlalchemy import inspect, or_, event
+from sqlalchemy.orm import backref, Session
 from sqlalchemy.orm import Query
 
 from ..extensions import db
 from .media import Media
 from .product import Product, product_category
 from ..utils.date_time import DateTimeUtils, datetime
+from ..utils.cache import invalidate_tags
 
 class Category(db.Model):
     __tablename__ = "category"
@@ -26,6 +28,7 @@ class Category(db.Model):
     media_id = db.Column(db.Integer, db.ForeignKey("media.id"), nullable=True)
     parent_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=True)
     children = db.relationship("Category", backref=backref("parent", remote_side=[id]), lazy=True)
+    media = db.relationship("Media", lazy="selectin")
     
         
     def __repr__(self):
@@ -61,9 +64,14 @@ class Category(db.Model):
         
         return category
     
+    @classmethod
+    def get_tree(cls):
+        """Returns the in-memory category tree (see `helpers.category_tree`)."""
+        from ..utils.helpers.category_tree import get_category_tree
+        return get_category_tree()
+    
     def get_thumbnail(self):
-        media: Media = Media.query.get(self.media_id)
-        return media.get_path() if media else None
+        return self.media.get_path() if self.media else None
     
     def insert(self):
         db.session.add(self)
@@ -91,6 +99,158 @@ class Category(db.Model):
             "parent_id": self.parent_id
             }
         if include_children:
-            data["children"] = [child.to_dict() for child in self.children]
+            # Children come from the cached tree instead of a lazy load per category
+            node = self.get_tree().get(self.id)
+            data["children"] = [child.to_dict() for child in node.children] if node else []
         return data
 
+
+class CategoryClosure(db.Model):
+    """
+    Closure table of the category tree.
+    
+    Holds one row per (ancestor, descendant) pair, including each category
+    paired with itself at depth 0, so every descendant of a category can be
+    found with a single indexed lookup instead of walking the tree.
+    
+    The table is kept up to date by a session listener as categories are
+    added, moved or deleted, it should never be written to directly.
+    """
+    __tablename__ = "category_closure"
+    
+    ancestor_id = db.Column(db.Integer, db.ForeignKey("category.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey("category.id", ondelete="CASCADE"), primary_key=True, index=True)
+    depth = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<CategoryClosure ancestor: {self.ancestor_id}, descendant: {self.descendant_id}, depth: {self.depth}>"
+    
+    @staticmethod
+    def build_rows(parent_map: dict[int, int | None]) -> list[dict[str, int]]:
+        """
+        Builds the closure rows for a tree given as {category_id: parent_id}.
+        """
+        rows = []
+        for category_id in parent_map:
+            ancestor_id, depth, seen = category_id, 0, set()
+            
+            # `seen` guards against a corrupted (cyclic) parent chain
+            while ancestor_id is not None and ancestor_id not in seen:
+                rows.append({"ancestor_id": ancestor_id, "descendant_id": category_id, "depth": depth})
+                seen.add(ancestor_id)
+                ancestor_id = parent_map.get(ancestor_id)
+                depth += 1
+        
+        return rows
+    
+    @classmethod
+    def rebuild(cls, connection) -> None:
+        """Recomputes the whole closure table from the category table."""
+        parent_map = {
+            row.id: row.parent_id
+            for row in connection.execute(db.select(Category.id, Category.parent_id))
+        }
+        
+        connection.execute(db.delete(cls))
+        rows = cls.build_rows(parent_map)
+        if rows:
+            connection.execute(db.insert(cls), rows)
+    
+    @classmethod
+    def attach(cls, connection, category_id: int, parent_id: int | None) -> None:
+        """
+        Links a category and its whole subtree to `parent_id` and its ancestors.
+        
+        The subtree must not be linked to any ancestor outside of itself yet
+        (a new category, or one just detached).
+        """
+        subtree = connection.execute(
+            db.select(cls.descendant_id, cls.depth).where(cls.ancestor_id == category_id)
+        ).all()
+        if not subtree:
+            connection.execute(db.insert(cls), [{"ancestor_id": category_id, "descendant_id": category_id, "depth": 0}])
+            subtree = [(category_id, 0)]
+        if parent_id is None or parent_id in {descendant_id for descendant_id, _ in subtree}:
+            return  # a root, or a cycle that would corrupt the table
+        
+        ancestors = connection.execute(
+            db.select(cls.ancestor_id, cls.depth).where(cls.descendant_id == parent_id)
+        ).all()
+        rows = [
+            {"ancestor_id": ancestor_id, "descendant_id": descendant_id, "depth": ancestor_depth + descendant_depth + 1}
+            for ancestor_id, ancestor_depth in ancestors
+            for descendant_id, descendant_depth in subtree
+        ]
+        if rows:
+            connection.execute(db.insert(cls), rows)
+    
+    @classmethod
+    def detach(cls, connection, category_id: int) -> None:
+        """Removes the links between a category's subtree and the ancestors above it."""
+        subtree_ids = connection.execute(
+            db.select(cls.descendant_id).where(cls.ancestor_id == category_id)
+        ).scalars().all()
+        if subtree_ids:
+            connection.execute(
+                db.delete(cls)
+                .where(cls.descendant_id.in_(subtree_ids))
+                .where(cls.ancestor_id.not_in(subtree_ids))
+            )
+    
+    @classmethod
+    def remove(cls, connection, category_ids: list[int]) -> None:
+        connection.execute(
+            db.delete(cls).where(or_(cls.ancestor_id.in_(category_ids), cls.descendant_id.in_(category_ids)))
+        )
+
+
+def _parent_changed(category: Category) -> bool:
+    attrs = inspect(category).attrs
+    return attrs.parent_id.history.has_changes() or attrs.parent.history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def sync_category_closure(session: Session, flush_context):
+    """
+    Keeps the closure table in step with the category table, in the same transaction.
+    
+    Only the rows of added, moved and deleted categories are touched, edits
+    of other columns only invalidate the category caches.
+    """
+    new = [instance for instance in session.new if isinstance(instance, Category)]
+    deleted = [instance for instance in session.deleted if isinstance(instance, Category)]
+    changed = [instance for instance in session.dirty if isinstance(instance, Category) and session.is_modified(instance)]
+    if not (new or deleted or changed):
+        return
+    
+    connection = session.connection()
+    
+    # Parents first, so a new category's ancestors are linked before its own
+    pending = {category.id: category for category in new}
+    while pending:
+        ready = [category for category in pending.values() if category.parent_id not in pending]
+        for category in ready or list(pending.values()):
+            CategoryClosure.attach(connection, category.id, category.parent_id)
+            pending.pop(category.id)
+    
+    for category in changed:
+        if _parent_changed(category):
+            CategoryClosure.detach(connection, category.id)
+            CategoryClosure.attach(connection, category.id, category.parent_id)
+    
+    if deleted:
+        CategoryClosure.remove(connection, [category.id for category in deleted])
+    
+    session.info["category_tree_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_category_caches(session: Session):
+    if session.info.pop("category_tree_changed", False) and has_app_context():
+        invalidate_tags("categories")
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_category_changes(session: Session):
+    session.info.pop("category_tree_changed", None)
+
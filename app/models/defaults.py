@@ -96,9 +96,10 @@ def initialize_settings():
     If a key does not exist, it is initialized with its default value (or an empty string).
     """
     
-    from ..utils.helpers.settings import get_default_setting
+    from ..utils.helpers.settings import get_default_setting, invalidate_settings_snapshot
     if inspect(db.engine).has_table("general_setting"):
         # Iterate over all Enum members of GeneralSettingsKeys
+        added = False
         for key in GeneralSettingsKeys:
             existing_setting = GeneralSetting.query.filter_by(key=str(key)).first()
             if not existing_setting:
@@ -107,6 +108,10 @@ def initialize_settings():
                     value=get_default_setting(key)
                 )
                 db.session.add(setting)
+                added = True
+        
+        if added and inspect(db.engine).has_table("settings_version"):
+            invalidate_settings_snapshot()
         
         db.session.commit()
 
@@ -116,9 +121,10 @@ def initialize_payment_method_settings():
     Ensures all predefined payment settings exist in the database.
     If a setting is missing, it is initialized with its default value.
     """
-    from ..utils.helpers.settings import get_default_payment_method_settings
+    from ..utils.helpers.settings import get_default_payment_method_settings, invalidate_settings_snapshot
     default_payment_method_settings = get_default_payment_method_settings()
     if inspect(db.engine).has_table("payment_method_settings"):
+        added = False
         for method, settings in default_payment_method_settings.items():
             for key, default_value in settings.items():
                 existing_setting = PaymentMethodSettings.query.filter_by(method=str(method), key=str(key)).first()
@@ -129,7 +135,51 @@ def initialize_payment_method_settings():
                         value=default_value
                     )
                     db.session.add(setting)
+                    added = True
+        
+        if added and inspect(db.engine).has_table("settings_version"):
+            invalidate_settings_snapshot()
+
+        db.session.commit()
+
+
+def initialize_category_closure() -> None:
+    """
+    Fills the category closure table for categories created before it existed.
+    """
+    from .category import Category, CategoryClosure
+    
+    if inspect(db.engine).has_table("category_closure"):
+        categories_count = db.session.query(Category.id).count()
+        self_rows_count = db.session.query(CategoryClosure.descendant_id).filter(CategoryClosure.depth == 0).count()
+        
+        if categories_count != self_rows_count:
+            console_log(data="Rebuilding category closure table")
+            CategoryClosure.rebuild(db.session.connection())
+            db.session.commit()
 
+
+def initialize_order_numbers() -> None:
+    """
+    Moves the native order number sequence past existing order numbers.
+    """
+    from ..utils.helpers.customer_orders import order_number_allocator
+    
+    if inspect(db.engine).has_table("customer_order"):
+        order_number_allocator.sync(db.session.connection())
+        db.session.commit()
+
+
+def initialize_stats() -> None:
+    """
+    Builds the dashboard rollups for data created before they existed.
+    """
+    from .stats import StatCounter
+    from ..utils.helpers.stats import rebuild_stats
+    
+    if inspect(db.engine).has_table("stat_counter") and not db.session.query(StatCounter.name).first():
+        console_log(data="Building dashboard statistics")
+        rebuild_stats()
         db.session.commit()
 
 
@@ -0,0 +1,26 @@
+"""
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from ..extensions import db
+from ..utils.date_time import DateTimeUtils
+
+
+class ExchangeRateSnapshot(db.Model):
+    """
+    Last good exchange rate table of a base currency.
+
+    Workers starting with an empty cache convert with it right away
+    instead of waiting for the rates API.
+    """
+    __tablename__ = "exchange_rate_snapshot"
+
+    base_currency = db.Column(db.String(3), primary_key=True)
+    rates = db.Column(db.JSON, nullable=False)  # {currency_code: rate}
+    fetched_at = db.Column(db.DateTime(timezone=True), nullable=False, default=DateTimeUtils.aware_utcnow)
+
+    def __repr__(self):
+        return f'<ExchangeRateSnapshot {self.base_currency} ({self.fetched_at})>'
@@ -1,20 +1,62 @@
+from threading import Lock
+from typing import Iterable, Optional
+
+from cachetools import TTLCache
+from flask import current_app, has_app_context
 from app.extensions import db
-from sqlalchemy.orm import backref
+from sqlalchemy import event
+from sqlalchemy.orm import backref, Session
 
 from ..utils.date_time import DateTimeUtils
 
 class Media(db.Model):
+    """
+    An uploaded image or video.
+
+    Uploads are staged on local disk and the row is created `pending`; the
+    media workers then store the file (and its resized variants) with the
+    configured storage backend and mark it `ready`, or `failed`.
+
+    Statuses:
+        pending: staged, waiting for a worker
+        processing: claimed by a worker (at `processing_started_at`)
+        ready: stored, `media_path` is set
+        failed: could not be stored, see `error`
+    """
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(128), nullable=False)
     media_path = db.Column(db.String(256), nullable=True) # False
     date_created = db.Column(db.DateTime(timezone=True), default=DateTimeUtils.aware_utcnow)
 
+    status = db.Column(db.String(20), nullable=False, default=READY)
+    resource_type = db.Column(db.String(10), nullable=True)  # image or video
+    storage = db.Column(db.String(20), nullable=True)  # backend holding the file
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # sha256 of the uploaded bytes
+    size = db.Column(db.Integer, nullable=True)
+    variants = db.Column(db.JSON, nullable=True)  # variant name -> URL
+    staging_path = db.Column(db.String(512), nullable=True)
+    processing_started_at = db.Column(db.DateTime(timezone=True), nullable=True)  # when a worker claimed it
+    error = db.Column(db.Text, nullable=True)
+
     def __repr__(self) -> str:
         return f"<Media {self.id}, Filename: {self.filename}>"
     
+    @property
+    def is_ready(self) -> bool:
+        return self.status == self.READY
+    
     def get_path(self) -> str:
         return self.media_path
     
+    def get_variant(self, name: str) -> str:
+        """URL of a resized variant ("thumbnail", "medium"...), or of the original if there is none."""
+        return (self.variants or {}).get(name) or self.media_path
+    
     def update(self, commit=True, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
@@ -33,5 +75,77 @@ class Media(db.Model):
             'id': self.id,
             'filename': self.filename,
             'media_path': self.media_path,
+            'status': self.status,
+            'variants': self.variants or {},
             'created_at': self.date_created,
-        }
\ No newline at end of file
+        }
+
+
+# URLs of ready media by id, per worker, least recently used dropped first.
+# Media of this process are evicted when changed; the TTL bounds how long a
+# change made by another worker can go unseen. Sized from the app config
+# (MEDIA_URL_CACHE_SIZE, MEDIA_URL_CACHE_TTL) when first used.
+_media_urls: Optional[TTLCache] = None
+_media_urls_lock = Lock()
+
+
+def _url_cache() -> TTLCache:
+    """Returns the media URL cache, creating it on first use. Call with the lock held."""
+    global _media_urls
+    if _media_urls is None:
+        config = current_app.config if has_app_context() else {}
+        _media_urls = TTLCache(maxsize=config.get("MEDIA_URL_CACHE_SIZE", 4096), ttl=config.get("MEDIA_URL_CACHE_TTL", 3600))
+    return _media_urls
+
+
+def resolve_media_urls(media_ids: Iterable[Optional[int]]) -> dict[int, Optional[str]]:
+    """
+    Returns the URLs of many media, e.g. of a page of products, with one
+    query for the ones not cached.
+
+    Returns:
+        dict: Media ID -> URL, None for missing or not yet ready media
+    """
+    media_ids = {media_id for media_id in media_ids if media_id}
+    urls: dict[int, Optional[str]] = {}
+
+    with _media_urls_lock:
+        cache = _url_cache()
+        for media_id in media_ids:
+            url = cache.get(media_id)
+            if url is not None:
+                urls[media_id] = url
+
+    missing = media_ids - urls.keys()
+    if missing:
+        rows = db.session.execute(
+            db.select(Media.id, Media.media_path, Media.status).where(Media.id.in_(missing))
+        ).all()
+        with _media_urls_lock:
+            cache = _url_cache()
+            for media_id, media_path, status in rows:
+                urls[media_id] = media_path
+                if media_path and status == Media.READY:
+                    cache[media_id] = media_path
+
+    return {media_id: urls.get(media_id) for media_id in media_ids}
+
+
+def get_media_url(media_id: Optional[int]) -> Optional[str]:
+    return resolve_media_urls([media_id]).get(media_id) if media_id else None
+
+
+def clear_media_url_cache() -> None:
+    """Empties the cache; it is sized again from the app config on next use."""
+    global _media_urls
+    with _media_urls_lock:
+        _media_urls = None
+
+
+@event.listens_for(Session, "after_flush")
+def evict_changed_media_urls(session: Session, flush_context):
+    changed = [instance.id for instance in (*session.dirty, *session.deleted) if isinstance(instance, Media)]
+    if changed:
+        with _media_urls_lock:
+            for media_id in changed if _media_urls is not None else ():
+                _media_urls.pop(media_id, None)
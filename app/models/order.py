@@ -1,15 +1,22 @@
 from decimal import Decimal
 from typing import Optional
-from sqlalchemy import or_
-from sqlalchemy.orm import Query
+from sqlalchemy import or_, func, inspect
+from sqlalchemy.orm import Query, Session
 from sqlalchemy import event, Index, CheckConstraint
 
+from config import Config
 from ..extensions import db
 from ..utils.date_time import DateTimeUtils
 from ..enums import OrderStatus, PaymentStatus
 from .user import AppUser
+from .serialization import SerializableMixin
 
-class CustomerOrder(db.Model):
+# Native order number sequence, only created on databases that support
+# sequences (the `sequence_counter` table is used elsewhere)
+order_number_seq = db.Sequence("order_number_seq", metadata=db.metadata, cache=Config.ORDER_NUMBER_BLOCK_SIZE)
+
+
+class CustomerOrder(SerializableMixin, db.Model):
     """
     Model representing a customer order with enhanced features.
     
@@ -23,6 +30,13 @@ class CustomerOrder(db.Model):
         meta_info: Additional order data
     """
     __tablename__ = "customer_order"
+    
+    # Relationships read by `to_dict` (see `models.serialization`)
+    serialization_profiles = {
+        "default": ("items", "payment"),
+        "items": (("items", "default"),),
+        "user": (("app_user", "default"),),
+    }
 
     id = db.Column(db.Integer(), primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -52,15 +66,10 @@ class CustomerOrder(db.Model):
     
     __table_args__ = (
         Index('ix_order_user_status', 'user_id', 'status'),
+        Index('ix_order_created_at_id', 'created_at', 'id'),  # keyset pagination
         CheckConstraint('total_amount >= 0', name='check_total_amount_positive'),
     )
 
-    def __init__(self, *args, **kwargs) -> None:
-        from ..utils.helpers.customer_orders import generate_customer_order_number
-        
-        super().__init__(*args, **kwargs)
-        self.order_number = generate_customer_order_number()
-    
     def __repr__(self):
         return f"<CustomerOrder {self.order_number} ({self.status})>"
     
@@ -73,11 +82,15 @@ class CustomerOrder(db.Model):
             db.session.commit()
     
     def recalculate_total(self):
-        """Recalculate total from order items"""
+        """
+        Recalculate total from order items, without committing.
+        
+        Totals of orders whose items are added, changed or removed through
+        the session are kept up to date on flush (see `update_order_totals`).
+        """
         self.total_amount = sum(
-            Decimal(item.subtotal) for item in self.items
+            (Decimal(item.subtotal) for item in self.items), Decimal(0)
         )
-        db.session.commit()
 
     @staticmethod
     def add_search_filters(query: Query, search_term: str) -> Query:
@@ -155,7 +168,7 @@ class CustomerOrder(db.Model):
         return data
 
 
-class OrderItem(db.Model):
+class OrderItem(SerializableMixin, db.Model):
     """
     Model representing individual items within a customer order.
     
@@ -167,6 +180,10 @@ class OrderItem(db.Model):
         meta_info: Additional item data (e.g., selected options)
     """
     __tablename__ = "order_item"
+    
+    serialization_profiles = {
+        "default": ("product",),
+    }
 
     id = db.Column(db.Integer(), primary_key=True)
     
@@ -212,14 +229,58 @@ class OrderItem(db.Model):
         }
 
 
-# Add event listener to update order total when items change
-@event.listens_for(OrderItem, 'after_insert')
-@event.listens_for(OrderItem, 'after_update')
-@event.listens_for(OrderItem, 'after_delete')
-def update_order_total(mapper, connection, target):
-    """Automatically update customer order total when items change"""
-    customer_order = target.customer_order
-    customer_order.recalculate_total()
+@event.listens_for(CustomerOrder, 'before_insert')
+def assign_order_number(mapper, connection, target: CustomerOrder):
+    """Allocates the order number in the transaction inserting the order."""
+    from ..utils.helpers.customer_orders import generate_customer_order_number
     
-    db.session.add(customer_order)
-    db.session.commit()
\ No newline at end of file
+    if not target.order_number:
+        target.order_number = generate_customer_order_number(connection)
+
+
+def _touched_order_ids(session: Session) -> set[int]:
+    """Ids of the orders whose items were added, changed or removed in this flush."""
+    order_ids = set()
+    
+    for instance in (*session.new, *session.deleted):
+        if isinstance(instance, OrderItem):
+            order_ids.add(instance.order_id)
+    
+    for instance in session.dirty:
+        if isinstance(instance, OrderItem) and session.is_modified(instance):
+            history = inspect(instance).attrs.order_id.history
+            order_ids.update(history.deleted)  # an item moved to another order
+            order_ids.add(instance.order_id)
+    
+    order_ids.discard(None)
+    return order_ids
+
+
+# Keep order totals in step with their items: one UPDATE per flush for
+# every touched order, however many items changed
+@event.listens_for(Session, "after_flush")
+def update_order_totals(session: Session, flush_context):
+    order_ids = _touched_order_ids(session)
+    if not order_ids:
+        return
+    
+    items_total = (
+        db.select(func.coalesce(func.sum(OrderItem.unit_price * OrderItem.quantity), 0))
+        .where(OrderItem.order_id == CustomerOrder.id)
+        .scalar_subquery()
+    )
+    session.connection().execute(
+        db.update(CustomerOrder.__table__)
+        .where(CustomerOrder.__table__.c.id.in_(order_ids))
+        .values(total_amount=items_total)
+    )
+    session.info.setdefault("updated_order_totals", set()).update(order_ids)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def expire_order_totals(session: Session, flush_context):
+    """Reloads the recomputed totals the next time they are read."""
+    for order_id in session.info.pop("updated_order_totals", ()):
+        order = session.identity_map.get(inspect(CustomerOrder).identity_key_from_primary_key((order_id,)))
+        if order is not None:
+            session.expire(order, ["total_amount", "updated_at"])
\ No newline at end of file
@@ -4,16 +4,41 @@ from sqlalchemy.orm import Query
 from ..extensions import db
 from ..utils.helpers.basics import generate_random_string
 from ..utils.date_time import DateTimeUtils
-from ..utils.payments.rates import convert_amount
+from .serialization import SerializableMixin
+from ..utils.payments.rates import convert_amount, convert_many
 from ..enums.payments import PaymentStatus, TransactionType
 
-class Payment(db.Model):
+
+def convert_record_amounts(records: list) -> list[str]:
+    """
+    Converts the amounts of payments or transactions to their users'
+    currencies, with one rate lookup per currency.
+    """
+    by_currency: dict[str, list[int]] = {}
+    for index, record in enumerate(records):
+        by_currency.setdefault(record.currency_code, []).append(index)
+    
+    amounts = [None] * len(records)
+    for currency_code, indexes in by_currency.items():
+        converted = convert_many([records[index].amount for index in indexes], currency_code)
+        for index, amount in zip(indexes, converted):
+            amounts[index] = amount
+    return amounts
+
+
+class Payment(SerializableMixin, db.Model):
     """
     Model to represent a payment request made by a user in Trendit³.
     This model captures details about a payment request before it is processed.
     """
     __tablename__ = "payment"
-
+    
+    # Relationships read by `to_dict` (see `models.serialization`)
+    serialization_profiles = {
+        "default": ("app_user.wallet",),  # currency_code
+        "user": (("app_user", "default"),),
+    }
+    
     id = db.Column(db.Integer(), primary_key=True)
     key = db.Column(db.String(80), unique=True, nullable=False) # Unique identifier for the payments
     amount = db.Column(db.Numeric(14, 2), nullable=False)
@@ -40,6 +65,10 @@ class Payment(db.Model):
     subscription_id = db.Column(db.Integer(), db.ForeignKey('subscription.id'), nullable=True)
     subscription = db.relationship('Subscription', back_populates='payment')
     
+    __table_args__ = (
+        db.Index('ix_payment_status_id', 'status', 'id'),  # pending payments sweep
+    )
+    
     def __repr__(self):
         return f'<ID: {self.id}, Amount: {self.amount}, Payment Method: {self.payment_method}>'
     
@@ -74,12 +103,12 @@ class Payment(db.Model):
         if commit:
             db.session.commit()
     
-    def to_dict(self, user=False):
+    def to_dict(self, user=False, amount=None):
         user_info = {'user': self.app_user.to_dict()} if user else {'user_id': self.user_id} # optionally include user info in dict
         return {
             'id': self.id,
             'key': self.key,
-            'amount': convert_amount(self.amount, self.currency_code),
+            'amount': amount if amount is not None else convert_amount(self.amount, self.currency_code),
             'narration': self.narration,
             'payment_method': self.payment_method,
             'status': self.status,
@@ -87,13 +116,25 @@ class Payment(db.Model):
             **user_info,
         }
 
+    @classmethod
+    def to_dict_many(cls, records: list, user=False) -> list[dict]:
+        """Serializes a list of records, converting their amounts in bulk."""
+        cls.load_profiles(records, *(("user",) if user else ()))
+        return [record.to_dict(user, amount) for record, amount in zip(records, convert_record_amounts(records))]
+
 
-class Transaction(db.Model):
+class Transaction(SerializableMixin, db.Model):
     """
     Model to represent a financial transaction associated with a payment on the platform.
     This model captures details about the financial aspect of a payment or withdrawal.
     """
     
+    # Relationships read by `to_dict` (see `models.serialization`)
+    serialization_profiles = {
+        "default": ("app_user.wallet",),  # currency_code
+        "user": (("app_user", "default"),),
+    }
+    
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(80), unique=True, nullable=False) # Unique identifier for the financial transaction
     amount = db.Column(db.Numeric(14, 2), nullable=False)
@@ -145,13 +186,13 @@ class Transaction(db.Model):
         if commit:
             db.session.commit()
     
-    def to_dict(self, user=False):
+    def to_dict(self, user=False, amount=None):
         user_info = {'user': self.app_user.to_dict(),} if user else {'user_id': self.user_id} # optionally include user info in dict
         return {
             'id': self.id,
             'key': self.key,
-            'amount': convert_amount(self.amount, self.currency_code),
-            'transaction_type': str(self.transaction_type.value),
+            'amount': amount if amount is not None else convert_amount(self.amount, self.currency_code),
+            'transaction_type': self.transaction_type,
             'narration': self.narration,
             'status': self.status,
             'created_at': self.created_at,
@@ -159,3 +200,9 @@ class Transaction(db.Model):
             **user_info,
         }
 
+    @classmethod
+    def to_dict_many(cls, records: list, user=False) -> list[dict]:
+        """Serializes a list of records, converting their amounts in bulk."""
+        cls.load_profiles(records, *(("user",) if user else ()))
+        return [record.to_dict(user, amount) for record, amount in zip(records, convert_record_amounts(records))]
+
@@ -1,6 +1,7 @@
 import uuid
 from flask import request
-from sqlalchemy import inspect, or_
+from sqlalchemy import Connection, inspect, or_, func, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.orm import backref
 from sqlalchemy.orm import Query
 
@@ -13,7 +14,8 @@ from ..utils.date_time import DateTimeUtils, datetime
 # association table for the many-to-many relationship between products and categories
 product_category = db.Table("product_category",
     db.Column("product_id", db.Integer, db.ForeignKey("product.id"), primary_key=True),
-    db.Column("category_id", db.Integer, db.ForeignKey("category.id"), primary_key=True)
+    db.Column("category_id", db.Integer, db.ForeignKey("category.id"), primary_key=True),
+    db.Index("ix_product_category_category_id", "category_id")
 )
 
 # association table for the many-to-many relationship between products and tags
@@ -42,6 +44,7 @@ class Product(db.Model):
     media_id = db.Column(db.Integer, db.ForeignKey("media.id"), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey("app_user.id"), nullable=False)
     
+    media = db.relationship("Media", lazy="selectin")  # loaded for a whole page of products in one query
     app_user = db.relationship("AppUser", backref=db.backref("products", lazy="dynamic"))
     tags = db.relationship("Tag", secondary=product_tag, backref=db.backref("products", lazy="dynamic"))
     categories = db.relationship("Category", secondary=product_category, backref=db.backref("products", lazy="dynamic"))
@@ -54,17 +57,12 @@ class Product(db.Model):
     @staticmethod
     def add_search_filters(query: Query, search_term: str) -> Query:
         """
-        Adds search filters to a SQLAlchemy query.
+        Adds relevance-ranked search filters to a SQLAlchemy query.
+        
+        Matching is done by the configured search backend (see `utils.search`).
         """
-        if search_term:
-            search_term = f"%{search_term}%"
-            query = query.filter(
-                    or_(
-                        Product.name.ilike(search_term),
-                        Product.slug.ilike(search_term),
-                    )
-                )
-        return query
+        from ..utils.search import search_products
+        return search_products(query, search_term)
     
     @classmethod
     def create_product(cls, uuid, name, slug, user_id, commit=True, **kwargs):
@@ -115,14 +113,7 @@ class Product(db.Model):
             db.session.commit()
     
     def get_media(self):
-        if self.media_id:
-            the_media = Media.query.get(self.media_id)
-            if the_media:
-                return the_media.get_path()
-            else:
-                return None
-        else:
-            return None
+        return self.media.get_path() if self.media else None
     
     def to_dict(self):
         return {
@@ -141,6 +132,74 @@ class Product(db.Model):
         }
 
 
+def product_search_document():
+    """
+    The weighted tsvector matched by the Postgres search backend.
+    
+    Constants are inlined so the expression stays identical to the one of
+    the `ix_product_search_tsv` index, which lets Postgres use it.
+    """
+    config = text("'simple'")
+    title = func.coalesce(Product.name, text("''")).op("||")(text("' '")).op("||")(func.coalesce(Product.slug, text("''")))
+    return func.setweight(func.to_tsvector(config, title), text("'A'")).op("||")(
+        func.setweight(func.to_tsvector(config, func.coalesce(Product.description, text("''"))), text("'B'"))
+    )
+
+
+# Search indexes only exist on PostgreSQL (the trigram one needs the pg_trgm extension)
+db.Index("ix_product_search_tsv", product_search_document(), postgresql_using="gin").ddl_if(dialect="postgresql")
+db.Index("ix_product_name_trgm", Product.name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
+
+class SearchIndexVersion(db.Model):
+    """
+    Single-row counter bumped, in the same transaction, whenever products
+    are added, changed or deleted.
+    
+    In-memory search indexes (see `utils.search.inverted_index`) remember
+    the version they were built at and compare it on each search, so every
+    worker sees the product changes committed by the others.
+    """
+    __tablename__ = "search_index_version"
+    
+    ROW_ID = 1
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<SearchIndexVersion version: {self.version}>'
+    
+    @classmethod
+    def current(cls) -> int:
+        """Returns the current search index version (0 if it was never bumped)."""
+        version = db.session.execute(
+            db.select(cls.version).where(cls.id == cls.ROW_ID)
+        ).scalar()
+        return version or 0
+    
+    @classmethod
+    def bump(cls, connection: Connection) -> int:
+        """Increments the version in the connection's transaction and returns the new one."""
+        table = cls.__table__
+        dialect = connection.dialect.name
+        
+        if dialect in ("postgresql", "sqlite"):
+            insert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+            connection.execute(insert.values(id=cls.ROW_ID, version=1).on_conflict_do_update(index_elements=["id"], set_={"version": table.c.version + 1}))
+        elif dialect in ("mysql", "mariadb"):
+            insert = mysql.insert(table)
+            connection.execute(insert.values(id=cls.ROW_ID, version=1).on_duplicate_key_update(version=table.c.version + 1))
+        else:
+            updated = connection.execute(
+                table.update().where(table.c.id == cls.ROW_ID).values(version=table.c.version + 1)
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert().values(id=cls.ROW_ID, version=1))
+        
+        return connection.execute(db.select(table.c.version).where(table.c.id == cls.ROW_ID)).scalar_one()
+
+
 class Tag(db.Model):
     __tablename__ = "tag"
     id = db.Column(db.Integer, primary_key=True)
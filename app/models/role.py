@@ -1,9 +1,14 @@
 from enum import Enum
+from flask import has_app_context
+from sqlalchemy import Connection, event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Query
+from sqlalchemy.orm import Query, Session
 
 from ..extensions import db
 from .user import AppUser
+from .wallet import Wallet
+from ..utils.cache import invalidate_principals
 from ..enums.auth import RoleNames
 from ..utils.date_time import DateTimeUtils
 from ..utils.helpers.loggers import console_log
@@ -149,6 +154,90 @@ class UserRole(db.Model):
             db.session.commit()
 
 
+class PrincipalVersion(db.Model):
+    """
+    Per-user counter bumped, in the same transaction, whenever the roles or
+    wallet of the user change.
+    
+    Cached principals (see `utils.cache.principal`) are stored with the
+    version they were loaded at and reloaded when it moved, so a worker
+    whose cache the change did not reach stops using them at once. Users
+    without a row are at version 0.
+    """
+    __tablename__ = "principal_version"
+    
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # no FK: deleted users are bumped too
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PrincipalVersion user: {self.user_id}, version: {self.version}>'
+    
+    @classmethod
+    def current(cls, user_id: int) -> int:
+        version = db.session.execute(db.select(cls.version).where(cls.user_id == user_id)).scalar()
+        return version or 0
+    
+    @classmethod
+    def bump(cls, connection: Connection, user_ids: set[int]) -> None:
+        """Increments the version of each user, creating missing rows, in the connection's transaction."""
+        table = cls.__table__
+        rows = [{"user_id": user_id, "version": 1} for user_id in sorted(user_ids)]
+        dialect = connection.dialect.name
+        
+        if dialect in ("postgresql", "sqlite"):
+            insert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+            connection.execute(insert.on_conflict_do_update(index_elements=["user_id"], set_={"version": table.c.version + 1}), rows)
+        elif dialect in ("mysql", "mariadb"):
+            insert = mysql.insert(table)
+            connection.execute(insert.on_duplicate_key_update(version=table.c.version + 1), rows)
+        else:
+            for row in rows:
+                updated = connection.execute(
+                    table.update().where(table.c.user_id == row["user_id"]).values(version=table.c.version + 1)
+                ).rowcount
+                if not updated:
+                    connection.execute(table.insert().values(**row))
+
+
+def _principal_user_ids(session: Session) -> set[int]:
+    """Ids of the users whose roles or wallet were added, changed or removed in this flush."""
+    user_ids = set()
+    
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, UserRole):
+            user_ids.add(instance.app_user_id)
+        elif isinstance(instance, Wallet) and instance not in session.dirty:
+            user_ids.add(instance.user_id)
+        elif isinstance(instance, AppUser) and instance in session.deleted:
+            user_ids.add(instance.id)
+    
+    user_ids.discard(None)
+    return user_ids
+
+
+# Changes to roles bump the users' principal version with the change, so
+# every worker reloads their principals; the ones cached in this worker's
+# backend are also dropped once the change is committed
+@event.listens_for(Session, "after_flush")
+def collect_principal_changes(session: Session, flush_context):
+    user_ids = _principal_user_ids(session)
+    if user_ids:
+        PrincipalVersion.bump(session.connection(), user_ids)
+        session.info.setdefault("principal_user_ids", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_principals(session: Session):
+    user_ids = session.info.pop("principal_user_ids", None)
+    if user_ids and has_app_context():
+        invalidate_principals(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_principal_changes(session: Session):
+    session.info.pop("principal_user_ids", None)
+
+
 def migrate_user_roles():
     existing_user_roles = db.session.query(user_roles).all()
     for ur in existing_user_roles:
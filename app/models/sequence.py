@@ -0,0 +1,71 @@
+"""
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from typing import Callable, Optional
+
+from sqlalchemy import Connection
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+
+
+class SequenceCounter(db.Model):
+    """
+    Named counters backing sequences on databases without native sequences
+    (SQLite, MySQL).
+    
+    A counter is advanced with a single `UPDATE ... SET value = value + n`,
+    which locks its row until the surrounding transaction ends, so two
+    transactions can never be handed the same value.
+    """
+    __tablename__ = "sequence_counter"
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<SequenceCounter {self.name}: {self.value}>'
+    
+    @classmethod
+    def reserve(cls, connection: Connection, name: str, count: int = 1, seed: Optional[Callable[[Connection], int]] = None) -> int:
+        """
+        Advances a counter by `count` in the connection's transaction.
+        
+        Args:
+            connection: Connection whose transaction the row lock belongs to
+            name: Name of the counter
+            count: Number of values to reserve
+            seed: Returns the last value already in use, for counters that
+                do not exist yet
+        
+        Returns:
+            int: The last reserved value; the reserved range is
+                `value - count + 1` to `value`.
+        """
+        table = cls.__table__
+        statement = table.update().where(table.c.name == name).values(value=table.c.value + count)
+        
+        if connection.dialect.update_returning:
+            value = connection.execute(statement.returning(table.c.value)).scalar()
+        elif connection.execute(statement).rowcount:
+            # The UPDATE holds the row lock, so this reads our own increment
+            value = connection.execute(db.select(table.c.value).where(table.c.name == name)).scalar()
+        else:
+            value = None
+        
+        if value is not None:
+            return value
+        
+        value = (seed(connection) if seed else 0) + count
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(name=name, value=value))
+        except IntegrityError:
+            # Another transaction created the counter first
+            return cls.reserve(connection, name, count)
+        
+        return value
@@ -0,0 +1,103 @@
+"""
+Serialization profiles.
+
+A model lists the relationships its `to_dict` reads, per serialization
+option, so that list queries load them up front (one query per
+relationship for the whole page) instead of once per row:
+
+    class CustomerOrder(SerializableMixin, db.Model):
+        serialization_profiles = {
+            "default": ("items", "payment"),             # always read
+            "items": (("items", "default"),),            # to_dict(include_items=True)
+            "user": (("app_user", "default"),),          # to_dict(include_user=True)
+        }
+
+    CustomerOrder.query_for("items").all()
+
+A path is a relationship name, dotted for nested ones ("roles.role"), or a
+(relationship, profile) pair reusing a profile of the related model.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from typing import ClassVar, Iterable
+
+from sqlalchemy.orm import Query, joinedload, selectinload
+from sqlalchemy.orm.strategy_options import _AbstractLoad
+
+from ..extensions import db
+
+
+class SerializableMixin:
+    serialization_profiles: ClassVar[dict[str, tuple]] = {}
+
+    @classmethod
+    def serialization_paths(cls, *profiles: str) -> list[tuple[str, ...]]:
+        """
+        Returns the relationship paths read by the given profiles, the
+        "default" one included, with nested profiles expanded.
+
+        Raises:
+            ValueError: If a profile is not declared
+        """
+        paths: list[tuple[str, ...]] = []
+
+        for profile in ("default", *profiles):
+            if profile not in cls.serialization_profiles:
+                if profile == "default":
+                    continue
+                raise ValueError(f"{cls.__name__} has no serialization profile {profile!r}")
+
+            for entry in cls.serialization_profiles[profile]:
+                if isinstance(entry, str):
+                    expanded = [tuple(entry.split("."))]
+                else:
+                    relationship, related_profile = entry
+                    related = getattr(cls, relationship).property.mapper.class_
+                    expanded = [(relationship,)] + [
+                        (relationship, *path) for path in related.serialization_paths(related_profile)
+                    ]
+                paths.extend(path for path in expanded if path not in paths)
+
+        return paths
+
+    @classmethod
+    def serialization_options(cls, *profiles: str) -> list[_AbstractLoad]:
+        """
+        Returns the loader options of the given profiles: collections are
+        loaded with `selectinload`, single related rows with `joinedload`.
+        """
+        options = []
+
+        for path in cls.serialization_paths(*profiles):
+            model, option = cls, None
+            for name in path:
+                attribute = getattr(model, name)
+                loader = selectinload if attribute.property.uselist else joinedload
+                option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+                model = attribute.property.mapper.class_
+            options.append(option)
+
+        return options
+
+    @classmethod
+    def query_for(cls, *profiles: str) -> Query:
+        """Returns `cls.query` loading what `to_dict` reads with the given profiles."""
+        return cls.query.options(*cls.serialization_options(*profiles))
+
+    @classmethod
+    def load_profiles(cls, instances: Iterable, *profiles: str) -> list:
+        """
+        Loads what the given profiles read for instances already loaded
+        (e.g. through another relationship), in one query per relationship.
+        """
+        instances = list(instances)
+        ids = {instance.id for instance in instances if instance is not None}
+        if ids:
+            db.session.execute(
+                db.select(cls).where(cls.id.in_(ids)).options(*cls.serialization_options(*profiles))
+            ).unique().all()
+        return instances
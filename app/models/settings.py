@@ -1,6 +1,8 @@
 
 from enum import Enum
 
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
 from ..extensions import db
 from ..utils.helpers.basics import generate_random_string
 from ..utils.date_time import DateTimeUtils
@@ -82,4 +84,63 @@ class PaymentMethodSettings(db.Model):
             'key': self.key,
             'value': self.value,
             'updated_at': self.updated_at
-        }
\ No newline at end of file
+        }
+
+class SettingsVersion(db.Model):
+    """
+    Single-row counter that is bumped whenever a general or payment method
+    setting changes. Each worker compares it against the version of its
+    in-memory settings snapshot to know when the snapshot must be reloaded.
+    """
+    __tablename__ = "settings_version"
+    
+    ROW_ID = 1
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), default=DateTimeUtils.aware_utcnow, onupdate=DateTimeUtils.aware_utcnow)
+    
+    def __repr__(self):
+        return f'<SettingsVersion version: {self.version}>'
+    
+    @classmethod
+    def current(cls) -> int:
+        """Returns the current settings version (0 if it was never bumped)."""
+        version = db.session.execute(
+            db.select(cls.version).where(cls.id == cls.ROW_ID)
+        ).scalar()
+        return version or 0
+    
+    @classmethod
+    def bump(cls) -> None:
+        """
+        Increments the settings version in the current transaction.
+        
+        The counter row is created on first use with an upsert, so the change
+        is committed together with the settings that triggered it and two
+        concurrent first saves cannot both try to insert it.
+        """
+        now = DateTimeUtils.aware_utcnow()
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect in ("postgresql", "sqlite"):
+            insert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(cls)
+            db.session.execute(
+                insert.values(id=cls.ROW_ID, version=1, updated_at=now)
+                .on_conflict_do_update(index_elements=["id"], set_={"version": cls.version + 1, "updated_at": now})
+            )
+        elif dialect in ("mysql", "mariadb"):
+            insert = mysql.insert(cls)
+            db.session.execute(
+                insert.values(id=cls.ROW_ID, version=1, updated_at=now)
+                .on_duplicate_key_update(version=cls.version + 1, updated_at=now)
+            )
+        else:
+            result = db.session.execute(
+                db.update(cls)
+                .where(cls.id == cls.ROW_ID)
+                .values(version=cls.version + 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                db.session.add(cls(id=cls.ROW_ID, version=1))
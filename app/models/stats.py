@@ -0,0 +1,281 @@
+"""
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from datetime import date, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, NamedTuple, Optional
+
+from sqlalchemy import Connection, Table, event, inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..utils.date_time import DateTimeUtils
+from .user import AppUser
+from .wallet import Wallet
+from .category import Category
+from .product import Product, Tag
+from .order import CustomerOrder
+from .payment import Payment
+
+
+class DailyStat(db.Model):
+    """
+    Daily rollup of a metric, split by a dimension.
+
+    Writes only append `StatDelta` rows, which `flask stats fold` (run
+    periodically) adds to the rollups; readers add the deltas not folded yet.
+    The rollups can be rebuilt from the source tables with `flask stats rebuild`.
+
+    Metrics (dimension):
+        payments ("<status>:<payment method>"), amount is the paid amount
+        orders ("<status>")
+        users, products ("")
+    """
+    __tablename__ = "daily_stat"
+
+    day = db.Column(db.Date(), primary_key=True)
+    metric = db.Column(db.String(30), primary_key=True)
+    dimension = db.Column(db.String(120), primary_key=True, default="")
+    count = db.Column(db.BigInteger(), nullable=False, default=0)
+    amount = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_daily_stat_metric_day', 'metric', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<DailyStat {self.day} {self.metric}:{self.dimension} ({self.count}, {self.amount})>'
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'metric': self.metric,
+            'dimension': self.dimension,
+            'count': self.count,
+            'amount': self.amount,
+        }
+
+
+class StatCounter(db.Model):
+    """
+    Running totals (number of products, users, total wallet balance...),
+    maintained like `DailyStat`.
+    """
+    __tablename__ = "stat_counter"
+
+    name = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.BigInteger(), nullable=False, default=0)
+    amount = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}: {self.count} ({self.amount})>'
+
+
+class StatDelta(db.Model):
+    """
+    Change to a `DailyStat` (`day` set) or a `StatCounter` (`day` null, the
+    counter name in `metric`), not folded into it yet.
+
+    The table is insert-only on the write path, so concurrent writes never
+    wait on each other for the few shared rollup rows.
+    """
+    __tablename__ = "stat_delta"
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer(), "sqlite"), primary_key=True, autoincrement=True)
+    day = db.Column(db.Date(), nullable=True)
+    metric = db.Column(db.String(50), nullable=False)
+    dimension = db.Column(db.String(120), nullable=False, default="")
+    count = db.Column(db.BigInteger(), nullable=False, default=0)
+    amount = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatDelta {self.day} {self.metric}:{self.dimension} ({self.count}, {self.amount})>'
+
+
+def upsert_increments(connection: Connection, table: Table, key_columns: list[str], rows: list[dict]) -> None:
+    """
+    Adds the `count` and `amount` of each row to the stored row with the same
+    key, creating missing rows, in one statement where the dialect allows it.
+    """
+    if not rows:
+        return
+
+    dialect = connection.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+        statement = insert.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={"count": table.c.count + insert.excluded.count, "amount": table.c.amount + insert.excluded.amount},
+        )
+        connection.execute(statement, rows)
+    elif dialect in ("mysql", "mariadb"):
+        insert = mysql.insert(table)
+        connection.execute(
+            insert.on_duplicate_key_update(count=table.c.count + insert.inserted.count, amount=table.c.amount + insert.inserted.amount),
+            rows
+        )
+    else:
+        for row in rows:
+            where = [table.c[column] == row[column] for column in key_columns]
+            updated = connection.execute(
+                table.update().where(*where)
+                .values(count=table.c.count + row["count"], amount=table.c.amount + row["amount"])
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert().values(**row))
+
+
+class _Tracked(NamedTuple):
+    metric: str
+    date_attr: str
+    dimension_attrs: tuple[str, ...] = ()
+    amount_attr: Optional[str] = None
+    counter: Optional[str] = None
+
+
+# Models rolled up per day
+TRACKED_MODELS: dict[type, _Tracked] = {
+    Payment: _Tracked("payments", "created_at", ("status", "payment_method"), "amount"),
+    CustomerOrder: _Tracked("orders", "created_at", ("status",), counter="orders"),
+    AppUser: _Tracked("users", "date_joined", counter="users"),
+    Product: _Tracked("products", "created_at", counter="products"),
+}
+
+# Models only counted
+COUNTED_MODELS: dict[type, str] = {Category: "categories", Tag: "tags"}
+
+
+def _as_text(value: Any) -> str:
+    return "" if value is None else str(value.value if isinstance(value, Enum) else value)
+
+
+def stat_day(value) -> date:
+    """UTC day of a timestamp (SQLite hands back naive UTC datetimes)."""
+    if value is None:
+        return DateTimeUtils.aware_utcnow().date()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _previous(instance, attr: str) -> Any:
+    history = inspect(instance).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(instance, attr)
+
+
+class _Changes:
+    def __init__(self):
+        self.daily: dict[tuple, list] = {}
+        self.counters: dict[str, list] = {}
+
+    def add_daily(self, day: date, metric: str, dimension: str, count: int, amount) -> None:
+        totals = self.daily.setdefault((day, metric, dimension), [0, Decimal(0)])
+        totals[0] += count
+        totals[1] += Decimal(amount or 0)
+
+    def add_counter(self, name: str, count: int, amount=0) -> None:
+        totals = self.counters.setdefault(name, [0, Decimal(0)])
+        totals[0] += count
+        totals[1] += Decimal(amount or 0)
+
+    def add(self, instance, spec: _Tracked, sign: int, values: Callable[[str], Any]) -> None:
+        dimension = ":".join(_as_text(values(attr)) for attr in spec.dimension_attrs)
+        amount = values(spec.amount_attr) if spec.amount_attr else 0
+        self.add_daily(stat_day(getattr(instance, spec.date_attr)), spec.metric, dimension, sign, sign * Decimal(amount or 0))
+
+    def rows(self) -> tuple[list[dict], list[dict]]:
+        daily = [
+            {"day": day, "metric": metric, "dimension": dimension, "count": count, "amount": amount}
+            for (day, metric, dimension), (count, amount) in self.daily.items() if count or amount
+        ]
+        counters = [
+            {"name": name, "count": count, "amount": amount}
+            for name, (count, amount) in self.counters.items() if count or amount
+        ]
+        return daily, counters
+
+
+def _collect_changes(session: Session) -> _Changes:
+    changes = _Changes()
+
+    for instances, sign in ((session.new, 1), (session.deleted, -1)):
+        for instance in instances:
+            spec = TRACKED_MODELS.get(type(instance))
+            if spec:
+                values = (lambda attr, instance=instance: getattr(instance, attr)) if sign > 0 else (lambda attr, instance=instance: _previous(instance, attr))
+                changes.add(instance, spec, sign, values)
+                if spec.counter:
+                    changes.add_counter(spec.counter, sign)
+            elif type(instance) in COUNTED_MODELS:
+                changes.add_counter(COUNTED_MODELS[type(instance)], sign)
+            elif isinstance(instance, Wallet):
+                changes.add_counter("wallet_balance", 0, sign * Decimal((instance._balance if sign > 0 else _previous(instance, "_balance")) or 0))
+
+    for instance in session.dirty:
+        spec = TRACKED_MODELS.get(type(instance))
+        if spec and spec.dimension_attrs:
+            attrs = spec.dimension_attrs + ((spec.amount_attr,) if spec.amount_attr else ())
+            if any(inspect(instance).attrs[attr].history.has_changes() for attr in attrs):
+                # Move the row from its old dimension to its new one
+                changes.add(instance, spec, -1, lambda attr, instance=instance: _previous(instance, attr))
+                changes.add(instance, spec, 1, lambda attr, instance=instance: getattr(instance, attr))
+        elif isinstance(instance, Wallet):
+            history = inspect(instance).attrs._balance.history
+            if history.has_changes():
+                old = history.deleted[0] if history.deleted else 0
+                new = history.added[0] if history.added else 0
+                changes.add_counter("wallet_balance", 0, Decimal(new or 0) - Decimal(old or 0))
+
+    return changes
+
+
+def apply_stat_changes(connection: Connection, daily_rows: list[dict], counter_rows: list[dict]) -> None:
+    """
+    Adds increments to the rollups in the connection's transaction.
+
+    Rows are locked in a fixed order (daily rows, then counters, each sorted
+    by key), so two transactions applying changes cannot deadlock.
+    """
+    daily_rows = sorted(daily_rows, key=lambda row: (row["day"], row["metric"], row["dimension"]))
+    counter_rows = sorted(counter_rows, key=lambda row: row["name"])
+    upsert_increments(connection, DailyStat.__table__, ["day", "metric", "dimension"], daily_rows)
+    upsert_increments(connection, StatCounter.__table__, ["name"], counter_rows)
+
+
+def record_stat_changes(connection: Connection, daily_rows: list[dict], counter_rows: list[dict]) -> None:
+    """Appends changes to the rollups as `StatDelta` rows, folded in later."""
+    rows = [
+        *({**row, "dimension": row.get("dimension", "")} for row in daily_rows),
+        *({"day": None, "metric": row["name"], "dimension": "", "count": row["count"], "amount": row["amount"]} for row in counter_rows),
+    ]
+    if rows:
+        connection.execute(StatDelta.__table__.insert(), rows)
+
+
+def bump_stat_counter(name: str, count: int = 0, amount: Decimal = Decimal(0), connection: Optional[Connection] = None) -> None:
+    """
+    Adds to a running total, for writes made with Core statements that the
+    flush listener cannot see (e.g. wallet balance updates).
+    """
+    record_stat_changes(connection or db.session.connection(), [], [{"name": name, "count": count, "amount": amount}])
+
+
+# Record the changes to the rollups with the rows they count: one insert per
+# flush, in the same transaction, however many rows changed
+@event.listens_for(Session, "after_flush")
+def update_stat_rollups(session: Session, flush_context):
+    if not any(
+        type(instance) in TRACKED_MODELS or type(instance) in COUNTED_MODELS or isinstance(instance, Wallet)
+        for instance in (*session.new, *session.deleted, *session.dirty)
+    ):
+        return
+
+    daily_rows, counter_rows = _collect_changes(session).rows()
+    record_stat_changes(session.connection(), daily_rows, counter_rows)
@@ -54,13 +54,14 @@ class Subscription(db.Model):
     plan = db.relationship('SubscriptionPlan')
     payment = db.relationship('Payment', back_populates='subscription', uselist=False)
 
-    def extend_validity(self):
+    def extend_validity(self, commit=True):
         """Extend subscription based on plan duration."""
         if self.end_date < DateTimeUtils.aware_utcnow():
             self.start_date = DateTimeUtils.aware_utcnow()
         self.end_date = self.end_date + timedelta(days=self.plan.duration_days)
         self.is_active = True
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
     @property
     def is_expired(self) -> bool:
@@ -17,6 +17,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
 from .media import Media
+from .serialization import SerializableMixin
 from config import Config
 from ..extensions import db
 from ..utils.date_time import DateTimeUtils
@@ -39,9 +40,14 @@ class TempUser(db.Model):
         }
 
 # Define the User data model.
-class AppUser(db.Model, UserMixin):
+class AppUser(SerializableMixin, db.Model, UserMixin):
     __tablename__ = "app_user"
     
+    # Relationships read by `to_dict` (see `models.serialization`)
+    serialization_profiles = {
+        "default": ("address", "wallet", "roles.role", "profile.profile_picture"),
+    }
+    
     id = db.Column(db.Integer(), primary_key=True)
     email = db.Column(db.String(255), nullable=False, unique=True)
     username = db.Column(db.String(50), nullable=True, unique=True)
@@ -189,6 +195,7 @@ class Profile(db.Model):
     
     user_id = db.Column(db.Integer, db.ForeignKey('app_user.id', ondelete='CASCADE'), nullable=False,)
     app_user = db.relationship('AppUser', back_populates="profile")
+    profile_picture = db.relationship('Media', lazy='selectin')
     
     __table_args__ = (
         Index('ix_profile_firstname_trgm', 'firstname', postgresql_using='gin', postgresql_ops={'firstname': 'gin_trgm_ops'}),
@@ -209,14 +216,7 @@ class Profile(db.Model):
     
     @property
     def profile_pic(self):
-        if self.profile_picture_id:
-            theImage = Media.query.get(self.profile_picture_id)
-            if theImage:
-                return theImage.get_path()
-            else:
-                return ''
-        else:
-            return ''
+        return (self.profile_picture.get_path() if self.profile_picture else None) or ''
         
     def to_dict(self):
         return {
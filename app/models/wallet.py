@@ -4,14 +4,20 @@ Link: https://github.com/zeddyemy
 Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
 License: GNU, see LICENSE for more details.
 """
-from sqlalchemy import or_
+from sqlalchemy import or_, event
 from sqlalchemy.orm import backref
 
 from ..extensions import db
 from config import Config
 from ..utils.date_time import DateTimeUtils
+from .serialization import SerializableMixin
 
-class Wallet(db.Model):
+class Wallet(SerializableMixin, db.Model):
+    
+    # Relationships read by `to_dict` (see `models.serialization`)
+    serialization_profiles = {
+        "user": (("app_user", "default"),),
+    }
     
     id = db.Column(db.Integer(), primary_key=True)
     _balance = db.Column(db.Numeric(14, 2), default=0.00, nullable=True)
@@ -59,4 +65,44 @@ class Wallet(db.Model):
             'currency_code': self.currency_code,
             'currency_symbol': self.currency_symbol,
             **user_info,
-        }
\ No newline at end of file
+        }
+
+
+class WalletEntry(db.Model):
+    """
+    Append-only ledger of wallet balance changes.
+    
+    Every credit, debit or refund adds one entry recording the signed amount
+    and the balance it left the wallet with. Entries posted with an
+    `idempotency_key` (e.g. a payment reference) are applied only once.
+    """
+    __tablename__ = "wallet_entry"
+    
+    id = db.Column(db.Integer(), primary_key=True)
+    entry_type = db.Column(db.String(20), nullable=False)  # 'credit', 'debit' or 'refund'
+    amount = db.Column(db.Numeric(14, 2), nullable=False)  # negative for debits
+    balance_after = db.Column(db.Numeric(14, 2), nullable=False)
+    idempotency_key = db.Column(db.String(100), unique=True, nullable=True)
+    narration = db.Column(db.String(150), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=DateTimeUtils.aware_utcnow)
+    
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallet.id', ondelete='CASCADE'), nullable=False, index=True)
+    wallet = db.relationship('Wallet', backref=db.backref('entries', lazy='dynamic', passive_deletes=True))
+    
+    def __repr__(self):
+        return f'<WalletEntry ID: {self.id}, {self.entry_type}: {self.amount}, balance: {self.balance_after}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entry_type': self.entry_type,
+            'amount': self.amount,
+            'balance_after': self.balance_after,
+            'narration': self.narration,
+            'created_at': self.created_at,
+        }
+
+
+@event.listens_for(WalletEntry, 'before_update')
+def prevent_wallet_entry_update(mapper, connection, target):
+    raise ValueError("Wallet entries are append-only.")
\ No newline at end of file
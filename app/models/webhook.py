@@ -0,0 +1,72 @@
+"""
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from ..extensions import db
+from ..utils.date_time import DateTimeUtils
+
+
+class WebhookEvent(db.Model):
+    """
+    Inbox of payment provider webhook events.
+
+    Each event is stored once per (provider, event_id), acknowledged right
+    away and applied later by the webhook workers, so provider retries of
+    the same event are recognised and dropped.
+
+    Statuses:
+        pending: received, waiting for a worker
+        processing: claimed by a worker
+        processed: applied
+        failed: last attempt failed, retried after `next_attempt_at`
+        dead: gave up after too many attempts
+    """
+    __tablename__ = "webhook_event"
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    FAILED = "failed"
+    DEAD = "dead"
+
+    id = db.Column(db.Integer(), primary_key=True)
+    provider = db.Column(db.String(30), nullable=False)
+    event_id = db.Column(db.String(150), nullable=False)
+    event_type = db.Column(db.String(30), nullable=True)
+    reference = db.Column(db.String(80), nullable=True, index=True)
+    payload = db.Column(db.JSON, nullable=False)  # raw provider payload
+    data = db.Column(db.JSON, nullable=False)  # parsed, standard webhook data
+
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer(), nullable=False, default=0)
+    last_error = db.Column(db.Text(), nullable=True)
+
+    received_at = db.Column(db.DateTime(timezone=True), default=DateTimeUtils.aware_utcnow)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), default=DateTimeUtils.aware_utcnow)
+    locked_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    processed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'event_id', name='uq_webhook_provider_event'),
+        db.Index('ix_webhook_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<WebhookEvent {self.provider}:{self.event_id} ({self.status}, attempts: {self.attempts})>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'provider': self.provider,
+            'event_id': self.event_id,
+            'event_type': self.event_type,
+            'reference': self.reference,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'received_at': self.received_at,
+            'processed_at': self.processed_at,
+        }
@@ -0,0 +1,23 @@
+"""
+Unified cache layer for the application.
+
+Every cached helper goes through a ``CacheNamespace`` which stores its
+entries in the backend configured for ``app_cache`` (Flask-Caching). The
+backend is picked with ``CACHE_TYPE``:
+
+    - ``SimpleCache``: in-process (default, per worker)
+    - ``FileSystemCache``: shared by all workers on one host (``CACHE_DIR``)
+    - ``RedisCache``: shared by every worker on every host (``CACHE_REDIS_URL``)
+
+Keys are namespaced, and each namespace can be tagged so that a single
+``invalidate_tags("categories")`` call drops every entry depending on the
+category table, in every worker that shares the backend.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from .namespace import CacheNamespace, invalidate_tags, get_cache_stats, reset_cache_stats
+from .principal import Principal, principal_cache, invalidate_principals
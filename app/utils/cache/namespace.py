@@ -0,0 +1,184 @@
+"""
+Namespaced, tag-invalidated cache entries on top of the configured
+Flask-Caching backend.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from __future__ import annotations
+
+import uuid
+from enum import Enum
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Iterable, Optional
+
+from ...extensions import app_cache
+from ..instrumentation.prometheus import record_cache_lookup
+
+
+_MISSING = object()
+
+_stats: dict[str, dict[str, int]] = {}
+_stats_lock = Lock()
+
+
+def _record(namespace: str, outcome: str) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+    record_cache_lookup(namespace, outcome)
+
+
+def get_cache_stats() -> dict[str, dict[str, float]]:
+    """
+    Returns hit/miss counters of this worker, per namespace.
+
+    Returns:
+        dict: {namespace: {"hits": int, "misses": int, "hit_ratio": float}}
+    """
+    with _stats_lock:
+        stats = {name: dict(counters) for name, counters in _stats.items()}
+
+    for counters in stats.values():
+        total = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = round(counters["hits"] / total, 4) if total else 0.0
+
+    return stats
+
+
+def reset_cache_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+
+def _get_tag_tokens(tags: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Returns the current token of each tag, creating missing ones.
+
+    Tokens are random rather than counters: if the backend evicts a tag, the
+    tag gets a brand new token and entries stored under the old one can never
+    be served again.
+    """
+    keys = [_tag_key(tag) for tag in tags]
+    tokens = list(app_cache.get_many(*keys))
+
+    for index, token in enumerate(tokens):
+        if token is None:
+            new_token = uuid.uuid4().hex
+            # `add` only succeeds for the first worker, everyone else reads its token
+            if app_cache.add(keys[index], new_token, timeout=0):
+                tokens[index] = new_token
+            else:
+                tokens[index] = app_cache.get(keys[index]) or new_token
+
+    return tuple(tokens)
+
+
+def invalidate_tags(*tags: str) -> None:
+    """
+    Invalidates every cached entry that depends on any of the given tags.
+
+    Args:
+        *tags: Tag names, e.g. "categories".
+    """
+    for tag in tags:
+        app_cache.set(_tag_key(tag), uuid.uuid4().hex, timeout=0)
+
+
+def _normalize_arg(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value, key=repr))
+    return value
+
+
+def make_key(*args, **kwargs) -> str:
+    """Builds a stable cache key from call arguments."""
+    parts = [repr(_normalize_arg(arg)) for arg in args]
+    parts.extend(f"{name}={_normalize_arg(value)!r}" for name, value in sorted(kwargs.items()))
+    return ",".join(parts)
+
+
+class CacheNamespace:
+    """
+    A group of cache entries sharing a key prefix, a default TTL and a set of
+    invalidation tags.
+
+    Example:
+        >>> category_cache = CacheNamespace("categories", ttl=300, tags=("categories",))
+        >>> @category_cache.memoize
+        ... def get_cached_categories(): ...
+        >>> invalidate_tags("categories")
+    """
+
+    def __init__(self, name: str, ttl: Optional[int] = None, tags: Iterable[str] = ()):
+        self.name = name
+        self.ttl = ttl
+        # Every namespace can be dropped on its own through its implicit tag
+        self.tags = (f"ns:{name}", *tags)
+
+    def __repr__(self):
+        return f'<CacheNamespace {self.name}>'
+
+    def _key(self, key: str) -> str:
+        tokens = _get_tag_tokens(self.tags)
+        return f"{self.name}:{key}@{'.'.join(tokens)}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = app_cache.get(self._key(key))
+
+        if entry is None:
+            _record(self.name, "misses")
+            return default
+
+        _record(self.name, "hits")
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        # Values are boxed so that a cached `None` is distinguishable from a miss
+        app_cache.set(self._key(key), (value,), timeout=ttl if ttl is not None else self.ttl)
+
+    def delete(self, key: str) -> None:
+        app_cache.delete(self._key(key))
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self) -> None:
+        """Drops every entry of this namespace."""
+        invalidate_tags(f"ns:{self.name}")
+
+    def memoize(self, func: Optional[Callable] = None, *, ttl: Optional[int] = None):
+        """
+        Caches the return value of a function in this namespace, keyed by its
+        arguments. The wrapped function gets a ``cache_clear()`` method, like
+        functions decorated with cachetools' ``cached``.
+        """
+        def decorator(func: Callable):
+            prefix = f"{func.__module__}.{func.__qualname__}"
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.get_or_set(
+                    f"{prefix}({make_key(*args, **kwargs)})",
+                    lambda: func(*args, **kwargs),
+                    ttl
+                )
+
+            wrapper.cache_clear = self.invalidate
+            return wrapper
+
+        return decorator(func) if func else decorator
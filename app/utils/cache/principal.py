@@ -0,0 +1,43 @@
+"""
+Cached identity of the signed-in user, for authorization checks.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from typing import Iterable, NamedTuple, Optional
+
+from flask import g, has_app_context
+
+from config import Config
+from .namespace import CacheNamespace
+
+
+class Principal(NamedTuple):
+    """
+    What authorization needs to know about a user, small and immutable so
+    it can be cached and shared between requests.
+    """
+    user_id: int
+    roles: frozenset[str]  # normalized role names ("super admin", "customer"...)
+    wallet_id: Optional[int] = None
+
+    def has_role(self, *roles: str) -> bool:
+        """True if the user has any of the given roles (names are normalized)."""
+        return not self.roles.isdisjoint(role.strip().lower() for role in roles)
+
+
+# (version, principal) pairs, kept for PRINCIPAL_CACHE_TTL seconds or until
+# the roles of their user change: the change bumps the user's
+# `PrincipalVersion`, checked on every request (see `helpers.user.get_principal`)
+principal_cache = CacheNamespace("principals", ttl=Config.PRINCIPAL_CACHE_TTL)
+
+
+def invalidate_principals(user_ids: Iterable[int]) -> None:
+    """Drops the cached principals of the given users, in the workers sharing this worker's cache."""
+    memo = g.get("_principals", {}) if has_app_context() else {}
+    for user_id in user_ids:
+        principal_cache.delete(str(user_id))
+        memo.pop(user_id, None)
@@ -16,11 +16,9 @@ from flask import current_app,  request, redirect, flash, url_for, render_templa
 from flask.typing import ResponseReturnValue
 from flask_login import LoginManager, login_required, current_user as session_user
 
-from app.models import AppUser
-from app.extensions import db
 from ..helpers.loggers import console_log
 from ..helpers.http_response import error_response
-from ..helpers.user import get_current_user
+from ..helpers.user import get_current_principal, get_principal
 from ..helpers.roles import normalize_role
 
 # Define type variables for better type hinting
@@ -71,10 +69,9 @@ def session_roles_required(*required_roles: str) -> Callable[[F], F]:
                 # Admin route
                 @web_admin_login_required()
                 def inner_wrapper(*args, **kwargs):
-                    current_user = get_current_user()
-                    current_user = db.session.merge(current_user)
+                    principal = get_current_principal()
                     # Check if user has the required roles
-                    if not any(user_role.role.name.value in required_roles for user_role in current_user.roles):
+                    if not principal or not principal.has_role(*required_roles):
                         return render_template('web_admin/errors/misc/permission.html', msg="Access denied: You do not have the required roles to access this resource")
                     
                     return fn(*args, **kwargs)
@@ -84,10 +81,9 @@ def session_roles_required(*required_roles: str) -> Callable[[F], F]:
                 # Frontend route
                 @login_required()
                 def inner_wrapper(*args, **kwargs):
-                    current_user = session_user
-                    current_user = db.session.merge(current_user)
+                    principal = get_current_principal()
                     # Check if user has the required roles
-                    if not any(user_role.role.name.value in required_roles for user_role in current_user.roles):
+                    if not principal or not principal.has_role(*required_roles):
                         return render_template('web_front/errors/permission.html', msg="Access denied: You do not have the required roles to access this resource")
                     
                     return fn(*args, **kwargs)
@@ -156,17 +152,16 @@ def roles_required(*required_roles: str) -> Callable[[F], F]:
                 # API/AJAX request - use JWT if token present, fallback to session
                 try:
                     jwt_required()(lambda: None)()  # Verify JWT if present
-                    current_user: AppUser = get_current_user()  # Will use JWT identity
+                    principal = get_current_principal()  # Will use JWT identity
                 except:
                     # Fallback to session user if JWT fails/not present
-                    current_user = session_user
+                    principal = get_principal(session_user.get_id()) if session_user.is_authenticated else None
                 
-                if not current_user or not current_user.is_authenticated:
+                if not principal:
                     return error_response("Unauthorized", 401)
                 
                 # Check roles for API requests
-                if not any(normalize_role(user_role.role.name.value) in normalized_required_roles 
-                        for user_role in current_user.roles):
+                if principal.roles.isdisjoint(normalized_required_roles):
                     return error_response(
                         "Access denied: Insufficient permissions", 
                         403
@@ -182,8 +177,8 @@ def roles_required(*required_roles: str) -> Callable[[F], F]:
                     return redirect(url_for('web_front.login', next=next_url))
                 
                 # Check roles for web requests
-                if not any(normalize_role(user_role.role.name.value) in normalized_required_roles 
-                        for user_role in session_user.roles):
+                principal = get_principal(session_user.get_id())
+                if not principal or principal.roles.isdisjoint(normalized_required_roles):
                     template: str = (
                         'web_admin/errors/misc/permission.html' 
                         if request.blueprint == 'web_admin'
@@ -37,7 +37,7 @@ def get_time(func: Callable) -> Callable:
         result: Any = func(*args, **kwargs)
         end_time: float = perf_counter()
 
-        console_log("INFO", f"'{func.__name__}()' took {end_time - start_time:.3f} seconds to execute")
+        console_log("INFO", "'%s()' took %.3f seconds to execute", func.__name__, end_time - start_time, level="DEBUG")
         return result
 
     return wrapper
\ No newline at end of file
@@ -12,7 +12,11 @@ from wtforms.validators import DataRequired, Optional
 from flask_wtf.file import FileField, FileAllowed
 
 from ...helpers.category import get_category_choices
-from ....models.category import Category
+from ...helpers.category_tree import get_category_tree, CategoryNode
+from ...cache import CacheNamespace
+
+# Rendered category widgets, dropped whenever a category is committed
+category_field_cache = CacheNamespace("category_fields", ttl=3600, tags=("categories",))
 
 # class to change the way SelectMultipleField
 # is rendered by jinja
@@ -50,17 +54,43 @@ class AddProductForm(FlaskForm):
 
 
 def generate_category_field(format='checkbox', sel_cats=None, indent_level=0):
-    categories: list[Category] = Category.query.filter(Category.parent_id == None).order_by(Category.name).all()
+    """
+    Returns the HTML of the category checkboxes or parent category select.
+    
+    Rendered fragments are cached per format, indentation and selection set
+    until a category changes, so a cache hit doesn't touch the category table.
+    
+    Args:
+        format: 'checkbox' or 'select'
+        sel_cats: Categories (or category ids) to check
+        indent_level: Indentation of the first level of sub categories in the select
+    """
+    # Compare ids so both Category objects and plain ids can be passed
+    selected_ids = tuple(sorted({int(getattr(cat, "id", cat)) for cat in (sel_cats or [])}))
+    key = f"{format}:{indent_level}:{','.join(map(str, selected_ids))}"
     
-    if sel_cats is None:
-        sel_cats = []
+    return category_field_cache.get_or_set(
+        key,
+        lambda: render_category_field(format, selected_ids, indent_level)
+    )
+
+
+def render_category_field(format='checkbox', selected_ids=(), indent_level=0):
+    """
+    Generates the HTML of the category checkboxes or parent category select.
+    
+    The tree is walked in memory (see `helpers.category_tree`), so the whole
+    widget costs at most one query, whatever the number of categories.
+    """
+    tree = get_category_tree()
+    categories: list[CategoryNode] = sorted(tree.roots, key=lambda node: node.name)
 
-    def generate_child(category_children: list[Category], the_indent_level: int = 0):
+    def generate_child(category_children: list[CategoryNode], the_indent_level: int = 0):
         html = ''
         if format == 'checkbox':
             html = '<ul class="is-child">\n'
             for category in category_children:
-                is_checked = category in sel_cats
+                is_checked = category.id in selected_ids
                 category_id = f"categories-{category.id}"
                 data_parent = f"data-parent={category.parent_id if category.parent_id else ''}"
                 html += f'    <li data-category={category.id}>\n' \
@@ -88,7 +118,7 @@ def generate_category_field(format='checkbox', sel_cats=None, indent_level=0):
     if format == 'checkbox':
         html = '<ul class="form-control form-checkbox list-view h-fit min-h-[40px] max-h-[300px] border border-outline-clr rounded-lg shadow-sm-light w-full p-2.5 overflow-y-scroll" id="categories" data-category-checkboxes>\n'
         for category in categories:
-            is_checked = category in sel_cats
+            is_checked = category.id in selected_ids
             category_id = f"categories-{category.id}"
             data_parent = f"data-parent={category.parent_id if category.parent_id else ''}"
             html += f'    <li data-category={category.id}>\n' \
@@ -12,6 +12,7 @@ from .basics import int_or_none, generate_slug
 from .loggers import console_log, log_exception
 from .user import get_current_user
 from .http_response import success_response
+from .pagination import KeysetPagination, keyset_paginate, wants_keyset_pagination, get_cursor_args
 
 
 
@@ -38,8 +39,9 @@ def get_cart_items(
         page_num: Optional[int] = None,
         search_term: Optional[str] = None,
         paginate: bool = True,
-    ) -> Pagination | list[CartItem]:
-    """Get all items in a cart"""
+        keyset: Optional[bool] = None,
+    ) -> Pagination | KeysetPagination | list[CartItem]:
+    """Get all items in a cart, newest first (cursor paginated over (created_at, id) when `keyset`)"""
     if not page_num:
         page_num = request.args.get("page", 1, type=int)
     
@@ -59,6 +61,10 @@ def get_cart_items(
     query = query.order_by(CartItem.created_at.desc())
     
     # Execute query with/without pagination
+    if paginate and (keyset if keyset is not None else wants_keyset_pagination()):
+        after, before = get_cursor_args()
+        return keyset_paginate(query, (CartItem.created_at, CartItem.id), after=after, before=before, per_page=10)
+    
     if paginate:
         pagination: Pagination = query.paginate(page=page_num, per_page=10, error_out=False)
         return pagination
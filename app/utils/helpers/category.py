@@ -6,25 +6,27 @@ License: GNU, see LICENSE for more details.
 Package: StoreZed
 """
 
-import os, sys
+import sys
 from threading import Thread
 from typing import Optional
 from sqlalchemy import desc
 from sqlalchemy.orm import Query
 from flask_sqlalchemy.pagination import Pagination # Import Pagination if needed
-from werkzeug.datastructures import FileStorage
-from flask import Flask, request, jsonify, current_app
-from cachetools import cached, TTLCache
+from flask import request, jsonify, current_app
 
 from ...extensions import db
 from ...models import Category
 from config import Config
+from ..cache import CacheNamespace
 from .basics import int_or_none, generate_slug
 from .loggers import console_log, log_exception
-from .media import save_media_files_to_temp, save_media
+from .media import save_media
+from .category_tree import get_category_tree
+from .pagination import KeysetPagination, keyset_paginate, wants_keyset_pagination, get_cursor_args
 
-# Create a cache with a Time-To-Live (TTL) of 5 minutes (300 seconds)
-cache = TTLCache(maxsize=100, ttl=300)
+# Cached category data lives for 5 minutes (300 seconds) or until a category
+# is committed (see the session listeners in `models.category`)
+category_cache = CacheNamespace("categories", ttl=300, tags=("categories",))
 
 def get_category_names() -> list[str]:
     categories = db.session.query(Category.name).order_by(desc('id')).all()
@@ -38,7 +40,7 @@ def get_category_choices() -> list[tuple[str, str]]:
     """
     Return list of (id, name) tuples for categories, ordered by descending id.
     """
-    categories = db.session.query(Category.id, Category.name).order_by(desc(Category.id)).all()
+    categories = sorted(get_category_tree().nodes.values(), key=lambda node: node.id, reverse=True)
     
     # Prepend a default empty choice
     choices = [("", "— Select category —")]
@@ -54,7 +56,8 @@ def fetch_all_categories(
         paginate: bool = False,
         parent_only: bool = True,
         search_term: Optional[str] = "",
-    ) -> list[Category] | Pagination:
+        keyset: Optional[bool] = None,
+    ) -> list[Category] | Pagination | KeysetPagination:
     ''' Get categories from the database with optional filtering and pagination.
     
     Returns either a pagination object or list of Category instances.
@@ -66,6 +69,7 @@ def fetch_all_categories(
         paginate: Return pagination object when True
         parent_only: Only return top-level categories when no cat_id specified
         search_term: Filter term for category search
+        keyset: Use cursor pagination (defaults to True when the request has an `after`/`before`/`cursor` arg)
 
     Returns:
         Pagination object or list of Category instances
@@ -81,7 +85,8 @@ def fetch_all_categories(
     if search_term is None:
         search_term = request.args.get("search", "").strip()
 
-    query: Query = Category.query
+    # Listings resolve thumbnails in batch (`CategoryTree.get_thumbnails`)
+    query: Query = Category.query.options(db.lazyload(Category.media))
     
     # Apply parent category filters
     if cat_id is not None:
@@ -96,6 +101,10 @@ def fetch_all_categories(
     query = query.order_by(Category.id.desc())
     
     # Execute query with/without pagination
+    if paginate and (keyset if keyset is not None else wants_keyset_pagination()):
+        after, before = get_cursor_args()
+        return keyset_paginate(query, (Category.id,), after=after, before=before, per_page=per_page)
+    
     if paginate:
         pagination = query.paginate(page=page_num, per_page=per_page, error_out=False)
         return pagination
@@ -103,9 +112,10 @@ def fetch_all_categories(
     return query.all()
 
 
-@cached(cache)
+@category_cache.memoize
 def get_cached_categories(parent_only=True) -> list[dict[str, str]]:
-    return [cat.to_dict(include_children=True) for cat in fetch_all_categories(parent_only=True)]
+    roots = sorted(get_category_tree().roots, key=lambda node: node.id, reverse=True)
+    return [node.to_dict(include_children=True) for node in roots]
 
 def fetch_category(identifier: int | str) -> Category:
     category = None
@@ -142,8 +152,8 @@ def save_category(data, slug=None) -> Category:
             cat_img = None
         
         if cat_img:
-            media_id = save_category_media(cat_img)
-        if not cat_img and category:
+            media_id = save_media(cat_img).id
+        elif category:
             media_id = category.media_id if category.media_id else None
         else:
             media_id = None
@@ -190,43 +200,3 @@ def save_category(data, slug=None) -> Category:
         raise e
     finally:
         console_log("INFO", "category saved")
-
-
-def async_save_category_media(app: Flask, media_file_paths, category: Category = None) -> int:
-    with app.app_context():
-        try:
-            
-            console_log("async media_file_paths", media_file_paths)
-            if media_file_paths:
-                for file_path in media_file_paths:
-                    filename = os.path.basename(file_path)
-                    console_log("filename", filename)
-                    with open(file_path, 'rb') as media_file:
-                        category_media = save_media(media_file, filename) # This saves image file, saves the path in db and return the Media instance
-                        category_media_id = category_media.id
-                        console_log("r category_media_id", category_media_id)
-            elif not media_file_paths and category:
-                if category.media_id:
-                    category_media = category.media
-                    category_media_id = category_media.id
-                else:
-                    category_media = None
-                    category_media_id = None
-            else:
-                category_media = None
-                category_media_id = None
-            
-            if not category_media:
-                raise ValueError("No Category media to save")
-            
-            return category_media_id
-        except Exception as e:
-            log_exception()
-            raise e
-
-def save_category_media(media_file: FileStorage, category: Category = None):
-    media_file_paths = save_media_files_to_temp(media_file)
-    console_log("media_file_paths", media_file_paths)
-    
-    return async_save_category_media(current_app._get_current_object(), media_file_paths, category)
-
@@ -0,0 +1,153 @@
+"""
+In-memory category tree.
+
+All categories are loaded with a single query and linked together in
+Python, so walking the tree (for the admin category widgets, the category
+API or `Category.to_dict(include_children=True)`) never lazy loads
+`Category.children` one node at a time.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Optional
+
+from ...extensions import db
+from ...models import Category, CategoryClosure
+from ...models.media import get_media_url, resolve_media_urls
+from ..cache import CacheNamespace
+
+
+# The tree lives until a category changes (the session listener in
+# `models.category` invalidates the "categories" tag on commit)
+category_tree_cache = CacheNamespace("category_tree", ttl=3600, tags=("categories",))
+
+
+class CategoryNode:
+    """A category of the in-memory tree, with the same fields as `Category.to_dict`."""
+    __slots__ = ("id", "name", "description", "slug", "parent_id", "media_id", "children")
+
+    def __init__(self, id: int, name: str, description: Optional[str], slug: str, parent_id: Optional[int], media_id: Optional[int]):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.slug = slug
+        self.parent_id = parent_id
+        self.media_id = media_id
+        self.children: list[CategoryNode] = []
+
+    def __repr__(self):
+        return f"<CategoryNode ID: {self.id}, name: {self.name}, parent: {self.parent_id}>"
+
+    def to_dict(self, include_children=False) -> dict[str, any]:
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "slug": self.slug,
+            "parent_id": self.parent_id
+        }
+        if include_children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+    def get_thumbnail(self) -> Optional[str]:
+        return get_media_url(self.media_id)
+
+
+class CategoryTree:
+    """
+    Every category linked to its parent and children.
+
+    Roots and children are ordered by id, like the `Category.children`
+    relationship.
+    """
+
+    def __init__(self, nodes: list[CategoryNode]):
+        self.nodes: dict[int, CategoryNode] = {node.id: node for node in nodes}
+        self.roots: list[CategoryNode] = []
+
+        for node in sorted(nodes, key=lambda node: node.id):
+            parent = self.nodes.get(node.parent_id) if node.parent_id else None
+            if parent:
+                parent.children.append(node)
+            else:
+                self.roots.append(node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return f"<CategoryTree categories: {len(self.nodes)}>"
+
+    def get(self, category_id: int) -> Optional[CategoryNode]:
+        return self.nodes.get(category_id)
+
+    def walk(self, nodes: Optional[list[CategoryNode]] = None, depth: int = 0) -> Iterator[tuple[CategoryNode, int]]:
+        """Yields (node, depth) pairs depth-first, parents before their children."""
+        for node in self.roots if nodes is None else nodes:
+            yield node, depth
+            yield from self.walk(node.children, depth + 1)
+
+    def ancestors(self, category_id: int) -> list[CategoryNode]:
+        """Returns the ancestors of a category, closest first."""
+        ancestors = []
+        node = self.nodes.get(category_id)
+
+        while node and node.parent_id and len(ancestors) < len(self.nodes):
+            node = self.nodes.get(node.parent_id)
+            if node:
+                ancestors.append(node)
+
+        return ancestors
+
+    def get_thumbnails(self, nodes: Optional[Iterable[CategoryNode]] = None) -> dict[int, Optional[str]]:
+        """Returns category ID -> thumbnail URL for many categories (all by default), in at most one query."""
+        nodes = list(self.nodes.values() if nodes is None else nodes)
+        urls = resolve_media_urls(node.media_id for node in nodes)
+        return {node.id: urls.get(node.media_id) for node in nodes}
+
+    def descendant_ids(self, category_id: int, include_self: bool = True) -> list[int]:
+        node = self.nodes.get(category_id)
+        if not node:
+            return []
+
+        ids = [descendant.id for descendant, _ in self.walk(node.children)]
+        return [node.id, *ids] if include_self else ids
+
+
+def load_category_tree() -> CategoryTree:
+    """Builds the category tree from a single query."""
+    rows = db.session.execute(
+        db.select(Category.id, Category.name, Category.description, Category.slug, Category.parent_id, Category.media_id)
+    )
+    return CategoryTree([CategoryNode(*row) for row in rows])
+
+
+@category_tree_cache.memoize
+def get_category_tree() -> CategoryTree:
+    """
+    Returns the cached category tree.
+
+    Returns:
+        CategoryTree: Every category, linked to its parent and children.
+    """
+    return load_category_tree()
+
+
+def get_descendant_ids_query(category_id: int):
+    """
+    Returns a SELECT of the ids of a category and all its descendants,
+    answered by the closure table's primary key.
+    """
+    return db.select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+
+
+def rebuild_category_closure() -> None:
+    """Recomputes the closure table, e.g. for categories created before it existed."""
+    CategoryClosure.rebuild(db.session.connection())
+    db.session.commit()
@@ -7,6 +7,7 @@ Package: StoreZed
 """
 
 import sys
+from decimal import Decimal
 from typing import Optional
 from flask import request, jsonify, current_app
 from sqlalchemy import desc, func, text
@@ -14,10 +15,14 @@ from sqlalchemy.orm import Query, joinedload
 from flask_sqlalchemy.pagination import Pagination
 from flask_login import current_user
 
+from config import Config
 from ...extensions import db
 from ...models import CustomerOrder, OrderItem, Product, AppUser
+from ...models.order import order_number_seq
 
 from .loggers import log_exception, console_log
+from .pagination import KeysetPagination, keyset_paginate, wants_keyset_pagination, get_cursor_args
+from .sequences import SequenceAllocator
 
 def fetch_customer_orders(
         page_num: Optional[int] = None,
@@ -25,9 +30,28 @@ def fetch_customer_orders(
         search_term: Optional[str] = None,
         is_deleted: Optional[bool] = False,
         paginate: bool = True,
-    ) -> Pagination | list[CustomerOrder]:
+        keyset: Optional[bool] = None,
+        with_total: bool = False,
+        serialize: tuple[str, ...] = (),
+    ) -> Pagination | KeysetPagination | list[CustomerOrder]:
+    """
+    Get customer orders, newest first, with optional filtering and pagination.
     
+    Args:
+        page_num: Page number for offset pagination (default from request if None)
+        status_filter: Only return orders with this status
+        search_term: Filter term for order number or username
+        is_deleted: Return soft-deleted orders instead
+        paginate: Return pagination object when True
+        keyset: Use cursor pagination over (created_at, id) (defaults to True
+            when the request has an `after`/`before`/`cursor` arg)
+        with_total: Count (or, on Postgres, estimate) the total in cursor mode
+        serialize: `to_dict` options the orders will be serialized with
+            ("items", "user"), so what they read is loaded with the page
     
+    Returns:
+        Pagination, KeysetPagination or list of CustomerOrder instances
+    """
     if not page_num:
         page_num = request.args.get("page", 1, type=int)
     
@@ -38,7 +62,7 @@ def fetch_customer_orders(
         status_filter = request.args.get('status', '').strip()
     
     # Base query
-    query: Query = CustomerOrder.query.options(joinedload(CustomerOrder.app_user)).filter_by(is_deleted=is_deleted)
+    query: Query = CustomerOrder.query_for(*serialize).options(joinedload(CustomerOrder.app_user)).filter_by(is_deleted=is_deleted)
     
     # Apply status filter
     if status_filter:
@@ -52,6 +76,13 @@ def fetch_customer_orders(
     query = query.order_by(CustomerOrder.created_at.desc())
     
     # Execute query with/without pagination
+    if paginate and (keyset if keyset is not None else wants_keyset_pagination()):
+        after, before = get_cursor_args()
+        return keyset_paginate(
+            query, (CustomerOrder.created_at, CustomerOrder.id),
+            after=after, before=before, per_page=10, approximate_total=with_total
+        )
+    
     if paginate:
         pagination: Pagination = query.paginate(page=page_num, per_page=10, error_out=False)
         return pagination
@@ -86,9 +117,78 @@ def restore_order(order_id):
         customer_order.is_deleted = False
         db.session.commit()
 
-def generate_customer_order_number():
-    last_order: CustomerOrder = CustomerOrder.query.order_by(CustomerOrder.id.desc()).first()
-    if last_order:
-        num = int(last_order.order_number.split('-')[-1]) + 1
-        return f'ORD-{num:04d}'
-    return 'ORD-0001'
\ No newline at end of file
+
+def create_customer_order(user_id: int, items: list[dict], commit: bool = True, **order_fields) -> CustomerOrder:
+    """
+    Creates an order together with all its items.
+    
+    The items are written with a single multi-row INSERT and the total is
+    computed from them up front, so the order costs the same number of
+    statements whether it has one line or fifty.
+    
+    Args:
+        user_id: ID of the customer placing the order
+        items: Order lines, as dicts with `product_id`, `quantity`,
+            `unit_price` and optionally `meta_info`
+        commit: Commit the order when True
+        **order_fields: Other CustomerOrder fields (shipping_address, meta_info...)
+    
+    Returns:
+        CustomerOrder: The new order
+    """
+    rows = [
+        {
+            "product_id": item["product_id"],
+            "quantity": int(item.get("quantity", 1)),
+            "unit_price": Decimal(str(item["unit_price"])),
+            "meta_info": item.get("meta_info") or {},
+        }
+        for item in items
+    ]
+    
+    total_amount = sum((row["unit_price"] * row["quantity"] for row in rows), Decimal(0))
+    customer_order = CustomerOrder(user_id=user_id, total_amount=total_amount, **order_fields)
+    db.session.add(customer_order)
+    db.session.flush()
+    
+    if rows:
+        for row in rows:
+            row["order_id"] = customer_order.id
+        db.session.execute(db.insert(OrderItem), rows)
+        db.session.expire(customer_order, ["items"])
+    
+    if commit:
+        db.session.commit()
+    
+    return customer_order
+
+def get_last_order_number(connection) -> int:
+    """Returns the numeric part of the newest order number (0 if there are no orders)."""
+    last_order_number = connection.execute(
+        db.select(CustomerOrder.order_number).order_by(CustomerOrder.id.desc()).limit(1)
+    ).scalar()
+    
+    if last_order_number:
+        return int(last_order_number.split('-')[-1])
+    return 0
+
+
+# Only consulted when the counter is first created, never per order
+order_number_allocator = SequenceAllocator(
+    "order_number",
+    sequence=order_number_seq,
+    seed=get_last_order_number,
+    block_size=Config.ORDER_NUMBER_BLOCK_SIZE,
+)
+
+
+def generate_customer_order_number(connection=None) -> str:
+    """
+    Allocates the next order number.
+    
+    Args:
+        connection: Connection of the transaction inserting the order
+            (defaults to the session's)
+    """
+    num = order_number_allocator.next_value(connection)
+    return f'ORD-{num:04d}'
\ No newline at end of file
@@ -1,51 +1,220 @@
+"""
+Structured logging for the app.
+
+`console_log` and `log_exception` log to the logger of the calling module
+(e.g. "app.core.web_admin.routes.products"), so levels can be set per
+module with LOG_LEVELS. Messages are only built once a record is known to
+be emitted: disabled levels cost an `isEnabledFor` check, and `data` is
+turned into a string by the formatter, not by the caller:
+
+    console_log("Request", "%s %s", request.method, request.path, level="DEBUG")
+    console_log("Webhook payload", payload, level="DEBUG", sample=0.1)
+
+With LOG_QUEUE enabled, records are formatted in the logging thread but
+written by a background listener, so a slow stream never blocks a worker.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import sys
+import json
+import queue
+import atexit
+import random
 import logging
-from flask import current_app, has_app_context
-from typing import Any
+import logging.handlers
+from datetime import datetime, timezone
+from itertools import count
+from threading import Lock
+from typing import Any, Optional
+
+from flask import Flask
+
 
 # Custom Formatter for dash-style logging
 class DashFormatter(logging.Formatter):
-    """Custom formatter that adds dashes around the label and message."""
-    def format(self, record):
-        # Extract the label from the message (assuming first part before colon)
-        label, *rest = record.msg.split(":", 1) if ":" in record.msg else (record.msg, "")
-        data = rest[0].strip() if rest else ""
-        formatted_msg = f"\n\n{label:-^50}\n {data} \n{'//':-^50}\n\n"
-        record.msg = formatted_msg
-        return super().format(record)
-
-# Initialize a fallback logger for non-Flask contexts (e.g., tests)
-_fallback_logger = logging.getLogger(__name__)
-if not _fallback_logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(DashFormatter("%(levelname)s: %(message)s"))
-    _fallback_logger.addHandler(handler)
-    _fallback_logger.setLevel(logging.INFO)
-
-
-def console_log(label: str = "INFO", data: Any = None, level: str = "INFO") -> None:
+    """Formatter that surrounds the message of labelled records with dashes."""
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        label = getattr(record, "label", None)
+        if label is not None:
+            record.message = f"\n\n{label:-^50}\n {record.message} \n{'//':-^50}\n\n"
+        return super().formatMessage(record)
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, for log collectors."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "label": getattr(record, "label", None),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one record out of `1 / rate` for the loggers given (a logger
+    name also covers its sub-modules). Warnings and errors are always kept.
+
+    Args:
+        rates: Logger name -> share of DEBUG/INFO records kept (0 to 1)
+    """
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        # Longest names first, so the most specific rate wins
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._counters: dict[str, count] = {}
+
+    def rate_for(self, name: str) -> Optional[float]:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(f"{prefix}."):
+                return rate
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        if rate is None or rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        counter = self._counters.setdefault(record.name, count())
+        return next(counter) % round(1 / rate) == 0
+
+
+class _FormattingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler dropping records instead of blocking when the queue is full."""
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handled_loggers: list[tuple[logging.Logger, logging.Handler]] = []
+_setup_lock = Lock()
+
+
+def parse_levels(value: Optional[str]) -> dict[str, str]:
+    """Parses "app.routes=WARNING,sqlalchemy.engine=INFO" into a dict."""
+    levels = {}
+    for item in (value or "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # flushes what is still queued
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def setup_logging(app: Flask) -> None:
+    """
+    Configures the app logger from LOG_LEVEL, LOG_LEVELS, LOG_FORMAT,
+    LOG_QUEUE and LOG_SAMPLE_RATES.
+
+    Loggers named in LOG_LEVELS outside the app (e.g. "sqlalchemy.engine")
+    are given the same handler.
+    """
+    config = app.config
+    formatter: logging.Formatter
+    if config.get("LOG_FORMAT", "text") == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = DashFormatter("[%(asctime)s] ==> %(levelname)s in %(module)s: %(message)s")
+
+    with _setup_lock:
+        _stop_listener()
+        for logger, handler in _handled_loggers:
+            logger.removeHandler(handler)
+        _handled_loggers.clear()
+        app.logger.handlers.clear()
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        if config.get("LOG_QUEUE", True):
+            # The queue handler formats the record where it was logged, so the
+            # listener only writes strings and never touches app objects
+            handler = _FormattingQueueHandler(queue.Queue(config.get("LOG_QUEUE_SIZE", 10000)))
+            handler.setFormatter(formatter)
+            stream_handler.setFormatter(logging.Formatter("%(message)s"))
+            global _listener
+            _listener = logging.handlers.QueueListener(handler.queue, stream_handler)
+            _listener.start()
+        else:
+            handler = stream_handler
+            handler.setFormatter(formatter)
+
+        sample_rates = config.get("LOG_SAMPLE_RATES") or {}
+        if sample_rates:
+            handler.addFilter(SamplingFilter(sample_rates))
+
+        app.logger.addHandler(handler)
+        app.logger.setLevel(config.get("LOG_LEVEL") or ("DEBUG" if config.get("DEBUG") else "INFO"))
+
+        for name, level in (config.get("LOG_LEVELS") or {}).items():
+            logger = logging.getLogger(name)
+            logger.setLevel(level)
+            if name != app.logger.name and not name.startswith(f"{app.logger.name}."):
+                logger.addHandler(handler)
+                logger.propagate = False
+                _handled_loggers.append((logger, handler))
+
+
+def _caller_logger() -> logging.Logger:
+    # Frames: _caller_logger <- console_log/log_exception <- caller
+    return logging.getLogger(sys._getframe(2).f_globals.get("__name__", "app"))
+
+
+def console_log(label: str = "INFO", data: Any = None, *args: Any, level: str = "INFO", sample: Optional[float] = None) -> None:
     """
-    Print a formatted message to the console for visual clarity.
+    Log a labelled message, formatted with dashes for visual clarity.
 
     Args:
         label (str, optional): A label for the message, centered and surrounded by dashes. Defaults to 'INFO'.
-        data: The data to be printed. Can be of any type. Defaults to None.
+        data: The data to be logged, or a %-format string when `args` are given. Defaults to None.
+        *args: Arguments merged into `data` only if the record is emitted.
+        level (str, optional): Logging level name. Defaults to 'INFO'.
+        sample (float, optional): Share of calls actually logged, for high-volume events.
     """
-    
-    # Use Flask logger if in app context, otherwise fall back to a standalone logger
-    if has_app_context():
-        logger = current_app.logger
+    logger = _caller_logger()
+    levelno = logging.getLevelName(level.upper())
+    if not isinstance(levelno, int):
+        levelno = logging.INFO
+
+    if not logger.isEnabledFor(levelno):
+        return
+    if sample is not None and random.random() >= sample:
+        return
+
+    if args:
+        logger.log(levelno, data, *args, extra={"label": label}, stacklevel=2)
     else:
-        logger = logging.getLogger(__name__)
-        if not logger.handlers:  # Avoid duplicate handlers in tests
-            handler = logging.StreamHandler()
-            handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
-            logger.addHandler(handler)
-        logger.setLevel(logging.INFO)  # Default level, adjustable
-    
-    getattr(logger, level.lower(), logger.info)(f"\n\n{label:-^50}\n {data} \n{'//':-^50}\n\n", stacklevel=2)
+        logger.log(levelno, "%s", data, extra={"label": label}, stacklevel=2)
 
 
-def log_exception(label: str ="EXCEPTION", data: Any = "Nothing") -> None:
+def log_exception(label: str = "EXCEPTION", data: Any = "Nothing") -> None:
     """
     Log an exception with details to a logging handler for debugging.
 
@@ -53,15 +222,4 @@ def log_exception(label: str ="EXCEPTION", data: Any = "Nothing") -> None:
         label (str, optional): A label for the exception, centered and surrounded by dashes. Defaults to 'EXCEPTION'.
         data: Additional data to be logged along with the exception. Defaults to 'Nothing'.
     """
-    
-    if has_app_context():
-        logger = current_app.logger
-    else:
-        logger = logging.getLogger(__name__)
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
-            logger.addHandler(handler)
-        logger.setLevel(logging.ERROR)  # Default to ERROR for exceptions
-    
-    logger.exception(f"\n\n{label:-^50}\n {str(data)} \n {'//':-^50}\n\n", stacklevel=2)
\ No newline at end of file
+    _caller_logger().exception("%s", data, extra={"label": label}, stacklevel=2)
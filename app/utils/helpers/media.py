@@ -1,25 +1,15 @@
 '''
 This module defines helper functions for handling media operations in the QUAS Flask application.
 
-These functions assist with tasks such as saving media files to Cloudinary and adding media properties to the database.
+These functions assist with tasks such as validating uploads and handing them to the media pipeline.
 
 @author: Emmanuel Olowu
 @link: https://github.com/zeddyemy
 '''
-import os
-import tempfile
-from io import BufferedReader
 from datetime import date
-from werkzeug.utils import secure_filename
-from werkzeug.datastructures import FileStorage
-import cloudinary
-import cloudinary.uploader
 
-from ...extensions import db
 from ...models import Media
-from .loggers import console_log, log_exception
-from .basics import generate_random_string
-from config import Config
+from .loggers import console_log
 
 
 # Constants for file type validation
@@ -41,40 +31,17 @@ def validate_file_extension(extension) -> str:
     else:
         raise ValueError("Invalid file type")
 
-def upload_to_cloudinary(media_file: FileStorage, new_media_name, folder_path, resource_type):
-    """Upload the media file to Cloudinary."""
-    try:
-        return cloudinary.uploader.upload(
-            media_file,
-            resource_type=resource_type,
-            public_id=new_media_name,
-            folder=folder_path,
-        )
-    except Exception as e:
-        log_exception("Cloudinary upload failed", e)
-        raise e
-    
-
-def save_media_to_db(media_name: str, original_media_path: str) -> Media:
-    """Save the media record to the database."""
-    try:
-        new_media: Media = Media(filename=media_name, media_path=original_media_path)
-        db.session.add(new_media)
-        db.session.commit()
-        return new_media
-    except Exception as e:
-        db.session.rollback()
-        log_exception("Database commit failed", e)
-        raise e
-
-
 def save_media(media_file, filename=None) -> Media:
     """
-    Saves a media file (image or video) to Cloudinary and the database.
-    and then return the media instance after adding the media to Media Table
+    Stages a media file (image or video) and hands it to the media workers,
+    which store it (see `utils.media`).
+
+    The Media is returned right away, `pending`: its `media_path` is set
+    once a worker has stored the file.
 
     Args:
         media_file (werkzeug.datastructures.FileStorage): The media file object to be uploaded.
+        filename (str, optional): Name to use instead of the file's own.
 
     Returns:
         Media: The Media instance of the saved media in the database.
@@ -82,48 +49,11 @@ def save_media(media_file, filename=None) -> Media:
     Raises:
         ValueError: If the file type is not supported.
     """
+    from ..media import stage_media, dispatch_media
     
     console_log("media_file", media_file)
     
-    
-    # Generate a random string and append it to the original file name
-    rand_string: str = generate_random_string(8)
-    media_name: str = secure_filename(filename) if filename else secure_filename(media_file.filename) # Grab file name of the selected media
-    the_media_name, the_media_ext = os.path.splitext(os.path.basename(media_name)) # get the file name and extension
-    new_media_name: str = f"{the_media_name}-{rand_string}"
-    
-    
-    folder_path: str = get_folder_path() # create the path were image will be stored
-    resource_type = validate_file_extension(the_media_ext) # Check the file type and set the resource_type accordingly
-    
-    # Upload the media to Cloudinary
-    upload_result = upload_to_cloudinary(media_file, new_media_name, folder_path, resource_type)
-    
-    original_media_path: str = upload_result['secure_url'] # Get the URL of the uploaded media
-    
-    # Add the media properties to database
-    new_media = save_media_to_db(media_name, original_media_path)
+    new_media = stage_media(media_file, filename)
+    dispatch_media(new_media.id)
     
     return new_media
-
-
-def save_media_files_to_temp(media_files) -> list:
-    temp_dir = tempfile.mkdtemp()
-    media_file_paths = []
-    
-    console_log("media files", media_files)
-    if isinstance(media_files, list):
-        
-        for media_file in media_files:
-            filename = secure_filename(media_file.filename)
-            file_path = os.path.join(temp_dir, filename)
-            media_file.save(file_path)
-            media_file_paths.append(file_path)
-    else:
-        media_file = media_files
-        filename = secure_filename(media_file.filename)
-        file_path = os.path.join(temp_dir, filename)
-        media_file.save(file_path)
-        media_file_paths.append(file_path)
-
-    return media_file_paths
\ No newline at end of file
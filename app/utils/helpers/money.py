@@ -6,7 +6,8 @@ License: MIT, see LICENSE for more details.
 Package: BitnShop
 """
 
-from typing import Dict, TypedDict, NewType, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, TypedDict, NewType, Optional
 from decimal import Decimal, ROUND_HALF_UP
 
 from .settings import get_currency_settings
@@ -17,6 +18,83 @@ from ..constants.currencies import CURRENCY_SYMBOLS
 MoneyDecimal = NewType('MoneyDecimal', Decimal)
 
 
+class CurrencyFormatter:
+    """
+    Formats amounts for one set of currency settings.
+    
+    Everything that only depends on the settings (symbol, position,
+    separators, quantize exponent) is worked out once, when the formatter
+    is built, so `format` is a quantize, one f-string and a translate.
+    
+    Args:
+        currency_code: Currency code, e.g. "NGN"
+        decimal_places: Number of decimals (falls back to 2 if invalid)
+        currency_position: "left", "right", "left_space" or "right_space"
+        thousand_separator: Separator of thousands
+        decimal_separator: Separator of decimals
+    """
+    __slots__ = ("currency_code", "decimals", "exponent", "prefix", "suffix", "_separators")
+    
+    def __init__(self, currency_code: str, decimal_places: str | int, currency_position: str, thousand_separator: str, decimal_separator: str):
+        try:
+            decimals = int(decimal_places)
+            if decimals < 0 or decimals > 8:  # Sanity check
+                console_log("warning", "Invalid decimal setting detected, falling back to 2", level="WARNING")
+                raise ValueError
+        except ValueError:
+            console_log("warning", "Failed to parse decimal setting, falling back to 2", level="WARNING")
+            decimals = 2  # Fallback to standard
+        
+        self.currency_code = currency_code
+        self.decimals = decimals
+        self.exponent = Decimal(10) ** -decimals
+        
+        currency_symbol = CURRENCY_SYMBOLS.get(currency_code, currency_code)
+        self.prefix, self.suffix = {
+            "left": (currency_symbol, ""),
+            "right": ("", currency_symbol),
+            "left_space": (f"{currency_symbol} ", ""),
+            "right_space": ("", f" {currency_symbol}"),
+        }.get(currency_position, ("", ""))
+        
+        # Python formats with "," and "."; swapped in one pass for the configured ones
+        self._separators = str.maketrans({",": thousand_separator, ".": decimal_separator})
+    
+    def __repr__(self):
+        return f"<CurrencyFormatter {self.prefix}1{self.suffix} ({self.decimals} decimals)>"
+    
+    def quantize(self, value: str | float | Decimal) -> Decimal:
+        """Rounds a value to the currency's decimal places."""
+        return Decimal(str(value)).quantize(self.exponent, rounding=ROUND_HALF_UP)
+    
+    def format(self, amount) -> str:
+        """
+        Formats an amount, e.g. `Decimal("-1234.5")` -> "$-1,234.50".
+        """
+        amount = self.quantize(amount) if amount else Decimal(0)
+        sign = "-" if amount < 0 else ""
+        return f"{self.prefix}{sign}{f'{abs(amount):,.{self.decimals}f}'.translate(self._separators)}{self.suffix}"
+    
+    def format_many(self, amounts: Iterable) -> list[str]:
+        """Formats several amounts, in the order given."""
+        return [self.format(amount) for amount in amounts]
+
+
+@lru_cache(maxsize=16)
+def _build_currency_formatter(currency_settings: tuple) -> CurrencyFormatter:
+    return CurrencyFormatter(*currency_settings)
+
+
+def get_currency_formatter() -> CurrencyFormatter:
+    """
+    Returns the formatter of the current currency settings.
+    
+    Formatters are built once per distinct settings, so saving new currency
+    settings switches to a new formatter on the next call.
+    """
+    return _build_currency_formatter(tuple(get_currency_settings()))
+
+
 def quantize_amount(value: str | float | Decimal) -> Decimal:
     """
     Quantize a monetary value to the appropriate decimal places for the currency.
@@ -36,19 +114,7 @@ def quantize_amount(value: str | float | Decimal) -> Decimal:
         >>> quantize_currency(100.456)
         Decimal('100.46')
     """
-    _, decimal_setting, _, _, _ = get_currency_settings()
-    
-    try:
-        decimals = int(decimal_setting)
-        if decimals < 0 or decimals > 8:  # Sanity check
-            console_log("warning", "Invalid decimal setting detected, falling back to 2")
-            raise ValueError
-    except ValueError:
-        console_log("warning", "Failed to parse decimal setting, falling back to 2")
-        decimals = 2  # Fallback to standard
-        
-    exponent = Decimal(10) ** -decimals
-    return Decimal(str(value)).quantize(exponent, rounding=ROUND_HALF_UP)
+    return get_currency_formatter().quantize(value)
 
 
 def format_money(value) -> str:
@@ -66,43 +132,7 @@ def format_monetary_value( amount: Decimal ) -> str:
     Returns:
         A formatted string representation of the currency amount.
     """
-    amount = Decimal(amount) if amount else Decimal(0.00)
-    console_log("initial amount", amount)
-    
-    
-    # Retrieve currency settings
-    currency, decimal_places, currency_position, thousand_separator, decimal_separator = get_currency_settings()
-    decimal_places = int(decimal_places)
-    
-    # Format the amount using quantize
-    amount = quantize_amount(amount)
-    
-    amount_str = f"{amount:.{decimal_places}f}"
-    integer_part, decimal_part = amount_str.split(".")
-    
-    # Add commas to the integer part
-    integer_part = "{:,}".format(int(integer_part.replace(",", "")))
-    
-    integer_part = integer_part.replace(",", thousand_separator) # replace commas with thousand_separator
-    
-    #join formatted integers with formatted decimals
-    formatted_amount = f"{integer_part}{decimal_separator}{decimal_part}" if decimal_part else integer_part
-    
-    
-    currency_symbol = CURRENCY_SYMBOLS.get(currency, currency)
-    
-    # Apply currency position
-    match currency_position:
-        case "left":
-            return f"{currency_symbol}{formatted_amount}"
-        case "right":
-            return f"{formatted_amount}{currency_symbol}"
-        case "left_space":
-            return f"{currency_symbol} {formatted_amount}"
-        case "right_space":
-            return f"{formatted_amount} {currency_symbol}"
-        case _:
-            return formatted_amount
+    return get_currency_formatter().format(amount)
 
 
 
@@ -6,11 +6,14 @@ License: GNU, see LICENSE for more details.
 Package: StoreZed
 """
 from sqlalchemy import asc
-from cachetools import cached, TTLCache
 
 from ...extensions import db
 from ...models import NavigationMenu, NavMenuItem
 from .loggers import console_log
+from ..cache import CacheNamespace
+
+# Cached menus live for 5 minutes (300 seconds) or until a menu is saved
+nav_menu_cache = CacheNamespace("nav_menus", ttl=300, tags=("nav_menus",))
 
 
 def get_all_menu_items(parent_only=True) -> NavMenuItem:
@@ -26,10 +29,7 @@ def get_all_menu_items(parent_only=True) -> NavMenuItem:
     return menu_items
 
 
-# Create a cache with a Time-To-Live (TTL) of 5 minutes (300 seconds)
-cache = TTLCache(maxsize=100, ttl=300)
-
-@cached(cache)
+@nav_menu_cache.memoize
 def get_cached_menu_items(parent_only=True) -> list[dict[str, str]]:
     """
     Gets cached Navigation Items
@@ -55,11 +55,23 @@ def get_nav_menu(identifier: int | str) -> NavigationMenu:
     
     return nav_menu
 
-cache_nav_menus = TTLCache(maxsize=50, ttl=300)
-
-@cached(cache_nav_menus)
 def get_all_nav_menus() -> list[NavigationMenu]:
     """
     Returns all NavigationMenu objects ordered by creation or order.
     """
-    return NavigationMenu.query.order_by(NavigationMenu.created_at.asc()).all()
\ No newline at end of file
+    return NavigationMenu.query.order_by(NavigationMenu.created_at.asc()).all()
+
+
+@nav_menu_cache.memoize
+def get_cached_nav_menus() -> list[dict]:
+    """
+    Returns all navigation menus, with their items and children, as cached dicts.
+    
+    Plain dicts are cached instead of NavigationMenu objects so they can be
+    shared through any cache backend and used outside the session they were
+    loaded in.
+    """
+    return [
+        nav_menu.to_dict(include_items=True, items_children=True)
+        for nav_menu in get_all_nav_menus()
+    ]
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Cursor (keyset) pagination.
+
+Instead of `OFFSET n`, pages are addressed with opaque `after`/`before`
+tokens encoding the sort key of the last/first row of the current page, so
+fetching page 1000 costs the same index seek as fetching page 1, and no
+`COUNT(*)` runs unless a total is asked for.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from __future__ import annotations
+
+import json
+import base64
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from flask import request, has_request_context
+from werkzeug.exceptions import BadRequest
+from sqlalchemy import tuple_, text, literal
+from sqlalchemy.orm import Query
+
+from ...extensions import db
+
+
+class InvalidCursorError(BadRequest):
+    """A malformed `after`/`before` token; answered with a 400 when unhandled."""
+    description = "Invalid pagination cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encodes sort key values into an opaque, URL-safe token."""
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> list[Any]:
+    """Decodes a token made by `encode_cursor`."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        return [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in payload]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError() from e
+
+
+def wants_keyset_pagination() -> bool:
+    """True when the current request asks for cursor pagination."""
+    if not has_request_context():
+        return False
+    return any(request.args.get(arg) for arg in ("after", "before", "cursor"))
+
+
+def get_cursor_args() -> tuple[Optional[str], Optional[str]]:
+    """Returns the (after, before) cursors of the current request."""
+    if not has_request_context():
+        return None, None
+    return request.args.get("after") or None, request.args.get("before") or None
+
+
+class KeysetPagination:
+    """
+    A page of results from `keyset_paginate`.
+
+    Exposes the attributes of Flask-SQLAlchemy's `Pagination` the templates
+    and API controllers read (`items`, `per_page`, `has_next`, `has_prev`,
+    `total`, `pages`), plus the `next_cursor`/`prev_cursor` tokens. `total`
+    (and thus `pages`) is None unless it was requested.
+    """
+    is_keyset = True
+    page = None
+    prev_num = None
+    next_num = None
+
+    def __init__(self, items: list, per_page: int, next_cursor: Optional[str], prev_cursor: Optional[str], total: Optional[int] = None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    def __repr__(self):
+        return f"<KeysetPagination items: {len(self.items)}, has_next: {self.has_next}, has_prev: {self.has_prev}>"
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    @property
+    def pages(self) -> Optional[int]:
+        if self.total is None:
+            return None
+        return max(1, -(-self.total // self.per_page))
+
+    def to_dict(self) -> dict:
+        return {
+            "next_cursor": self.next_cursor,
+            "prev_cursor": self.prev_cursor,
+            "has_next": self.has_next,
+            "has_prev": self.has_prev,
+            "per_page": self.per_page,
+            "total": self.total,
+        }
+
+
+def approximate_count(query: Query) -> int:
+    """
+    Estimates the number of rows of a query.
+
+    On PostgreSQL the planner's estimate is used (no scan at all), other
+    databases fall back to an exact COUNT.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return query.order_by(None).count()
+
+    statement = query.order_by(None).statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _cursor_value(key_columns: Sequence, token: str):
+    values = decode_cursor(token)
+    if len(values) != len(key_columns):
+        raise InvalidCursorError()
+    
+    # Typed literals so e.g. datetimes are bound the way the column stores them
+    values = [literal(value, type_=column.type) for column, value in zip(key_columns, values)]
+    return tuple_(*values) if len(values) > 1 else values[0]
+
+
+def keyset_paginate(
+        query: Query,
+        key_columns: Sequence,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        per_page: int = 10,
+        with_total: bool = False,
+        approximate_total: bool = False,
+    ) -> KeysetPagination:
+    """
+    Paginates a query on a unique, descending sort key.
+
+    The query's own ORDER BY is replaced by `key_columns` (e.g.
+    `(CustomerOrder.created_at, CustomerOrder.id)`), which should end with
+    the primary key so the key is unique and match an index.
+
+    Args:
+        query: The filtered query
+        key_columns: Columns of the sort key, sorted descending
+        after: Cursor of the last row of the previous page (next page)
+        before: Cursor of the first row of the next page (previous page)
+        per_page: Number of items per page
+        with_total: Also compute the total number of rows
+        approximate_total: Use a planner estimate for the total where supported
+
+    Returns:
+        KeysetPagination: The page of items and the cursors around it
+
+    Raises:
+        InvalidCursorError: If a cursor cannot be decoded
+    """
+    key = tuple_(*key_columns) if len(key_columns) > 1 else key_columns[0]
+    base_query = query.order_by(None)
+    total = None
+
+    if with_total or approximate_total:
+        total = approximate_count(base_query) if approximate_total else base_query.count()
+
+    if before:
+        # Walk backwards, then put the page back in display order
+        page_query = base_query.filter(key > _cursor_value(key_columns, before)).order_by(*[column.asc() for column in key_columns])
+        rows = page_query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_prev, has_next = has_more, True
+    else:
+        page_query = base_query
+        if after:
+            page_query = page_query.filter(key < _cursor_value(key_columns, after))
+        page_query = page_query.order_by(*[column.desc() for column in key_columns])
+        rows = page_query.limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_next, has_prev = len(rows) > per_page, bool(after)
+
+    def cursor_of(item) -> str:
+        return encode_cursor([getattr(item, column.key) for column in key_columns])
+
+    next_cursor = cursor_of(items[-1]) if items and has_next else None
+    prev_cursor = cursor_of(items[0]) if items and has_prev else None
+
+    return KeysetPagination(items, per_page, next_cursor, prev_cursor, total)
@@ -0,0 +1,39 @@
+"""
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from typing import Optional
+from flask import request
+from flask_sqlalchemy.pagination import Pagination
+
+from ...models import Payment, Transaction
+
+
+def fetch_user_payments(user_id: int, page_num: Optional[int] = None, per_page: int = 10) -> Pagination:
+    """
+    Get a user's payments, newest first.
+    
+    Serialize the page with `Payment.to_dict_many`, which loads what
+    `to_dict` reads and converts the amounts in bulk.
+    """
+    if not page_num:
+        page_num = request.args.get("page", 1, type=int)
+    
+    query = Payment.query.filter_by(user_id=user_id).order_by(Payment.created_at.desc(), Payment.id.desc())
+    return query.paginate(page=page_num, per_page=per_page, error_out=False)
+
+
+def fetch_user_transactions(user_id: int, page_num: Optional[int] = None, per_page: int = 10) -> Pagination:
+    """
+    Get a user's transactions, newest first.
+    
+    Serialize the page with `Transaction.to_dict_many`.
+    """
+    if not page_num:
+        page_num = request.args.get("page", 1, type=int)
+    
+    query = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.created_at.desc(), Transaction.id.desc())
+    return query.paginate(page=page_num, per_page=per_page, error_out=False)
@@ -18,6 +18,7 @@ from ...models import Tag
 from config import Config
 from .basics import int_or_none, generate_slug
 from .loggers import log_exception, console_log
+from .pagination import KeysetPagination, keyset_paginate, wants_keyset_pagination, get_cursor_args
 
 def get_tag_names() -> list[str]:
     tags = db.session.query(Tag.name).order_by(desc('id')).all()
@@ -56,7 +57,8 @@ def fetch_all_tags(
         page_num: Optional[int] = None,
         paginate: Optional[bool] = False,
         search_term: Optional[str] = None,
-    ) -> list[Tag] | Pagination:
+        keyset: Optional[bool] = None,
+    ) -> list[Tag] | Pagination | KeysetPagination:
     '''
     Get tags from the database with optional filtering and pagination.
 
@@ -66,6 +68,7 @@ def fetch_all_tags(
         page_num: Page number for pagination (default from request if None)
         paginate: Return pagination object when True
         search_term: Filter term for tag search
+        keyset: Use cursor pagination (defaults to True when the request has an `after`/`before`/`cursor` arg)
 
     Returns:
         Pagination object or list of Tag instances
@@ -87,6 +90,10 @@ def fetch_all_tags(
     # Apply consistent ordering
     query = query.order_by(Tag.id.desc())
     
+    if paginate and (keyset if keyset is not None else wants_keyset_pagination()):
+        after, before = get_cursor_args()
+        return keyset_paginate(query, (Tag.id,), after=after, before=before, per_page=10)
+    
     if paginate:
         pagination = query.paginate(page=page_num, per_page=10, error_out=False)
         
@@ -22,6 +22,8 @@ from .media import save_media
 from .basics import generate_slug
 from .loggers import log_exception, console_log
 from .product_tags import save_tags
+from .category_tree import get_descendant_ids_query
+from .pagination import KeysetPagination, keyset_paginate, wants_keyset_pagination, get_cursor_args
 
 
 def fetch_all_products(
@@ -31,7 +33,9 @@ def fetch_all_products(
         page_num: Optional[int] = None,
         search_term: Optional[str] = None,
         paginate: bool = True,
-    ) -> Pagination | list[Product]:
+        include_subcategories: bool = True,
+        keyset: Optional[bool] = None,
+    ) -> Pagination | KeysetPagination | list[Product]:
     """
     Get products from the database with optional filtering and pagination.
     
@@ -41,9 +45,12 @@ def fetch_all_products(
     Args:
         user_id: Filter products by owner user ID
         cat_id: Filter products by category ID
+        include_subcategories: Also include products of every descendant of `cat_id`
         page_num: Page number for pagination (default from request if None)
         search_term: Filter term for product search
         paginate: Return pagination object when True
+        keyset: Use cursor pagination (defaults to True when the request has an `after`/`before`/`cursor` arg),
+            ignored when searching as results are ordered by relevance
 
     Returns:
         Pagination object or list of Product instances
@@ -63,18 +70,29 @@ def fetch_all_products(
     # Apply combined filters
     if user_id is not None:
         query = query.filter(Product.user_id == user_id)
-    if cat_id is not None:
+    if cat_id is not None and include_subcategories:
+        # One indexed join through the closure table, whatever the depth of the tree
+        query = query.filter(Product.id.in_(
+            db.select(product_category.c.product_id)
+            .where(product_category.c.category_id.in_(get_descendant_ids_query(cat_id)))
+        ))
+    elif cat_id is not None:
         query = query.filter(Product.categories.any(Category.id == cat_id))
     if tag_id is not None:
         query = query.filter(Product.tags.any(Tag.id == tag_id))
     
-    # Apply search filters
+    # Apply search filters (ordered by relevance when searching)
     query = Product.add_search_filters(query, search_term)
     
     # Apply consistent ordering
     query = query.order_by(Product.id.desc())
     
-    # Execute query with/without pagination
+    # Execute query with/without pagination. Cursors are keyed on the id, so
+    # searches (ordered by relevance) are always paginated by offset
+    if paginate and not search_term and (keyset if keyset is not None else wants_keyset_pagination()):
+        after, before = get_cursor_args()
+        return keyset_paginate(query, (Product.id,), after=after, before=before, per_page=10)
+    
     if paginate:
         pagination: Pagination = query.paginate(page=page_num, per_page=10, error_out=False)
         return pagination
@@ -127,10 +145,10 @@ def save_product(form_data: dict, pub_status: str ='published') -> Product:
         if pid:
             product = fetch_product(pid)
         
-        console_log("category_ids", category_ids)
-        console_log("product_img", product_img)
-        console_log("pid", pid)
-        console_log("product", product)
+        console_log("category_ids", category_ids, level="DEBUG")
+        console_log("product_img", product_img, level="DEBUG")
+        console_log("pid", pid, level="DEBUG")
+        console_log("product", product, level="DEBUG")
         
         if not product_img:
             media_id = None
@@ -155,12 +173,12 @@ def save_product(form_data: dict, pub_status: str ='published') -> Product:
         else:
             selected_categories = Category.query.filter(Category.id.in_(category_ids)).all()
         
-        console_log("selected_categories", selected_categories)
+        console_log("selected_categories", selected_categories, level="DEBUG")
         
         # Re-associate categories with the current session if necessary
         selected_categories = [db.session.merge(cat) for cat in selected_categories]
         
-        console_log("selected_categories", selected_categories)
+        console_log("selected_categories", selected_categories, level="DEBUG")
         
         if tags:
             tags = save_tags(tags, session=db.session)
@@ -0,0 +1,104 @@
+"""
+Sequence allocators for human readable numbers (e.g. order numbers).
+
+On PostgreSQL values come from a native sequence (`nextval` needs no lock
+and no scan). Elsewhere they come from a `SequenceCounter` row, advanced
+in the caller's transaction so a rolled back insert gives its value back.
+
+With a block size above 1 values are reserved in blocks: Postgres caches
+them per connection (the sequence's CACHE), other databases reserve a
+block per worker in a short transaction of its own.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from __future__ import annotations
+
+import os
+from threading import Lock
+from typing import Callable, Optional
+
+from sqlalchemy import Connection, Sequence, text
+
+from ...extensions import db
+from ...models import SequenceCounter
+
+
+class SequenceAllocator:
+    """
+    Hands out unique, increasing integers for a named sequence.
+
+    Args:
+        name: Name of the counter row (and of the native sequence, if any)
+        sequence: Native sequence to use on PostgreSQL
+        seed: Returns the last value already in use, for sequences that
+            have to take over from existing rows
+        block_size: Number of values reserved per round trip
+    """
+
+    def __init__(self, name: str, sequence: Optional[Sequence] = None, seed: Optional[Callable[[Connection], int]] = None, block_size: int = 1):
+        self.name = name
+        self.sequence = sequence
+        self.seed = seed
+        self.block_size = max(1, int(block_size))
+
+        self._lock = Lock()
+        self._pid = None
+        self._next_value = 1
+        self._last_value = 0
+
+    def __repr__(self):
+        return f"<SequenceAllocator {self.name} (block: {self.block_size})>"
+
+    def next_value(self, connection: Optional[Connection] = None) -> int:
+        """
+        Returns the next value of the sequence.
+
+        Args:
+            connection: Connection of the transaction inserting the row
+                (defaults to the session's)
+        """
+        connection = connection or db.session.connection()
+        dialect = connection.dialect.name
+
+        if dialect == "postgresql" and self.sequence is not None:
+            return connection.execute(db.select(self.sequence.next_value())).scalar()
+
+        # SQLite allows a single writer: a block reserved on another
+        # connection would wait for the transaction that needs it
+        if self.block_size > 1 and dialect != "sqlite":
+            return self._next_from_block()
+
+        return SequenceCounter.reserve(connection, self.name, 1, self.seed)
+
+    def _next_from_block(self) -> int:
+        with self._lock:
+            # Blocks reserved before a fork must not be shared with the parent
+            if self._pid != os.getpid() or self._next_value > self._last_value:
+                with db.engine.begin() as connection:
+                    self._last_value = SequenceCounter.reserve(connection, self.name, self.block_size, self.seed)
+                self._next_value = self._last_value - self.block_size + 1
+                self._pid = os.getpid()
+
+            value = self._next_value
+            self._next_value += 1
+            return value
+
+    def sync(self, connection: Connection) -> None:
+        """
+        Moves a native sequence past the values already in use, e.g. for rows
+        created before the sequence existed. Counter rows seed themselves.
+        """
+        if connection.dialect.name != "postgresql" or self.sequence is None or not self.seed:
+            return
+
+        last_used = self.seed(connection)
+        if last_used:
+            sequence_name = connection.dialect.identifier_preparer.format_sequence(self.sequence)
+            connection.execute(
+                text(f"SELECT setval(:name, GREATEST(:value, (SELECT last_value FROM {sequence_name})))"),
+                {"name": sequence_name, "value": last_used}
+            )
@@ -5,15 +5,126 @@ Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
 License: GNU, see LICENSE for more details.
 Package: StoreZed
 """
-from flask import request
-from typing import List
-from cachetools import cached, TTLCache
+from threading import Lock
+from types import MappingProxyType
+from typing import Optional
+from flask import g, has_app_context
 
 from ...extensions import db
 from ...enums.payments import PaymentMethods
 from ...enums.settings import GeneralSettingsKeys, PaymentMethodSettingKeys
-from ...models.settings import GeneralSetting, PaymentMethodSettings
+from ...models.settings import GeneralSetting, PaymentMethodSettings, SettingsVersion
 from .loggers import console_log
+from ..cache import CacheNamespace
+
+
+class SettingsSnapshot:
+    """
+    Immutable view of every general and payment method setting at a given
+    settings version.
+    
+    One snapshot is shared by all requests served by a worker process. It is
+    only rebuilt when the version counter in the database moves, which is what
+    lets a change saved on one worker show up on every other worker on their
+    next request.
+    """
+    __slots__ = ("version", "general", "payment_methods")
+    
+    def __init__(self, version: int, general: dict[str, str], payment_methods: dict[str, dict[str, str]]):
+        self.version = version
+        self.general = MappingProxyType(general)
+        self.payment_methods = MappingProxyType({
+            method: MappingProxyType(settings) for method, settings in payment_methods.items()
+        })
+    
+    def __repr__(self):
+        return f'<SettingsSnapshot version: {self.version}>'
+    
+    def get(self, key: GeneralSettingsKeys | str, default=None) -> str | None:
+        value = self.general.get(str(key))
+        return value if value else default
+    
+    def payment_method(self, method: PaymentMethods | str) -> MappingProxyType:
+        return self.payment_methods.get(str(method), MappingProxyType({}))
+
+
+_snapshot: Optional[SettingsSnapshot] = None
+_snapshot_lock = Lock()
+
+# Raw settings per version, shared with the other workers when the cache backend is
+settings_cache = CacheNamespace("settings", ttl=86400)
+
+
+def _load_settings_data() -> tuple[dict[str, str], dict[str, dict[str, str]]]:
+    """Loads all settings with one query per settings table."""
+    general = {
+        key: value for key, value in db.session.execute(
+            db.select(GeneralSetting.key, GeneralSetting.value)
+        )
+    }
+    
+    payment_methods: dict[str, dict[str, str]] = {}
+    for method, key, value in db.session.execute(
+        db.select(PaymentMethodSettings.method, PaymentMethodSettings.key, PaymentMethodSettings.value)
+    ):
+        payment_methods.setdefault(method, {})[key] = value
+    
+    return general, payment_methods
+
+
+def _load_settings_snapshot(version: int) -> SettingsSnapshot:
+    general, payment_methods = settings_cache.get_or_set(str(version), _load_settings_data)
+    return SettingsSnapshot(version, general, payment_methods)
+
+
+def get_settings_snapshot() -> SettingsSnapshot:
+    """
+    Returns the settings snapshot for the current request.
+    
+    The snapshot is resolved at most once per app context (i.e. per request):
+    the first call checks the version counter and reuses the process-wide
+    snapshot when it is still current, every later call in the same request
+    is free.
+
+    Returns:
+        SettingsSnapshot: The current settings snapshot.
+    """
+    global _snapshot
+    
+    if has_app_context() and "settings_snapshot" in g:
+        return g.settings_snapshot
+    
+    version = SettingsVersion.current()
+    snapshot = _snapshot
+    
+    if snapshot is None or snapshot.version != version:
+        with _snapshot_lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = _load_settings_snapshot(version)
+                _snapshot = snapshot
+    
+    if has_app_context():
+        g.settings_snapshot = snapshot
+    
+    return snapshot
+
+
+def invalidate_settings_snapshot() -> None:
+    """
+    Marks settings as changed.
+    
+    Bumps the shared version counter (in the current transaction) so every
+    worker reloads its snapshot, and drops the snapshot cached for the
+    current request.
+    """
+    global _snapshot
+    
+    SettingsVersion.bump()
+    _snapshot = None
+    
+    if has_app_context():
+        g.pop("settings_snapshot", None)
 
 
 def get_default_setting(key: GeneralSettingsKeys) -> str:
@@ -39,7 +150,7 @@ def get_default_setting(key: GeneralSettingsKeys) -> str:
         current_domain = f"{scheme}://{server_name}"
     
     
-    console_log("current_domain", current_domain)
+    console_log("current_domain", current_domain, level="DEBUG")
     
     defaults = {
         GeneralSettingsKeys.SITE_TITLE: "My E-commerce Site",
@@ -64,17 +175,12 @@ def get_all_general_settings() -> dict[str, str]:
     Returns:
         dict[str, str]: A dictionary where the keys are setting names and values are their stored values.
     """
-    general_settings: list[GeneralSetting] = GeneralSetting.query.all()
-    
-    return {setting.key: setting.value for setting in general_settings}
+    return dict(get_settings_snapshot().general)
 
-# Create a cache with a Time-To-Live (TTL) of 12 hour (43200 seconds)
-cache = TTLCache(maxsize=100, ttl=18000)
 
-@cached(cache) # Cache settings to optimize performance
 def get_general_setting(key: GeneralSettingsKeys, default=None) -> str | None:
     """
-    Retrieves a specific general setting value from the database.
+    Retrieves a specific general setting value from the settings snapshot.
 
     Args:
         key (GeneralSettingsKeys): The settings key Enum.
@@ -83,10 +189,7 @@ def get_general_setting(key: GeneralSettingsKeys, default=None) -> str | None:
     Returns:
         str: The stored setting value, or default.
     """
-    
-    setting: GeneralSetting = GeneralSetting.query.filter_by(key=str(key)).first()
-    
-    return setting.value if setting and setting.value else default
+    return get_settings_snapshot().get(key, default)
 
 
 def save_general_setting(key: GeneralSettingsKeys, value: str):
@@ -98,32 +201,30 @@ def save_general_setting(key: GeneralSettingsKeys, value: str):
         value (str): The value to store.
     """
     setting: GeneralSetting = GeneralSetting.query.filter_by(key=str(key)).first()
-    console_log("setting", setting)
+    console_log("setting", setting, level="DEBUG")
     
     if setting:
         setting.value = value
-        db.session.merge(setting)
     else:
-        setting = GeneralSetting(key=key, value=value)
-        db.session.merge(setting)
+        setting = GeneralSetting(key=str(key), value=value)
         db.session.add(setting)
     
-    
+    invalidate_settings_snapshot()  # Makes every worker reload its settings
     db.session.commit()
-    get_general_setting.cache_clear()  # Clears cache to reflect new values
 
 def get_currency_settings() -> tuple:
     """Get all currency-related settings."""
+    snapshot = get_settings_snapshot()
     return (
-        get_general_setting( GeneralSettingsKeys.CURRENCY, 'USD' ), # currency_code
+        snapshot.get( GeneralSettingsKeys.CURRENCY, 'USD' ), # currency_code
 
-        get_general_setting( GeneralSettingsKeys.NUMBER_OF_DECIMALS, '2' ), # decimal_places
+        snapshot.get( GeneralSettingsKeys.NUMBER_OF_DECIMALS, '2' ), # decimal_places
 
-        get_general_setting( GeneralSettingsKeys.CURRENCY_POSITION, 'left' ),
+        snapshot.get( GeneralSettingsKeys.CURRENCY_POSITION, 'left' ),
 
-        get_general_setting( GeneralSettingsKeys.THOUSAND_SEPARATOR, ','),
+        snapshot.get( GeneralSettingsKeys.THOUSAND_SEPARATOR, ','),
 
-        get_general_setting( GeneralSettingsKeys.DECIMAL_SEPARATOR, '.'),
+        snapshot.get( GeneralSettingsKeys.DECIMAL_SEPARATOR, '.'),
 
     )
 
@@ -137,8 +238,7 @@ def get_payment_method_settings(method: PaymentMethods) -> dict:
     Returns:
         dict: A dictionary of all settings for the method.
     """
-    settings: PaymentMethodSettings = PaymentMethodSettings.query.filter_by(method=str(method)).all()
-    return {setting.key: setting.value for setting in settings}
+    return dict(get_settings_snapshot().payment_method(method))
 
 
 def get_payment_method_setting(method: PaymentMethods, key: PaymentMethodSettingKeys) -> str | None:
@@ -152,8 +252,7 @@ def get_payment_method_setting(method: PaymentMethods, key: PaymentMethodSetting
     Returns:
         str: The setting value, or None if not found.
     """
-    setting: PaymentMethodSettings = PaymentMethodSettings.query.filter_by(method=str(method), key=str(key)).first()
-    return setting.value if setting else None
+    return get_settings_snapshot().payment_method(method).get(str(key))
 
 def save_payment_method_setting(method: PaymentMethods, key: PaymentMethodSettingKeys, value: str):
     """
@@ -172,6 +271,7 @@ def save_payment_method_setting(method: PaymentMethods, key: PaymentMethodSettin
         setting = PaymentMethodSettings(method=str(method), key=str(key), value=value)
         db.session.add(setting)
     
+    invalidate_settings_snapshot()  # Makes every worker reload its settings
     db.session.commit()
 
 
@@ -1,27 +1,64 @@
 """
+Admin dashboard statistics, read from the `DailyStat` and `StatCounter`
+rollups (plus the `StatDelta` rows not folded into them yet) instead of
+counting and summing whole tables on every load.
+
 Author: Emmanuel Olowu
 Link: https://github.com/zeddyemy
 Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
 License: GNU, see LICENSE for more details.
 """
+from datetime import date as date_type
+from decimal import Decimal
 from typing import Any, Optional
 from flask import request
 from sqlalchemy import func
 
 from ...extensions import db
-from ...models import AppUser, Product, Category, Tag, CustomerOrder, Wallet, Payment
+from ...models import AppUser, Product, Category, Tag, CustomerOrder, Wallet, Payment, DailyStat, StatCounter, StatDelta
+from ...models.stats import apply_stat_changes
 from ...enums import PaymentStatus, PaymentMethods
-from ..date_time import timedelta, date
-from .money import quantize_amount, format_monetary_value
+from ..date_time import DateTimeUtils, timedelta
+from .money import quantize_amount
 from .loggers import console_log, log_exception
 
-def get_stats_for_admin(period: Optional[str] = None) -> dict[str, Any]:
-    
-    if not period:
-        period = request.args.get('period', 'year')  # Default to 'year'
-    
-    today = date.today()
-    
+STAT_METRICS = ("payments", "orders", "users", "products")
+
+# Deltas folded into the rollups per transaction
+FOLD_BATCH_SIZE = 10000
+
+
+def _daily_rows():
+    """The daily rollups and the daily deltas not folded into them yet."""
+    return db.union_all(
+        db.select(DailyStat.day, DailyStat.metric, DailyStat.dimension, DailyStat.count, DailyStat.amount),
+        db.select(StatDelta.day, StatDelta.metric, StatDelta.dimension, StatDelta.count, StatDelta.amount)
+        .where(StatDelta.day.is_not(None)),
+    ).subquery()
+
+
+def get_stat_counters() -> dict[str, tuple[int, Decimal]]:
+    """Returns the running totals as {name: (count, amount)}, unfolded deltas included."""
+    counters = {counter.name: (counter.count, Decimal(counter.amount or 0)) for counter in StatCounter.query.all()}
+    for name, count, amount in db.session.execute(
+        db.select(StatDelta.metric, func.sum(StatDelta.count), func.sum(StatDelta.amount))
+        .where(StatDelta.day.is_(None))
+        .group_by(StatDelta.metric)
+    ).all():
+        total_count, total_amount = counters.get(name, (0, Decimal(0)))
+        counters[name] = (total_count + int(count or 0), total_amount + Decimal(amount or 0))
+    return counters
+
+
+def get_period_range(period: str) -> tuple[date_type, date_type]:
+    """
+    Returns the (start, end) days of a dashboard period, end excluded.
+
+    Raises:
+        ValueError: If the period is not day, yesterday, month or year
+    """
+    today = DateTimeUtils.aware_utcnow().date()  # rollups are kept per UTC day
+
     if period == 'day':
         start_date = today
         end_date = today + timedelta(days=1)
@@ -36,38 +73,229 @@ def get_stats_for_admin(period: Optional[str] = None) -> dict[str, Any]:
         end_date = start_date.replace(year=start_date.year + 1)
     else:
         raise ValueError("Invalid period specified")
-    
-    # Fetch counts for products, categories, tags, and users
-    total_products = Product.query.count()
-    total_categories = Category.query.count()
-    total_tags = Tag.query.count()
-    total_users = AppUser.query.count()
-    
-    # Fetch the total wallet balance (sum of all user wallet balances)
-    total_wallet_balance = db.session.query(db.func.sum(Wallet._balance)).scalar() or 0.00
-    
+
+    return start_date, end_date
+
+
+def get_stats_for_admin(period: Optional[str] = None) -> dict[str, Any]:
+
+    if not period:
+        period = request.args.get('period', 'year')  # Default to 'year'
+
+    start_date, end_date = get_period_range(period)
+
+    counters = get_stat_counters()
+
+    def count_of(name: str) -> int:
+        return counters[name][0] if name in counters else 0
+
+    # Period totals per metric and dimension, from the daily rollups
+    daily = _daily_rows()
+    period_rows = db.session.execute(
+        db.select(daily.c.metric, daily.c.dimension, func.sum(daily.c.count), func.sum(daily.c.amount))
+        .where(daily.c.day >= start_date, daily.c.day < end_date)
+        .group_by(daily.c.metric, daily.c.dimension)
+    ).all()
+
+    payments_by_status: dict[str, dict] = {}
+    orders_by_status: dict[str, int] = {}
+    new_users = new_products = 0
+    total_payments = Decimal(0)
+
+    for metric, dimension, count, amount in period_rows:
+        if metric == "payments":
+            status, _, method = dimension.partition(":")
+            totals = payments_by_status.setdefault(status, {"count": 0, "amount": Decimal(0)})
+            totals["count"] += count
+            totals["amount"] += Decimal(amount or 0)
+
+            # Successful paid amounts, excluding "wallet" payments
+            if status == str(PaymentStatus.COMPLETED) and method != str(PaymentMethods.WALLET):
+                total_payments += Decimal(amount or 0)
+        elif metric == "orders":
+            orders_by_status[dimension] = orders_by_status.get(dimension, 0) + count
+        elif metric == "users":
+            new_users += count
+        elif metric == "products":
+            new_products += count
+
     # Fetch the last 5 orders, ordered by creation date
     recent_orders = CustomerOrder.query.order_by(CustomerOrder.created_at.desc()).limit(5).all()
-    
+
     recent_products = Product.query.order_by(Product.created_at.desc()).limit(5).all()
-    
-    # Calculate total successful paid amounts by every user, excluding "wallet" payments
-    total_payments = db.session.query(func.sum(Payment.amount)).filter(
-        Payment.created_at >= start_date,
-        Payment.created_at < end_date,
-        Payment.payment_method != str(PaymentMethods.WALLET),
-        Payment.status == str(PaymentStatus.COMPLETED)
-    ).scalar() or 0.00
-    
+
     stats = {
-        "total_products": total_products,
-        "total_categories": total_categories,
-        "total_tags": total_tags,
-        "total_users": total_users,
-        "total_wallet_balance": quantize_amount(total_wallet_balance),
+        "period": period,
+        "total_products": count_of("products"),
+        "total_categories": count_of("categories"),
+        "total_tags": count_of("tags"),
+        "total_users": count_of("users"),
+        "total_wallet_balance": quantize_amount(counters["wallet_balance"][1] if "wallet_balance" in counters else 0),
         "total_payments": quantize_amount(total_payments),
+        "new_users": new_users,
+        "new_products": new_products,
+        "orders_by_status": orders_by_status,
+        "payments_by_status": payments_by_status,
         "recent_orders": recent_orders,
         "recent_products": recent_products,
     }
-    
-    return stats
\ No newline at end of file
+
+    return stats
+
+
+def get_stat_series(metric: str, days: int = 30, dimension: Optional[str] = None) -> list[dict]:
+    """
+    Returns the daily values of a metric for the last `days` days, for charts.
+
+    Args:
+        metric: One of STAT_METRICS
+        days: Number of days, today included
+        dimension: Only count this dimension; for payments either a status
+            ("completed") or a status and method ("completed:paystack")
+
+    Returns:
+        list[dict]: One {"day", "count", "amount"} per day, oldest first,
+            days without data included
+    """
+    if metric not in STAT_METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+
+    end_date = DateTimeUtils.aware_utcnow().date() + timedelta(days=1)
+    start_date = end_date - timedelta(days=max(1, days))
+
+    daily = _daily_rows()
+    query = (
+        db.select(daily.c.day, func.sum(daily.c.count), func.sum(daily.c.amount))
+        .where(daily.c.metric == metric, daily.c.day >= start_date, daily.c.day < end_date)
+        .group_by(daily.c.day)
+    )
+    if dimension:
+        query = query.where(db.or_(daily.c.dimension == dimension, daily.c.dimension.startswith(f"{dimension}:")))
+
+    values = {_as_date(day): (count, amount) for day, count, amount in db.session.execute(query).all()}
+
+    series = []
+    day = start_date
+    while day < end_date:
+        count, amount = values.get(day, (0, 0))
+        series.append({"day": day.isoformat(), "count": int(count or 0), "amount": quantize_amount(amount or 0)})
+        day += timedelta(days=1)
+
+    return series
+
+
+def _day_of(column):
+    # Rollups are kept per UTC day
+    if db.engine.dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", column))
+    return func.date(column)
+
+
+def _as_date(value) -> date_type:
+    return value if isinstance(value, date_type) else date_type.fromisoformat(str(value)[:10])
+
+
+def _rollup_rows() -> tuple[list[dict], list[dict]]:
+    """Daily rows and counters computed from the source tables."""
+    daily_rows = []
+
+    payment_day = _day_of(Payment.created_at)
+    for day, status, method, count, amount in db.session.execute(
+        db.select(payment_day, Payment.status, Payment.payment_method, func.count(), func.sum(Payment.amount))
+        .group_by(payment_day, Payment.status, Payment.payment_method)
+    ).all():
+        daily_rows.append({"day": _as_date(day), "metric": "payments", "dimension": f"{status}:{method}", "count": count, "amount": amount or 0})
+
+    order_day = _day_of(CustomerOrder.created_at)
+    for day, status, count in db.session.execute(
+        db.select(order_day, CustomerOrder.status, func.count()).group_by(order_day, CustomerOrder.status)
+    ).all():
+        daily_rows.append({"day": _as_date(day), "metric": "orders", "dimension": status, "count": count, "amount": 0})
+
+    for metric, column in (("users", AppUser.date_joined), ("products", Product.created_at)):
+        day_column = _day_of(column)
+        for day, count in db.session.execute(db.select(day_column, func.count()).group_by(day_column)).all():
+            daily_rows.append({"day": _as_date(day), "metric": metric, "dimension": "", "count": count, "amount": 0})
+
+    counter_rows = [
+        {"name": name, "count": db.session.query(model).count(), "amount": 0}
+        for name, model in (("products", Product), ("categories", Category), ("tags", Tag), ("users", AppUser), ("orders", CustomerOrder))
+    ]
+    counter_rows.append({
+        "name": "wallet_balance",
+        "count": 0,
+        "amount": db.session.query(func.coalesce(func.sum(Wallet._balance), 0)).scalar(),
+    })
+    return daily_rows, counter_rows
+
+
+def rebuild_stats() -> dict[str, int]:
+    """
+    Recomputes every rollup from the source tables, in the current transaction.
+
+    Corrects drift from changes the flush listener cannot see (bulk
+    statements, cascades done by the database). Only the deltas that existed
+    when it started are dropped, so writes committed while it runs are
+    folded in later rather than lost.
+
+    Returns:
+        dict: Number of daily rows and counters written
+    """
+    max_delta_id = db.session.execute(db.select(func.max(StatDelta.id))).scalar()
+    daily_rows, counter_rows = _rollup_rows()
+
+    connection = db.session.connection()
+    if max_delta_id is not None:
+        connection.execute(db.delete(StatDelta.__table__).where(StatDelta.__table__.c.id <= max_delta_id))
+    connection.execute(db.delete(DailyStat.__table__))
+    connection.execute(db.delete(StatCounter.__table__))
+    apply_stat_changes(connection, daily_rows, counter_rows)
+
+    console_log("stats rebuilt", f"{len(daily_rows)} daily rows, {len(counter_rows)} counters")
+    return {"daily_rows": len(daily_rows), "counters": len(counter_rows)}
+
+
+def fold_stat_deltas(batch_size: int = FOLD_BATCH_SIZE) -> int:
+    """
+    Adds the pending `StatDelta` rows to the rollups and deletes them, one
+    committed batch at a time. Meant to run periodically (`flask stats fold`).
+
+    A batch another fold deleted first is rolled back, so concurrent runs
+    never count a delta twice.
+
+    Returns:
+        int: Number of deltas folded
+    """
+    folded = 0
+    while True:
+        deltas = db.session.execute(
+            db.select(StatDelta.id, StatDelta.day, StatDelta.metric, StatDelta.dimension, StatDelta.count, StatDelta.amount)
+            .order_by(StatDelta.id)
+            .limit(batch_size)
+        ).all()
+        if not deltas:
+            return folded
+
+        daily: dict[tuple, list] = {}
+        counters: dict[str, list] = {}
+        for _, day, metric, dimension, count, amount in deltas:
+            totals = daily.setdefault((_as_date(day), metric, dimension), [0, Decimal(0)]) if day is not None else counters.setdefault(metric, [0, Decimal(0)])
+            totals[0] += count
+            totals[1] += Decimal(amount or 0)
+
+        connection = db.session.connection()
+        deleted = connection.execute(db.delete(StatDelta.__table__).where(StatDelta.id.in_([delta.id for delta in deltas]))).rowcount
+        if deleted != len(deltas):
+            db.session.rollback()
+            return folded
+
+        apply_stat_changes(
+            connection,
+            [{"day": day, "metric": metric, "dimension": dimension, "count": count, "amount": amount} for (day, metric, dimension), (count, amount) in daily.items()],
+            [{"name": name, "count": count, "amount": amount} for name, (count, amount) in counters.items()],
+        )
+        db.session.commit()
+        folded += len(deltas)
+
+        if len(deltas) < batch_size:
+            return folded
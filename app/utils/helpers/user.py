@@ -5,12 +5,14 @@ Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
 License: GNU, see LICENSE for more details.
 Package: StoreZed
 """
-from flask import request
-from typing import List
+from flask import request, g
+from typing import List, Optional
 from flask_jwt_extended import get_jwt_identity
 from flask_login import current_user as session_user
 
-from ...models import AppUser, Profile
+from ...extensions import db
+from ...models import AppUser, Profile, Role, UserRole, Wallet, PrincipalVersion
+from ..cache import Principal, principal_cache
 from .basics import generate_random_string
 from .loggers import console_log
 
@@ -20,7 +22,7 @@ def get_current_user() -> AppUser:
         # API request, use JWT identity
         jwt_identity = get_jwt_identity()
     
-        console_log("jwt_identity", jwt_identity)
+        console_log("jwt_identity", jwt_identity, level="DEBUG")
     
         current_user_id = jwt_identity.get("user_id", 0)
         current_user: AppUser = AppUser.query.get(current_user_id)
@@ -31,6 +33,61 @@ def get_current_user() -> AppUser:
     return current_user
 
 
+def load_principal(user_id: int) -> Optional[Principal]:
+    """Reads the id, role names and wallet id of a user in one query."""
+    rows = db.session.execute(
+        db.select(AppUser.id, Wallet.id, Role.name)
+        .outerjoin(Wallet, Wallet.user_id == AppUser.id)
+        .outerjoin(UserRole, UserRole.app_user_id == AppUser.id)
+        .outerjoin(Role, Role.id == UserRole.role_id)
+        .where(AppUser.id == user_id)
+    ).all()
+    
+    if not rows:
+        return None
+    
+    roles = frozenset(role_name.value.strip().lower() for _, _, role_name in rows if role_name is not None)
+    return Principal(user_id=rows[0][0], roles=roles, wallet_id=rows[0][1])
+
+
+def get_principal(user_id: Optional[int | str]) -> Optional[Principal]:
+    """
+    Returns the principal of a user, from the request, the cache, or the
+    database (in that order).
+    
+    A cached principal is only used while the user's `PrincipalVersion` is
+    the one it was loaded at (one primary key lookup per request), so a
+    role revoked through another worker takes effect at once even when the
+    cache backend is not shared.
+    
+    Returns:
+        Principal | None: None if there is no such user
+    """
+    if not user_id:
+        return None
+    user_id = int(user_id)
+    
+    memo: dict = g.setdefault("_principals", {})
+    if user_id not in memo:
+        version = PrincipalVersion.current(user_id)
+        cached = principal_cache.get(str(user_id))
+        if cached is not None and cached[0] == version:
+            memo[user_id] = cached[1]
+        else:
+            memo[user_id] = load_principal(user_id)
+            principal_cache.set(str(user_id), (version, memo[user_id]))
+    return memo[user_id]
+
+
+def get_current_principal() -> Optional[Principal]:
+    """Principal of the user making the request (JWT identity on the API, session elsewhere)."""
+    if request.path.startswith('/api'):
+        jwt_identity = get_jwt_identity()
+        return get_principal(jwt_identity.get("user_id", 0) if jwt_identity else None)
+    
+    return get_principal(session_user.get_id()) if session_user.is_authenticated else None
+
+
 def get_app_user_info(user_id: int):
     """Gets profile details of a particular user"""
     
@@ -2,6 +2,7 @@ from flask import Flask
 
 from .after_request import set_access_control_allows, add_security_headers, log_response, close_resources
 from .before_request import log_request, setup_resources
+from ..instrumentation import init_instrumentation
 
 
 def register_hooks(app: Flask) -> None:
@@ -11,6 +12,8 @@ def register_hooks(app: Flask) -> None:
     Args:
         app (Flask): The Flask application instance.
     """
+    init_instrumentation(app)  # first, so the other hooks are timed too
+    
     app.before_request(setup_resources)
     # app.before_request(log_request)
     
@@ -42,7 +42,7 @@ def log_response(response: Response) -> Response:
         Response: The modified response object.
     """
     response_time = time.time() - request.context['start_time']
-    console_log("Response INFO", data=f"Response Status: {response.status}, \nResponse Time: {response_time}")
+    console_log("Response INFO", "Response Status: %s, \nResponse Time: %s", response.status, response_time, level="DEBUG")
     return response
 
 def close_resources(response: Response) -> Response:
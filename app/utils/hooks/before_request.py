@@ -12,7 +12,7 @@ def log_request() -> None:
     Function to log details about the incoming request.
     Logs the request path, method, and headers.
     """
-    console_log("Request INFO", f"Request Path: {request.path}, \nMethod: {request.method}, \nHeaders: {request.headers}")
+    console_log("Request INFO", "Request Path: %s, \nMethod: %s, \nHeaders: %s", request.path, request.method, request.headers, level="DEBUG")
 
 
 def json_check() -> None:
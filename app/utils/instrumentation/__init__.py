@@ -0,0 +1,16 @@
+"""
+Performance instrumentation: per-request SQL, template and HTTP timings,
+and the latency histograms they feed.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from .histograms import Histogram, HistogramSet, LATENCY_BUCKETS, QUERY_COUNT_BUCKETS
+from .prometheus import (
+    metrics_enabled, observe_request, observe_db_pool, record_cache_lookup, observe_gateway_call, observe_webhook_event, render_metrics
+)
+from .timings import RequestTimings, current_timings, timed, request_histograms, init_instrumentation
+from .slow_queries import get_slow_queries, clear_slow_queries, explain
@@ -0,0 +1,94 @@
+"""
+In-process latency histograms.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from bisect import bisect_left
+from threading import Lock
+from typing import Optional
+
+
+# Upper bounds, in milliseconds, of the latency buckets (the last one is open)
+LATENCY_BUCKETS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Upper bounds of the query count buckets
+QUERY_COUNT_BUCKETS: tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """
+    Counts observations per bucket, plus their sum, so that averages and
+    percentiles can be estimated without keeping every value.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, share: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given share of observations."""
+        if not self.count:
+            return None
+        rank = share * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "avg": round(self.sum / self.count, 3) if self.count else None,
+            "max": round(self.max, 3),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": {
+                ("+Inf" if index == len(self.buckets) else str(self.buckets[index])): bucket_count
+                for index, bucket_count in enumerate(self.counts)
+            },
+        }
+
+
+class HistogramSet:
+    """Histograms of this worker, created on first use and keyed by (name, label)."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+
+    def observe(self, name: str, label: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        with self._lock:
+            histogram = self._histograms.get((name, label))
+            if histogram is None:
+                histogram = self._histograms[(name, label)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def to_dict(self) -> dict[str, dict[str, dict]]:
+        """Returns {label: {name: histogram}}, e.g. {"api.get_cart": {"sql_ms": {...}}}."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            result: dict[str, dict[str, dict]] = {}
+            for (name, label), histogram in items:
+                result.setdefault(label, {})[name] = histogram.to_dict()
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
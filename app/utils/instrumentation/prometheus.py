@@ -0,0 +1,159 @@
+"""
+Prometheus metrics, served at `/metrics` in the text exposition format.
+
+    * request latency per blueprint/endpoint and status code counters,
+    * database connection pool usage,
+    * cache lookups per namespace (hit ratio = hits / all lookups),
+    * payment gateway latency per provider,
+    * webhook processing lag and the age of the oldest waiting event.
+
+Gunicorn workers are separate processes: with PROMETHEUS_MULTIPROC_DIR
+set in the environment (before the app is imported), every worker writes
+its values to mmap'd files in that directory and a scrape served by any
+worker adds them all up. `gunicorn.conf.py` empties the directory when the
+server starts and drops the files of workers that exit.
+
+The endpoint exposes route names, traffic and backlog figures, so it is
+only registered when METRICS_TOKEN is set, and scrapers must then send
+"Authorization: Bearer <token>".
+
+prometheus_client is optional: without it nothing is recorded and
+`/metrics` is not registered.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import os
+import hmac
+import logging
+from typing import Optional
+
+from flask import Flask, Response, current_app, request
+from sqlalchemy.pool import QueuePool
+
+from .histograms import LATENCY_BUCKETS
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # metrics are then disabled
+    prometheus_client = multiprocess = None
+
+
+logger = logging.getLogger(__name__)
+
+_SECONDS_BUCKETS = tuple(bucket / 1000 for bucket in LATENCY_BUCKETS)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        "storezed_http_request_duration_seconds", "Time spent handling requests",
+        ["blueprint", "endpoint", "method"], buckets=_SECONDS_BUCKETS,
+    )
+    REQUESTS = prometheus_client.Counter(
+        "storezed_http_requests_total", "Requests handled, by status code",
+        ["blueprint", "endpoint", "method", "status"],
+    )
+    DB_POOL_CONNECTIONS = prometheus_client.Gauge(
+        "storezed_db_pool_connections", "Database connections of the pool, by state",
+        ["state"], multiprocess_mode="livesum",
+    )
+    CACHE_LOOKUPS = prometheus_client.Counter(
+        "storezed_cache_lookups_total", "Cache lookups, by namespace and result",
+        ["namespace", "result"],
+    )
+    GATEWAY_LATENCY = prometheus_client.Histogram(
+        "storezed_gateway_request_duration_seconds", "Time spent calling payment gateways and rate APIs",
+        ["provider", "outcome"], buckets=_SECONDS_BUCKETS,
+    )
+    WEBHOOK_EVENTS = prometheus_client.Counter(
+        "storezed_webhook_events_total", "Webhook events applied or failed, by provider",
+        ["provider", "outcome"],
+    )
+    WEBHOOK_LAG = prometheus_client.Histogram(
+        "storezed_webhook_processing_lag_seconds", "Time between receiving a webhook event and applying it",
+        ["provider"], buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+    )
+    WEBHOOK_OLDEST_WAITING = prometheus_client.Gauge(
+        "storezed_webhook_oldest_waiting_seconds", "Age of the oldest webhook event not applied yet",
+        multiprocess_mode="livemostrecent",
+    )
+
+
+def metrics_enabled() -> bool:
+    return prometheus_client is not None
+
+
+def observe_request(blueprint: Optional[str], endpoint: str, method: str, status: int, seconds: float) -> None:
+    if prometheus_client is None:
+        return
+    blueprint = blueprint or ""
+    REQUEST_LATENCY.labels(blueprint, endpoint, method).observe(seconds)
+    REQUESTS.labels(blueprint, endpoint, method, str(status)).inc()
+
+
+def observe_db_pool(engine) -> None:
+    """Records the state of a QueuePool (other pools, e.g. SQLite's, have no size)."""
+    if prometheus_client is None or not isinstance(engine.pool, QueuePool):
+        return
+    pool: QueuePool = engine.pool
+    DB_POOL_CONNECTIONS.labels("checked_out").set(pool.checkedout())
+    DB_POOL_CONNECTIONS.labels("idle").set(pool.checkedin())
+    DB_POOL_CONNECTIONS.labels("overflow").set(max(pool.overflow(), 0))
+
+
+def record_cache_lookup(namespace: str, outcome: str) -> None:
+    if prometheus_client is not None:
+        CACHE_LOOKUPS.labels(namespace, "hit" if outcome == "hits" else "miss").inc()
+
+
+def observe_gateway_call(provider: str, outcome: str, seconds: float) -> None:
+    """`outcome` is the status class of the response ("2xx", "5xx"...) or "error"."""
+    if prometheus_client is not None:
+        GATEWAY_LATENCY.labels(provider, outcome).observe(seconds)
+
+
+def observe_webhook_event(provider: str, outcome: str, lag: Optional[float] = None) -> None:
+    if prometheus_client is None:
+        return
+    WEBHOOK_EVENTS.labels(provider, outcome).inc()
+    if lag is not None:
+        WEBHOOK_LAG.labels(provider).observe(lag)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Returns the exposition of every worker (or of this process only, outside multiprocess mode)."""
+    from ..payments.webhooks import get_oldest_waiting_seconds
+
+    WEBHOOK_OLDEST_WAITING.set(get_oldest_waiting_seconds())
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def metrics_view() -> Response:
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token or not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
+def init_metrics(app: Flask) -> None:
+    """
+    Registers `/metrics` when METRICS_ENABLED is on, METRICS_TOKEN is set and
+    prometheus_client is installed.
+    """
+    if prometheus_client is None or not app.config.get("METRICS_ENABLED", True):
+        return
+    if not app.config.get("METRICS_TOKEN"):
+        logger.warning("METRICS_TOKEN is not set, /metrics is not served")
+        return
+    app.add_url_rule("/metrics", endpoint="metrics", view_func=metrics_view, methods=["GET"])
@@ -0,0 +1,166 @@
+"""
+Slow query log.
+
+Statements taking longer than SLOW_QUERY_THRESHOLD_MS are kept, with the
+route that ran them and the app code that issued them, in a ring buffer of
+the last SLOW_QUERY_BUFFER_SIZE entries (per worker), shown on the
+`web_admin.slow_queries` page and logged as warnings.
+
+With SLOW_QUERY_EXPLAIN on, a share (SLOW_QUERY_EXPLAIN_SAMPLE) of them is
+explained too. On PostgreSQL/MySQL the EXPLAIN runs on a separate
+connection, so an error cannot abort the transaction of the request,
+opened by an engine without a pool: slow queries pile up when the app's
+pool is exhausted, and the EXPLAIN must not wait for (or take) one of its
+connections. On SQLite (where a failing statement leaves the transaction
+alone) it runs `EXPLAIN QUERY PLAN` on a new cursor of the same connection.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import os
+import sys
+import random
+import logging
+import threading
+from collections import deque
+from contextvars import ContextVar
+from itertools import count
+from time import perf_counter
+from typing import Optional
+
+from flask import Flask, has_request_context, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from ..date_time import DateTimeUtils
+from .timings import _before_cursor_execute
+
+
+logger = logging.getLogger(__name__)
+
+# Frames from these directories are skipped when looking for the call site
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_INSTRUMENTATION_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_settings = {"threshold_ms": 200.0, "explain": False, "explain_sample": 1.0}
+_entries: deque = deque(maxlen=100)
+_entries_lock = threading.Lock()
+_ids = count(1)
+_explaining: ContextVar[bool] = ContextVar("explaining_slow_query", default=False)
+_explain_engines: dict[str, Engine] = {}
+_explain_engines_lock = threading.Lock()
+
+
+def _call_site() -> Optional[str]:
+    """Returns "path/to/module.py:42 in function" for the innermost app frame."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and not filename.startswith(_INSTRUMENTATION_DIR):
+            return f"{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _explain_engine(engine: Engine) -> Engine:
+    """Returns an engine on the same database as `engine`, opening a new connection each time."""
+    url = engine.url.render_as_string(hide_password=False)
+    with _explain_engines_lock:
+        explain_engine = _explain_engines.get(url)
+        if explain_engine is None:
+            explain_engine = _explain_engines[url] = create_engine(engine.url, poolclass=NullPool)
+        return explain_engine
+
+
+def explain(conn, cursor, statement: str, parameters) -> Optional[list[str]]:
+    """Returns the query plan of a statement as text lines, None if it cannot be explained."""
+    token = _explaining.set(True)
+    try:
+        if conn.dialect.name == "sqlite":
+            explain_cursor = cursor.connection.cursor()
+            try:
+                explain_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+                rows = explain_cursor.fetchall()
+            finally:
+                explain_cursor.close()
+        else:
+            with _explain_engine(conn.engine).connect() as explain_conn:
+                rows = explain_conn.exec_driver_sql(f"EXPLAIN {statement}", parameters or ()).fetchall()
+                explain_conn.rollback()
+        return [" | ".join(str(value) for value in row) for row in rows]
+    except Exception as e:
+        logger.debug("EXPLAIN failed: %s", e)
+        return None
+    finally:
+        _explaining.reset(token)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_query_started", None)
+    if started is None or _explaining.get():
+        return
+
+    duration_ms = (perf_counter() - started) * 1000
+    if duration_ms < _settings["threshold_ms"]:
+        return
+
+    plan = None
+    if (_settings["explain"] and not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH"))
+            and random.random() < _settings["explain_sample"]):
+        plan = explain(conn, cursor, statement, parameters)
+
+    entry = {
+        "id": next(_ids),
+        "recorded_at": DateTimeUtils.aware_utcnow().isoformat(timespec="seconds"),
+        "duration_ms": round(duration_ms, 1),
+        "statement": statement[:5000],
+        "parameters": repr(parameters)[:500],
+        "route": f"{request.method} {request.path}" if has_request_context() else threading.current_thread().name,
+        "endpoint": request.endpoint if has_request_context() else None,
+        "call_site": _call_site(),
+        "plan": plan,
+    }
+    with _entries_lock:
+        _entries.append(entry)
+
+    logger.warning(
+        "Slow query (%.1fms) from %s at %s: %s", duration_ms, entry["route"], entry["call_site"], entry["statement"][:200],
+        extra={"fields": {key: entry[key] for key in ("duration_ms", "route", "endpoint", "call_site")}},
+    )
+
+
+def get_slow_queries() -> list[dict]:
+    """Returns the slow queries recorded by this worker, newest first."""
+    with _entries_lock:
+        return list(reversed(_entries))
+
+
+def clear_slow_queries() -> None:
+    with _entries_lock:
+        _entries.clear()
+
+
+def init_slow_query_log(app: Flask) -> None:
+    """Starts recording slow queries, unless SLOW_QUERY_LOG is off."""
+    global _entries
+    if not app.config.get("SLOW_QUERY_LOG", True):
+        return
+
+    _settings.update(
+        threshold_ms=app.config.get("SLOW_QUERY_THRESHOLD_MS", 200),
+        explain=app.config.get("SLOW_QUERY_EXPLAIN", False),
+        explain_sample=app.config.get("SLOW_QUERY_EXPLAIN_SAMPLE", 1.0),
+    )
+    size = app.config.get("SLOW_QUERY_BUFFER_SIZE", 100)
+    with _entries_lock:
+        if _entries.maxlen != size:
+            _entries = deque(_entries, maxlen=size)
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    if not event.contains(Engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
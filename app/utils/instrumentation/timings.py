@@ -0,0 +1,194 @@
+"""
+Per-request timings: SQL queries, template rendering and outgoing HTTP calls.
+
+Every request gets a `RequestTimings` on `g`, filled by SQLAlchemy engine
+events, Flask's template signals and the `timed("http")` blocks around
+gateway/storage calls. When the request ends the timings are:
+
+    * sent back in a `Server-Timing` header (SERVER_TIMING_HEADER), which
+      browsers show in the network panel,
+    * logged as one line per request (fields in JSON output),
+    * added to the latency histograms of the endpoint, served to admins
+      by `web_admin.request_metrics`, and to the Prometheus metrics.
+
+Template time includes the queries run by lazy loads while rendering.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import logging
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator, Optional
+
+from flask import Flask, Response, before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ...extensions import db
+from .histograms import HistogramSet, QUERY_COUNT_BUCKETS
+from .prometheus import init_metrics, observe_db_pool, observe_request
+
+
+logger = logging.getLogger(__name__)
+
+request_histograms = HistogramSet()
+
+
+class RequestTimings:
+    """Counters of one request. Durations are in milliseconds."""
+    __slots__ = ("started", "sql_count", "sql_ms", "template_ms", "http_count", "http_ms", "_template_starts")
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.http_count = 0
+        self.http_ms = 0.0
+        self._template_starts: list[float] = []
+
+    @property
+    def total_ms(self) -> float:
+        return (perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        return ", ".join((
+            f'sql;dur={self.sql_ms:.1f};desc="{self.sql_count} queries"',
+            f"tpl;dur={self.template_ms:.1f}",
+            f'http;dur={self.http_ms:.1f};desc="{self.http_count} calls"',
+            f"total;dur={total_ms:.1f}",
+        ))
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Returns the timings of the current request, None outside requests (e.g. in worker threads)."""
+    if not has_request_context():
+        return None
+    return g.get("_request_timings")
+
+
+@contextmanager
+def timed(kind: str = "http") -> Iterator[None]:
+    """
+    Adds the time spent in the block to the current request, e.g. around
+    calls to payment gateways. Only "http" is tracked for now.
+    """
+    timings = current_timings()
+    if timings is None:
+        yield
+        return
+
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        if kind == "http":
+            timings.http_count += 1
+            timings.http_ms += (perf_counter() - started) * 1000
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._query_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_query_started", None)
+    timings = current_timings()
+    if started is None or timings is None:
+        return
+    timings.sql_count += 1
+    timings.sql_ms += (perf_counter() - started) * 1000
+
+
+def _before_render_template(app: Flask, **extra) -> None:
+    timings = current_timings()
+    if timings is not None:
+        timings._template_starts.append(perf_counter())
+
+
+def _template_rendered(app: Flask, **extra) -> None:
+    timings = current_timings()
+    if timings is not None and timings._template_starts:
+        started = timings._template_starts.pop()
+        if not timings._template_starts:  # templates rendered inside another one are already counted
+            timings.template_ms += (perf_counter() - started) * 1000
+
+
+def start_request_timings() -> None:
+    if current_timings() is None:
+        g._request_timings = RequestTimings()
+
+
+def finish_request_timings(response: Response) -> Response:
+    timings: Optional[RequestTimings] = g.pop("_request_timings", None)
+    if timings is None:
+        return response
+
+    total_ms = timings.total_ms
+    endpoint = request.endpoint or "<unmatched>"
+
+    if current_app.config.get("SERVER_TIMING_HEADER", True):
+        response.headers["Server-Timing"] = timings.server_timing(total_ms)
+
+    request_histograms.observe("total_ms", endpoint, total_ms)
+    request_histograms.observe("sql_ms", endpoint, timings.sql_ms)
+    request_histograms.observe("sql_queries", endpoint, timings.sql_count, QUERY_COUNT_BUCKETS)
+    request_histograms.observe("template_ms", endpoint, timings.template_ms)
+    if timings.http_count:
+        request_histograms.observe("http_ms", endpoint, timings.http_ms)
+
+    observe_request(request.blueprint, endpoint, request.method, response.status_code, total_ms / 1000)
+    observe_db_pool(db.engine)
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "%s %s %s %.1fms (sql: %d queries, %.1fms, templates: %.1fms, http: %d calls, %.1fms)",
+            request.method, request.path, response.status_code, total_ms,
+            timings.sql_count, timings.sql_ms, timings.template_ms, timings.http_count, timings.http_ms,
+            extra={"fields": {
+                "method": request.method,
+                "path": request.path,
+                "endpoint": endpoint,
+                "status": response.status_code,
+                "total_ms": round(total_ms, 1),
+                "sql_queries": timings.sql_count,
+                "sql_ms": round(timings.sql_ms, 1),
+                "template_ms": round(timings.template_ms, 1),
+                "http_calls": timings.http_count,
+                "http_ms": round(timings.http_ms, 1),
+            }},
+        )
+
+    return response
+
+
+def init_instrumentation(app: Flask) -> None:
+    """
+    Installs the SQL and template listeners, the request hooks, the
+    `/metrics` endpoint and the slow query log, unless
+    INSTRUMENTATION_ENABLED is off.
+    """
+    if not app.config.get("INSTRUMENTATION_ENABLED", True):
+        return
+
+    # Listening on the Engine class covers every engine, binds included
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    before_render_template.connect(_before_render_template, app)
+    template_rendered.connect(_template_rendered, app)
+
+    # Registered before the other hooks: started first, finished last
+    app.before_request(start_request_timings)
+    app.after_request(finish_request_timings)
+
+    init_metrics(app)
+
+    from .slow_queries import init_slow_query_log
+    init_slow_query_log(app)
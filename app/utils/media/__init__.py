@@ -0,0 +1,17 @@
+"""
+Media uploads: staging, background processing and storage backends.
+
+``MEDIA_STORAGE`` picks where processed files go:
+
+    - ``cloudinary``: uploaded to Cloudinary (default)
+    - ``local``: copied under ``MEDIA_LOCAL_ROOT`` and served from
+      ``MEDIA_LOCAL_URL``, so uploads work offline
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from .storage import StorageBackend, LocalStorage, CloudinaryStorage, get_storage
+from .pipeline import stage_media, dispatch_media, process_media, process_pending_media, IMAGE_VARIANTS
@@ -0,0 +1,305 @@
+"""
+Upload pipeline for media files.
+
+Requests only stage the upload on local disk (MEDIA_STAGING_DIR) and create
+a `pending` Media row; a pool of worker threads then:
+
+    * computes the sha256 of the file and, when the same file is already
+      stored, reuses it instead of uploading it again,
+    * for images (with Pillow installed), strips the metadata (EXIF, GPS...)
+      and builds the resized variants in IMAGE_VARIANTS,
+    * stores the file and its variants with the MEDIA_STORAGE backend,
+    * marks the row `ready` (or `failed`) and removes the staged file.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import os
+import shutil
+import hashlib
+import uuid
+from datetime import timedelta
+from threading import Lock
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, current_app
+from werkzeug.utils import secure_filename
+
+from ...extensions import db
+from ...models import Media
+from ..date_time import DateTimeUtils
+from ..helpers.basics import generate_random_string
+from ..helpers.loggers import console_log, log_exception
+from ..helpers.media import get_folder_path, validate_file_extension
+from .storage import get_storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional: images are then stored as uploaded
+    Image = ImageOps = None
+
+
+# Longest side, in pixels, of the resized copies kept for each image
+IMAGE_VARIANTS: dict[str, int] = {
+    "thumbnail": 150,
+    "medium": 600,
+    "large": 1200,
+}
+
+# Images Pillow can re-encode (SVGs and videos are stored as uploaded)
+PROCESSED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = Lock()
+
+
+def get_staging_dir() -> str:
+    staging_dir = current_app.config.get("MEDIA_STAGING_DIR")
+    os.makedirs(staging_dir, exist_ok=True)
+    return staging_dir
+
+
+def stage_media(media_file, filename: Optional[str] = None) -> Media:
+    """
+    Saves an upload to the staging area and records it as a pending Media.
+
+    Args:
+        media_file: Uploaded file (FileStorage) or open binary file
+        filename: Name to use instead of the upload's own
+
+    Returns:
+        Media: The pending Media row, committed
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+    media_name: str = secure_filename(filename or getattr(media_file, "filename", "") or os.path.basename(getattr(media_file, "name", "")))
+    extension = os.path.splitext(media_name)[1].lower()
+    resource_type = validate_file_extension(extension)
+
+    staging_path = os.path.join(get_staging_dir(), f"{uuid.uuid4().hex}{extension}")
+    if hasattr(media_file, "save"):
+        media_file.save(staging_path)
+    else:
+        with open(staging_path, "wb") as staged:
+            shutil.copyfileobj(media_file, staged)
+
+    media = Media(
+        filename=media_name,
+        status=Media.PENDING,
+        resource_type=resource_type,
+        staging_path=staging_path,
+    )
+    try:
+        db.session.add(media)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        os.remove(staging_path)
+        log_exception("Database commit failed", e)
+        raise e
+
+    return media
+
+
+def claim_media(media_id: int) -> bool:
+    """Marks a pending Media as being processed, unless another worker holds it."""
+    table = Media.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id == media_id, table.c.status == Media.PENDING)
+        .values(status=Media.PROCESSING, processing_started_at=DateTimeUtils.aware_utcnow())
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _image_files(file_path: str, extension: str) -> dict[str, str]:
+    """
+    Writes the metadata-free original and its resized variants next to the
+    staged file.
+
+    Returns:
+        dict: Variant name ("original" included) -> local file path
+    """
+    base_path = os.path.splitext(file_path)[0]
+
+    with Image.open(file_path) as image:
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)  # apply the orientation before dropping it
+
+        # Keep the colour profile and transparency only: EXIF, GPS, comments... are dropped
+        icc_profile = image.info.get("icc_profile")
+        transparency = image.info.get("transparency")
+        image.info = {}
+        options = {"optimize": True}
+        if icc_profile:
+            options["icc_profile"] = icc_profile
+        if transparency is not None and image_format != "JPEG":
+            options["transparency"] = transparency
+        if image_format in ("JPEG", "WEBP"):
+            options["quality"] = 85
+            if image.mode not in ("RGB", "L") and image_format == "JPEG":
+                image = image.convert("RGB")
+
+        files = {"original": f"{base_path}-original{extension}"}
+        image.save(files["original"], image_format, **options)
+
+        for name, size in IMAGE_VARIANTS.items():
+            if max(image.size) <= size:
+                continue  # never upscale, the original serves instead
+            variant = image.copy()
+            variant.thumbnail((size, size))
+            files[name] = f"{base_path}-{name}{extension}"
+            variant.save(files[name], image_format, **options)
+
+    return files
+
+
+def _store(media: Media, file_path: str) -> tuple[str, dict, str]:
+    """Stores a staged file. Returns its URL, the URLs of its variants and the backend name."""
+    storage = get_storage()
+    name, extension = os.path.splitext(media.filename)
+    extension = extension.lower()
+    key = f"{get_folder_path()}/{name}-{generate_random_string(8)}"
+
+    if media.resource_type != "image" or Image is None or extension not in PROCESSED_IMAGE_EXTENSIONS:
+        return storage.save(file_path, f"{key}{extension}", media.resource_type), {}, storage.name
+
+    files = _image_files(file_path, extension)
+    try:
+        urls = {
+            variant: storage.save(local_path, f"{key}{'' if variant == 'original' else '-' + variant}{extension}", "image")
+            for variant, local_path in files.items()
+        }
+    finally:
+        for local_path in files.values():
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
+    return urls.pop("original"), urls, storage.name
+
+
+def process_media(media_id: int) -> bool:
+    """
+    Stores a staged upload, if it can be claimed.
+
+    Returns:
+        bool: True if the media is now ready
+    """
+    if not claim_media(media_id):
+        return False
+
+    media: Media = db.session.get(Media, media_id)
+    staging_path = media.staging_path
+
+    try:
+        if not staging_path or not os.path.exists(staging_path):
+            raise FileNotFoundError(f"Staged file of media {media_id} is missing")
+
+        media.content_hash = hash_file(staging_path)
+        media.size = os.path.getsize(staging_path)
+
+        duplicate: Optional[Media] = Media.query.filter(
+            Media.content_hash == media.content_hash,
+            Media.status == Media.READY,
+            Media.id != media.id,
+        ).first()
+
+        if duplicate:
+            console_log("duplicate media", f"{media_id} reuses {duplicate.id}")
+            media.media_path, media.variants, media.storage = duplicate.media_path, duplicate.variants, duplicate.storage
+        else:
+            media.media_path, media.variants, media.storage = _store(media, staging_path)
+
+        media.status = Media.READY
+        media.processing_started_at = None
+        media.staging_path = None
+        media.error = None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        log_exception(f"Processing media {media_id} failed", e)
+        Media.query.filter_by(id=media_id).update({"status": Media.FAILED, "processing_started_at": None, "error": str(e)[:1000]})
+        db.session.commit()
+        return False  # the staged file is kept for `flask media process --retry-failed`
+
+    os.remove(staging_path)
+    return True
+
+
+def process_pending_media(limit: int = 100, retry_failed: bool = False, stuck_after_minutes: int = 30) -> int:
+    """
+    Processes media left waiting, e.g. by a worker that was restarted.
+
+    Media claimed by a worker more than `stuck_after_minutes` ago and still
+    `processing` are processed again, however long they waited before.
+
+    Returns:
+        int: Number of media made ready
+    """
+    requeued = [Media.FAILED] if retry_failed else []
+    stuck_before = DateTimeUtils.aware_utcnow() - timedelta(minutes=stuck_after_minutes)
+
+    Media.query.filter(
+        db.or_(
+            Media.status.in_(requeued),
+            db.and_(Media.status == Media.PROCESSING, Media.processing_started_at < stuck_before),
+        )
+    ).update({"status": Media.PENDING, "processing_started_at": None}, synchronize_session=False)
+    db.session.commit()
+
+    media_ids = db.session.execute(
+        db.select(Media.id).where(Media.status == Media.PENDING).order_by(Media.id).limit(limit)
+    ).scalars().all()
+
+    return sum(process_media(media_id) for media_id in media_ids)
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        # Threads do not survive a fork: every worker process needs its own pool
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="media")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _process_in_app_context(app: Flask, media_id: int) -> None:
+    with app.app_context():
+        try:
+            process_media(media_id)
+        except Exception as e:
+            log_exception(f"Media worker failed on media {media_id}", e)
+        finally:
+            db.session.remove()
+
+
+def dispatch_media(media_id: int) -> None:
+    """
+    Hands a staged media to the worker pool.
+
+    With MEDIA_WORKERS set to 0 the media is processed right away, in the
+    calling thread.
+    """
+    max_workers = current_app.config.get("MEDIA_WORKERS", 2)
+    if max_workers <= 0:
+        process_media(media_id)
+        return
+
+    _get_executor(max_workers).submit(_process_in_app_context, current_app._get_current_object(), media_id)
@@ -0,0 +1,90 @@
+"""
+Storage backends for processed media.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+import os
+import shutil
+from typing import Optional
+
+from flask import current_app
+
+from ..helpers.loggers import log_exception
+from ..instrumentation import timed
+
+
+class StorageBackend:
+    """Stores a local file under a key (e.g. "2024/05/shoe-a1b2c3d4.jpg") and returns its URL."""
+    name: str = ""
+
+    def save(self, file_path: str, key: str, resource_type: str) -> str:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{type(self).__name__}>"
+
+
+class LocalStorage(StorageBackend):
+    """
+    Keeps files on the local filesystem (works offline).
+
+    Args:
+        root: Directory the files are copied to (MEDIA_LOCAL_ROOT, by
+            default the `uploads` folder of the static files)
+        url_prefix: URL the root is served at (MEDIA_LOCAL_URL)
+    """
+    name = "local"
+
+    def __init__(self, root: Optional[str] = None, url_prefix: Optional[str] = None):
+        self.root = root or current_app.config.get("MEDIA_LOCAL_ROOT") or os.path.join(current_app.static_folder, "uploads")
+        self.url_prefix = (url_prefix or current_app.config.get("MEDIA_LOCAL_URL", "/static/uploads")).rstrip("/")
+
+    def save(self, file_path: str, key: str, resource_type: str) -> str:
+        destination = os.path.join(self.root, *key.split("/"))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(file_path, destination)
+        return f"{self.url_prefix}/{key}"
+
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    def save(self, file_path: str, key: str, resource_type: str) -> str:
+        import cloudinary.uploader
+
+        folder, _, filename = key.rpartition("/")
+        try:
+            with timed("http"):
+                result = cloudinary.uploader.upload(
+                    file_path,
+                    resource_type=resource_type,
+                    public_id=os.path.splitext(filename)[0],
+                    folder=folder,
+                )
+        except Exception as e:
+            log_exception("Cloudinary upload failed", e)
+            raise e
+        return result["secure_url"]
+
+
+STORAGE_BACKENDS: dict[str, type[StorageBackend]] = {
+    LocalStorage.name: LocalStorage,
+    CloudinaryStorage.name: CloudinaryStorage,
+}
+
+
+def get_storage(name: Optional[str] = None) -> StorageBackend:
+    """
+    Returns the storage backend named by MEDIA_STORAGE ("cloudinary" or "local").
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    name = name or current_app.config.get("MEDIA_STORAGE", "cloudinary")
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown media storage: {name}")
+    return STORAGE_BACKENDS[name]()
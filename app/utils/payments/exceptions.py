@@ -35,6 +35,14 @@ class NoActivePaymentProvider(Exception):
         self.status_code = status_code
         self.message = message
 
+class CircuitOpenError(Exception):
+    """Exception raised when calls to a failing payment gateway are blocked."""
+
+    def __init__(self, message="Payment gateway is unavailable", status_code=503):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
 class FlutterwaveError(Exception):
     """Exception raised when a flutterwave request fails."""
 
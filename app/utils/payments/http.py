@@ -0,0 +1,214 @@
+'''
+Shared HTTP client layer for payment gateways.
+
+Each provider gets one `GatewayClient` per process: a `requests.Session`
+whose connection pool keeps TLS connections to the gateway alive between
+calls, with connect/read timeouts on every request, bounded retries with
+jittered exponential backoff, and a circuit breaker that fails fast while
+the gateway is down instead of tying up workers until the timeout.
+
+Only failures that cannot have reached the gateway (connection errors)
+are retried for non-idempotent methods such as POST.
+
+@author: Emmanuel Olowu
+@link: https://github.com/zeddyemy
+'''
+import os
+import time
+from threading import Lock
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+from .exceptions import CircuitOpenError
+from ..instrumentation import timed, observe_gateway_call
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of a gateway.
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    fail at once for `reset_timeout` seconds. Then a single trial call is let
+    through (half-open): its success closes the circuit, its failure opens
+    it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def __repr__(self):
+        return f"<CircuitBreaker {self.name} ({self.state}, failures: {self._failures})>"
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If calls to the gateway are currently blocked
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            retry_in = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if self._state == self.OPEN and retry_in <= 0:
+                self._state = self.HALF_OPEN  # let one trial call through
+                return
+
+            raise CircuitOpenError(f"{self.name} is unavailable, retrying in {max(retry_in, 0):.0f}s")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class GatewayClient:
+    """
+    Pooled HTTP client of one payment gateway.
+
+    Args:
+        name: Provider name, used in errors
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for the response
+        max_retries: Retries of failed calls (connection errors, 429/5xx
+            responses for idempotent methods)
+        backoff_factor: Base of the exponential backoff between retries
+        pool_size: Connections kept alive to the gateway
+        failure_threshold: Consecutive failures opening the circuit
+        reset_timeout: Seconds the circuit stays open
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(
+            self,
+            name: str,
+            connect_timeout: float = Config.GATEWAY_CONNECT_TIMEOUT,
+            read_timeout: float = Config.GATEWAY_READ_TIMEOUT,
+            max_retries: int = Config.GATEWAY_MAX_RETRIES,
+            backoff_factor: float = Config.GATEWAY_BACKOFF_FACTOR,
+            pool_size: int = Config.GATEWAY_POOL_SIZE,
+            failure_threshold: int = Config.GATEWAY_CIRCUIT_FAILURES,
+            reset_timeout: float = Config.GATEWAY_CIRCUIT_RESET_SECONDS,
+        ):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # no POST: only connection errors retry those
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __repr__(self):
+        return f"<GatewayClient {self.name} ({self.breaker.state})>"
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request through the pooled session.
+
+        Returns:
+            requests.Response: The response, whatever its status code
+
+        Raises:
+            CircuitOpenError: If the gateway is failing and calls are blocked
+            requests.RequestException: If the gateway cannot be reached
+        """
+        self.breaker.before_call()
+        kwargs.setdefault("timeout", self.timeout)
+
+        started = time.perf_counter()
+        try:
+            with timed("http"):
+                response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            observe_gateway_call(self.name, "error", time.perf_counter() - started)
+            self.breaker.record_failure()
+            raise
+        observe_gateway_call(self.name, f"{response.status_code // 100}xx", time.perf_counter() - started)
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: dict[str, GatewayClient] = {}
+_clients_pid: Optional[int] = None
+_clients_lock = Lock()
+
+
+def get_gateway_client(provider: str) -> GatewayClient:
+    """
+    Returns the shared client of a provider in this process.
+
+    Clients are not shared across a fork: pooled sockets would be used by
+    two processes at once.
+    """
+    global _clients_pid
+
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+
+        client = _clients.get(provider)
+        if client is None:
+            client = _clients[provider] = GatewayClient(provider)
+        return client
+
+
+def reset_gateway_clients() -> None:
+    """Closes every client, e.g. after the gateway settings change."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
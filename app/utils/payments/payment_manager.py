@@ -11,9 +11,10 @@ from .processor import PaymentProcessorResponse, PaymentVerificationResponse, Pa
 from .processor.bitpay import BitPayProcessor
 from .processor.flutterwave import FlutterwaveProcessor
 from .processor.paystack import PaystackProcessor
+from .registry import get_gateway_config
 from ..helpers.money import quantize_amount
 from ..helpers.http_response import success_response, error_response
-from ..helpers.settings import get_active_payment_gateway, get_general_setting
+from ..helpers.settings import get_general_setting
 from ..helpers.site import get_site_url, get_platform_url
 from ..helpers.loggers import log_exception, console_log
 from ..decorators.retry import retry
@@ -22,58 +23,35 @@ from ...models import AppUser, Payment, Transaction, CustomerOrder, Subscription
 
 
 class PaymentManager:
-    def __init__(self):
-        self.processors = {
-            "bitpay": BitPayProcessor,
-            "flutterwave": FlutterwaveProcessor,
-            "paystack": PaystackProcessor
-        }
-        self.payment_gateway = get_active_payment_gateway()
+    """
+    Runs gateway payments with the processor of the configured gateway.
+    
+    The gateway and its processor come from the shared registry, so creating
+    a manager costs nothing and does not query the settings.
+    """
+    
+    @property
+    def payment_gateway(self) -> dict:
+        """Active gateway: {"provider": str, "credentials": dict}, or {} if none is set up."""
+        config = get_gateway_config()
+        if not config.provider:
+            return {}
+        return {"provider": config.provider, "credentials": dict(config.credentials)}
 
 
     def get_payment_processor(self) -> Optional[BitPayProcessor | FlutterwaveProcessor | PaystackProcessor]:
         """
-        Returns an instance of the correct payment processor based on the configured provider.
+        Returns the shared payment processor of the configured provider.
         
         Returns:
             Optional[BitPayProcessor | FlutterwaveProcessor | PaystackProcessor]: Instance of a payment processor.
         """
+        config = get_gateway_config()
         
-        payment_gateway = self.payment_gateway
-        
-        if not payment_gateway or not payment_gateway.get("credentials"):
+        if not config.provider or not config.credentials:
             raise ValueError("Payment gateway not properly configured")
         
-        provider = payment_gateway["provider"]
-        credentials = payment_gateway.get("credentials")
-        
-        # Convert test_mode to boolean
-        test_mode = credentials.get("test_mode", "false").lower() == "true"  # Converts to True/False
-        
-        # Get keys safely
-        api_key = credentials.get("test_api_key" if test_mode else "api_key", "")
-        secret_key = credentials.get("test_secret_key" if test_mode else "secret_key", "")
-        public_key = credentials.get("test_public_key" if test_mode else "public_key", "")
-        
-        processors:dict[str, BitPayProcessor | FlutterwaveProcessor | PaystackProcessor] = {
-            "bitpay": BitPayProcessor(
-                secret_key=secret_key,
-                public_key=public_key,
-                api_key=api_key
-            ),
-            "flutterwave": FlutterwaveProcessor(
-                secret_key=secret_key,
-                public_key=public_key,
-                api_key=api_key
-            ),
-            "paystack": PaystackProcessor(
-                secret_key=secret_key,
-                public_key=public_key,
-                api_key=api_key
-            )
-        }
-        
-        return processors.get(provider)
+        return config.processor
 
 
     def initialize_gateway_payment(
@@ -100,8 +78,11 @@ class PaymentManager:
         Returns:
             PaymentProcessorResponse: Standardized payment response
         """
+        processor = None
+        reference = None
         try:
             processor = self.get_payment_processor()
+            reference = processor.new_reference()
             
             amount = quantize_amount(amount)
             
@@ -112,7 +93,7 @@ class PaymentManager:
                 payment_method=processor.__class__.__name__.replace('Processor', '').lower(),
                 status=PaymentStatus.PENDING,
                 narration=narration,
-                reference=processor.reference,  # Using the processor's reference
+                reference=reference,
                 payment_type=payment_type,
                 extra_meta=extra_meta
             )
@@ -126,7 +107,7 @@ class PaymentManager:
                 else:
                     redirect_url = f"{get_platform_url()}/payments/verify"
             
-            console_log("redirect_url", redirect_url)
+            console_log("redirect_url", redirect_url, level="DEBUG")
             
             customer_data = {
                 "email": user.email,
@@ -136,7 +117,7 @@ class PaymentManager:
             platform_currency = get_general_setting(GeneralSettingsKeys.CURRENCY, default='NGN')
             
             # Initialize payment with gateway
-            response = processor.initialize_payment(amount, platform_currency, customer_data, redirect_url)
+            response = processor.initialize_payment(amount, platform_currency, customer_data, redirect_url, reference)
             
             return response
 
@@ -150,17 +131,18 @@ class PaymentManager:
                 message="An unexpected error occurred initializing payment",
                 payment_id=None,
                 authorization_url=None,
-                reference=processor.reference  # Using the processor's reference
+                reference=reference
             )
 
 
-    def verify_gateway_payment(self, payment: Payment) -> PaymentVerificationResponse:
+    def verify_gateway_payment(self, payment: Payment, raise_errors: bool = False) -> PaymentVerificationResponse:
         """
         Verify payment status with gateway and handle response.
         
         Args:
-            processor: Payment processor instance
             payment: Payment record to verify
+            raise_errors: Re-raise errors (gateway unreachable, amount mismatch)
+                instead of reporting the payment as failed
         
         Returns:
             PaymentVerificationResponse: Standardized verification response
@@ -179,6 +161,8 @@ class PaymentManager:
             return verification_response
         except Exception as e:
             log_exception(f"Payment verification failed for {payment.key}", e)
+            if raise_errors:
+                raise
             return PaymentVerificationResponse(
                 status=PaymentStatus.FAILED,
                 amount=payment.amount,
@@ -187,7 +171,15 @@ class PaymentManager:
                 meta_info={"error": str(e)}
             )
 
-    def handle_gateway_payment(self, payment: Payment, verification_response: PaymentVerificationResponse):
+    def handle_gateway_payment(self, payment: Payment, verification_response: PaymentVerificationResponse, commit: bool = True):
+        """
+        Apply a verification result to a payment (and what it pays for).
+        
+        Args:
+            payment: Payment record that was verified
+            verification_response: Result of `verify_gateway_payment`
+            commit: Commit the session when True; batches pass False and commit once
+        """
         # Handle payment completion based on payment type
         if verification_response['status'] == PaymentStatus.COMPLETED:
             self.handle_completed_payment(payment, verification_response)
@@ -197,14 +189,14 @@ class PaymentManager:
             self.handle_failed_payment(payment, verification_response)
         else:
             self.handle_failed_payment(payment, verification_response)
-            
-            
-        db.session.commit()
+        
+        if commit:
+            db.session.commit()
 
     def handle_gateway_webhook(self, webhook_data: PaymentWebhookData | TransferWebhookData):
         event_type = webhook_data.get('event_type')
         
-        console_log("event_type", event_type)
+        console_log("event_type", event_type, level="DEBUG")
     
         if event_type == 'payment':
             return self._handle_payment_webhook(webhook_data)
@@ -234,12 +226,12 @@ class PaymentManager:
         if not payment:
             raise TransactionMissingError(f"Payment not found: {webhook_data['reference']}")
         
-        console_log("payment", payment)
+        console_log("payment", payment, level="DEBUG")
         
         # Validate amount matches
         webhook_amount = Decimal(webhook_data["amount"])
         payment_amount = Decimal(payment.amount)
-        if safe_compare_amounts(webhook_amount, payment_amount):
+        if not safe_compare_amounts(webhook_amount, payment_amount):
             raise ValueError("Verified amount doesn't match payment record")
             
         
@@ -305,30 +297,30 @@ class PaymentManager:
         try:
             payment_type = payment.meta_info.get('payment_type', str(PaymentType.WALLET_TOP_UP))
             
-            console_log("payment_type", payment_type)
+            console_log("payment_type", payment_type, level="DEBUG")
             
             transaction: Transaction = Transaction.query.filter_by(key=payment.key).first()
             
             if payment.status != str(PaymentStatus.COMPLETED):
                 if payment_type == str(PaymentType.WALLET_TOP_UP):
                     user: AppUser = payment.app_user
-                    credit_wallet(user.id, payment.amount, commit=False)
+                    credit_wallet(user.id, payment.amount, commit=False, idempotency_key=f"payment:{payment.key}")
                 
                 elif payment_type == str(PaymentType.ORDER_PAYMENT):
                     order_id = payment.meta_info.get('order_id')
                     if order_id:
                         order: CustomerOrder = CustomerOrder.query.get(order_id)
-                        order.update(status=OrderStatus.PAID)
+                        order.update(status=OrderStatus.PAID, commit=False)
                 
                 elif payment_type == str(PaymentType.SUBSCRIPTION):
                     subscription_id = payment.meta_info.get('subscription_id')
                     if subscription_id:
                         subscription: Subscription = Subscription.query.get(subscription_id)
-                        subscription.extend_validity()
+                        subscription.extend_validity(commit=False)
                 
                 # Update payment status
-                payment.update(status=str(PaymentStatus.COMPLETED))
-                transaction.update(status=str(PaymentStatus.COMPLETED))
+                payment.update(status=str(PaymentStatus.COMPLETED), commit=False)
+                transaction.update(status=str(PaymentStatus.COMPLETED), commit=False)
         except Exception as e:
             log_exception("Payment completion handling failed", e)
             raise e
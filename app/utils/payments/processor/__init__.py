@@ -2,6 +2,7 @@ from enum import Enum
 from decimal import Decimal
 from typing import TypedDict, Optional, Set, Any
 from ...helpers.basics import generate_random_string
+from ..http import GatewayClient, get_gateway_client
 from ....enums.payments import PaymentStatus
 from ..types import PaymentWebhookData, TransferWebhookData
 
@@ -45,6 +46,7 @@ class PaymentProcessor:
     Base class for payment processors.
     """
     reference_prefix = "pay_"  # Default prefix
+    provider_name = "gateway"  # Name of the provider's shared HTTP client
     supported_currencies: Set[str] = {"USD"}  # Default, override in subclasses
     
     def __init__(self, secret_key: str = "", public_key: str = "", api_key: str = ""):
@@ -52,7 +54,20 @@ class PaymentProcessor:
         self.public_key = public_key
         self.api_key = api_key
         self.secret_hash = "42cf4e6d9d8c728003ae3361d5268c23"
-        self.reference = f"{self.reference_prefix}{generate_random_string(10)}"
+    
+    def new_reference(self) -> str:
+        """
+        Generates a payment reference for the provider.
+        
+        Processor instances are shared between requests, so each payment
+        gets its own reference instead of one stored on the processor.
+        """
+        return f"{self.reference_prefix}{generate_random_string(10)}"
+    
+    @property
+    def http(self) -> GatewayClient:
+        """Pooled HTTP client of the provider (timeouts, retries, circuit breaker)."""
+        return get_gateway_client(self.provider_name)
     
     def supports_currency(self, currency: str) -> bool:
         """
@@ -66,11 +81,14 @@ class PaymentProcessor:
         """
         return currency.upper() in self.supported_currencies
 
-    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None) -> PaymentProcessorResponse:
+    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None, reference: Optional[str] = None) -> PaymentProcessorResponse:
         """
         Abstract method for processing payments.
         Must be implemented by subclasses.
         
+        `reference` is our reference of the payment; a new one is generated
+        when it is not given.
+        
         Returns:
             dict: {
                 "status": "success" | "failed",
@@ -1,4 +1,3 @@
-import requests
 from decimal import Decimal
 from typing import Optional, Any
 
@@ -10,8 +9,9 @@ class BitPayProcessor(PaymentProcessor):
     Handles payments via BitPay API.
     """
     reference_prefix = "btp_"
+    provider_name = "bitpay"
     
-    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None) -> PaymentProcessorResponse:
+    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None, reference: Optional[str] = None) -> PaymentProcessorResponse:
         url = "https://bitpay.com/api/v2/invoice"
         headers = {"Authorization": f"Bearer {self.api_key}"}
         data = {
@@ -20,5 +20,5 @@ class BitPayProcessor(PaymentProcessor):
             "buyerEmail": customer_data["email"]
         }
 
-        response = requests.post(url, json=data, headers=headers)
+        response = self.http.post(url, json=data, headers=headers)
         return response.json()
@@ -1,4 +1,4 @@
-import requests, hmac, hashlib
+import hmac, hashlib
 from flask import request, json
 from decimal import Decimal
 from typing import Any, Optional
@@ -16,9 +16,10 @@ class FlutterwaveProcessor(PaymentProcessor):
     Handles payments via Flutterwave API.
     """
     reference_prefix = "flw_"
+    provider_name = "flutterwave"
     supported_currencies = {"NGN", "USD", "GHS", "KES", "ZAR", "EUR", "GBP"}
     
-    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None) -> PaymentProcessorResponse:
+    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None, reference: Optional[str] = None) -> PaymentProcessorResponse:
         """
         Initialize payment with Flutterwave.
         
@@ -26,10 +27,12 @@ class FlutterwaveProcessor(PaymentProcessor):
             amount (float | Decimal): Payment amount
             currency (str): Payment currency code
             customer_data (dict): Customer information (email, name)
+            reference (str, optional): Our payment reference (generated if not given)
             
         Returns:
             PaymentProcessorResponse: Standardized payment response
         """
+        reference = reference or self.new_reference()
         url = "https://api.flutterwave.com/v3/payments"
         
         headers = {
@@ -43,7 +46,7 @@ class FlutterwaveProcessor(PaymentProcessor):
         console_log("redirect_url", redirect_url)
         
         data = {
-            "tx_ref": self.reference,
+            "tx_ref": reference,
             "amount": str(amount_decimal),
             "currency": currency,
             "redirect_url": redirect_url,
@@ -53,18 +56,18 @@ class FlutterwaveProcessor(PaymentProcessor):
             }
         }
 
-        response = requests.post(url, json=data, headers=headers)
+        response = self.http.post(url, json=data, headers=headers)
         response_data = response.json()
         data = response_data.get("data", {})
         
-        console_log("flw init response_data", response_data)
+        console_log("flw init response_data", response_data, level="DEBUG")
         
         payment_response = PaymentProcessorResponse(
             status = "success" if response_data["status"] == "success" else "error",
             message = response_data.get("message", ""),
             payment_id = data.get("reference") if data else "",
             authorization_url = data.get("link") if data else "",
-            reference = self.reference,
+            reference = reference,
         )
         return payment_response
 
@@ -77,11 +80,11 @@ class FlutterwaveProcessor(PaymentProcessor):
             "Content-Type": "application/json"
         }
         
-        response = requests.get(url, headers=headers)
+        response = self.http.get(url, headers=headers)
         response_data = response.json()
         data = response_data.get("data", {})
         
-        console_log("---Flutterwave Response Data for Payment Verification---", response_data)
+        console_log("---Flutterwave Response Data for Payment Verification---", response_data, level="DEBUG")
         
         status_mapping = {
             "successful": PaymentStatus.COMPLETED,
@@ -1,4 +1,4 @@
-import requests, hmac, hashlib
+import hmac, hashlib
 from decimal import Decimal
 from typing import Optional, Any
 from flask import request
@@ -13,9 +13,10 @@ class PaystackProcessor(PaymentProcessor):
     Handles payments via Paystack API.
     """
     reference_prefix = "pst_"
+    provider_name = "paystack"
     supported_currencies = {"NGN", "USD", "GHS"}
     
-    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None) -> PaymentProcessorResponse:
+    def initialize_payment(self, amount: float | Decimal, currency: str, customer_data: dict, redirect_url: Optional[str] = None, reference: Optional[str] = None) -> PaymentProcessorResponse:
         """
         Initialize payment with Paystack.
         
@@ -23,10 +24,12 @@ class PaystackProcessor(PaymentProcessor):
             amount: Payment amount
             currency: Payment currency code
             customer_data: Customer information (email, name)
+            reference: Our payment reference (generated if not given)
             
         Returns:
             PaymentProcessorResponse: Standardized payment response
         """
+        reference = reference or self.new_reference()
         url = "https://api.paystack.co/transaction/initialize"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -37,11 +40,11 @@ class PaystackProcessor(PaymentProcessor):
             "email": customer_data["email"],
             "amount": int(float(amount) * 100),  # Paystack expects amount in kobo
             "currency": currency,
-            "reference": self.reference,
+            "reference": reference,
             "callback_url": redirect_url
         }
 
-        response = requests.post(url, json=data, headers=headers)
+        response = self.http.post(url, json=data, headers=headers)
         response_data = response.json()
         
         payment_response = PaymentProcessorResponse(
@@ -49,7 +52,7 @@ class PaystackProcessor(PaymentProcessor):
             message=response_data.get("message", ""),
             payment_id=response_data.get("data", {}).get("reference"),
             authorization_url=response_data.get("data", {}).get("authorization_url"),
-            reference = self.reference,
+            reference = reference,
         )
         return payment_response
     
@@ -70,7 +73,7 @@ class PaystackProcessor(PaymentProcessor):
             "Content-Type": "application/json"
         }
         
-        response = requests.get(url, headers=headers)
+        response = self.http.get(url, headers=headers)
         response_data = response.json()
         data = response_data.get("data", {})
         
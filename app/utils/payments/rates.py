@@ -1,22 +1,208 @@
 '''
 This module contains the functions for handling conversion rates of currencies
 
+Rates are served by a process-wide `ExchangeRateService`:
+
+    * requests never wait for the rates API while some table is known:
+      tables older than EXCHANGE_RATE_TTL are served as they are while a
+      background thread fetches new ones (stale-while-revalidate),
+    * fetched tables are shared with the other workers through the cache
+      and the last good table is kept in `ExchangeRateSnapshot`, so a cold
+      worker converts with it instead of calling the API,
+    * only a missing table, or one older than EXCHANGE_RATE_MAX_STALE, is
+      fetched in the request.
+
 @author Emmanuel Olowu
 @link: https://github.com/zeddyemy
 '''
-
-import requests
+import os
+import time
 from decimal import Decimal
-from typing import Optional, Any
-from cachetools import cached, TTLCache
+from threading import Lock
+from typing import Iterable, NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, current_app
+from sqlalchemy.exc import SQLAlchemyError
 
 from config import Config
+from ...extensions import db
+from ...models.exchange_rate import ExchangeRateSnapshot
+from ..date_time import DateTimeUtils
 from ..helpers.loggers import console_log, log_exception
+from ..cache import CacheNamespace
+from .http import get_gateway_client
+
+# Fetched tables shared between workers, kept as long as they may be served
+rates_cache = CacheNamespace("exchange_rates", ttl=Config.EXCHANGE_RATE_MAX_STALE)
+
+
+class RateTable(NamedTuple):
+    """Conversion rates of a base currency, as fetched at `fetched_at` (unix time)."""
+    base_currency: str
+    rates: dict[str, Decimal]
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @classmethod
+    def from_raw(cls, base_currency: str, rates: dict, fetched_at: float) -> "RateTable":
+        return cls(base_currency, {code: Decimal(str(rate)) for code, rate in rates.items()}, fetched_at)
+
+
+def _request_rates(base_currency: str) -> Optional[dict]:
+    """Calls the rates API. Returns the raw conversion rates or None."""
+    response = get_gateway_client("exchange_rate_api").get(f"{Config.EXCHANGE_RATE_API_URL}/{base_currency}")
+
+    if response.status_code == 200:
+        response_data = response.json()
+        if response_data.get("result") == "success":
+            return response_data.get('conversion_rates')
+    return None
+
+
+class ExchangeRateService:
+    """
+    Keeps the exchange rate tables of this process up to date.
+
+    Args:
+        ttl: Age (seconds) after which a table is refreshed in the background
+        max_stale: Age (seconds) after which a request waits for a refresh
+    """
+
+    # Seconds before a request tries the API again after a failed fetch
+    RETRY_AFTER = 300
+
+    def __init__(self, ttl: int = Config.EXCHANGE_RATE_TTL, max_stale: int = Config.EXCHANGE_RATE_MAX_STALE):
+        self.ttl = ttl
+        self.max_stale = max_stale
+
+        self._tables: dict[str, RateTable] = {}
+        self._refreshing: set[str] = set()
+        self._failed_at: dict[str, float] = {}
+        self._lock = Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+    def __repr__(self):
+        return f"<ExchangeRateService ({', '.join(self._tables) or 'empty'})>"
+
+    def get_table(self, base_currency: str = "NGN") -> Optional[RateTable]:
+        """
+        Returns the rate table of a base currency.
+
+        Returns:
+            Optional[RateTable]: The table, or None if no rates could ever
+                be fetched for the currency
+        """
+        table = self._tables.get(base_currency) or self._load_shared_table(base_currency)
+
+        if table is None or table.age > self.max_stale:
+            if time.time() - self._failed_at.get(base_currency, 0) < self.RETRY_AFTER:
+                return table
+            return self.refresh(base_currency) or table
+
+        if table.age > self.ttl:
+            self._refresh_in_background(base_currency)
+
+        return table
+
+    def clear(self) -> None:
+        """Forgets the tables of this process (the shared and saved ones stay)."""
+        with self._lock:
+            self._tables.clear()
+            self._failed_at.clear()
+
+    def refresh(self, base_currency: str = "NGN") -> Optional[RateTable]:
+        """
+        Fetches the rates of a base currency and shares them with the other
+        workers. Keeps the current table if the API fails.
+
+        Returns:
+            Optional[RateTable]: The new table, or None if the fetch failed
+        """
+        try:
+            rates = _request_rates(base_currency)
+        except Exception as e:
+            log_exception(f"Fetching {base_currency} exchange rates failed", e)
+            rates = None
+
+        if not rates:
+            self._failed_at[base_currency] = time.time()
+            return None
+
+        table = RateTable.from_raw(base_currency, rates, time.time())
+        self._tables[base_currency] = table
+        rates_cache.set(base_currency, {"rates": rates, "fetched_at": table.fetched_at})
+        self._save_snapshot(base_currency, rates)
+        return table
+
+    def _load_shared_table(self, base_currency: str) -> Optional[RateTable]:
+        """Reads a table fetched by another worker, or the last saved one."""
+        shared = rates_cache.get(base_currency)
+        if shared:
+            table = RateTable.from_raw(base_currency, shared["rates"], shared["fetched_at"])
+        else:
+            snapshot = db.session.get(ExchangeRateSnapshot, base_currency)
+            if snapshot is None:
+                return None
+            fetched_at = snapshot.fetched_at
+            if fetched_at.tzinfo is None:  # SQLite hands back naive datetimes
+                fetched_at = fetched_at.replace(tzinfo=DateTimeUtils.aware_utcnow().tzinfo)
+            table = RateTable.from_raw(base_currency, snapshot.rates, fetched_at.timestamp())
+
+        self._tables[base_currency] = table
+        return table
+
+    def _save_snapshot(self, base_currency: str, rates: dict) -> None:
+        # Own transaction: the caller's session may hold unrelated changes
+        try:
+            with db.engine.begin() as connection:
+                table = ExchangeRateSnapshot.__table__
+                values = {"rates": rates, "fetched_at": DateTimeUtils.aware_utcnow()}
+                updated = connection.execute(
+                    table.update().where(table.c.base_currency == base_currency).values(**values)
+                ).rowcount
+                if not updated:
+                    connection.execute(table.insert().values(base_currency=base_currency, **values))
+        except SQLAlchemyError as e:
+            log_exception(f"Saving {base_currency} exchange rates failed", e)
+
+    def _refresh_in_background(self, base_currency: str) -> None:
+        with self._lock:
+            # Threads do not survive a fork: every worker process needs its own
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exchange-rates")
+                self._executor_pid = os.getpid()
+                self._refreshing.clear()
+
+            if base_currency in self._refreshing:
+                return
+            self._refreshing.add(base_currency)
+            executor = self._executor
+
+        executor.submit(self._refresh_in_app_context, current_app._get_current_object(), base_currency)
+
+    def _refresh_in_app_context(self, app: Flask, base_currency: str) -> None:
+        with app.app_context():
+            try:
+                # Another worker may have refreshed the table meanwhile
+                shared = self._load_shared_table(base_currency)
+                if shared is None or shared.age > self.ttl:
+                    self.refresh(base_currency)
+            except Exception as e:
+                log_exception(f"Background refresh of {base_currency} exchange rates failed", e)
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._refreshing.discard(base_currency)
+
+
+rate_service = ExchangeRateService()
 
-# Create a cache with a Time-To-Live (TTL) of 12 hour (43200 seconds)
-cache = TTLCache(maxsize=100, ttl=864000)
 
-@cached(cache)
 def fetch_exchange_rates(base_currency: str = "NGN") -> Optional[dict]:
     """
     Fetch exchange rates for a given base currency.
@@ -27,26 +213,39 @@ def fetch_exchange_rates(base_currency: str = "NGN") -> Optional[dict]:
     Returns:
         Optional[dict]: A dictionary of conversion rates or None if failed
     """
-    response = requests.get(f"{Config.EXCHANGE_RATE_API_URL}/{base_currency}")
-    
-    if response.status_code == 200:
-        response_data = response.json()
-        if response_data.get("result") == "success":
-            return response_data.get('conversion_rates')
-    return None
+    table = rate_service.get_table(base_currency)
+    return table.rates if table else None
 
 
 def convert_amount(amount_in_ngn, target_currency, format=True) -> str | Decimal:
-    from .utils import format_currency, format_price
-    
-    exchange_rates = fetch_exchange_rates()
-    
-    converted_amount = amount_in_ngn # Default to dollar if no rate is found
-    
-    if target_currency in exchange_rates:
-        converted_amount = Decimal(amount_in_ngn) * Decimal(exchange_rates[target_currency])
-    
-    amount = round(converted_amount, 2)
-    amount = format_currency(amount) if format else amount
-    return amount
+    return convert_many([amount_in_ngn], target_currency, format)[0]
+
+
+def convert_many(amounts: Iterable, target_currency: str, format: bool = True) -> list[str | Decimal]:
+    """
+    Converts NGN amounts to a currency, looking the rate up once.
+
+    Amounts are left as they are when no rate is known for the currency.
+
+    Args:
+        amounts: Amounts in NGN
+        target_currency: Currency code to convert to
+        format: Return formatted strings instead of Decimals
+
+    Returns:
+        list: Converted amounts, in the order given
+    """
+    from ..helpers.money import format_money
+
+    rates = fetch_exchange_rates() or {}
+    rate = rates.get(target_currency)
+    if rate is None:
+        console_log("exchange rate missing", target_currency)
+
+    converted = []
+    for amount in amounts:
+        amount = Decimal(amount) if amount is not None else Decimal(0)
+        amount = round(amount * rate if rate is not None else amount, 2)
+        converted.append(format_money(amount) if format else amount)
 
+    return converted
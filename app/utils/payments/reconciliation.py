@@ -0,0 +1,205 @@
+'''
+Reconciliation of payments left pending.
+
+A gateway payment normally leaves `pending` when the user comes back to
+`/payments/verify` or when the provider's webhook arrives. When neither
+happens (closed tab, lost webhook) the sweeper settles it:
+
+    * pending payments older than RECONCILE_MIN_AGE_MINUTES are read in
+      pages, oldest first,
+    * each page is verified with the gateway in worker threads, at most
+      RECONCILE_CONCURRENCY calls at a time per provider,
+    * final results (completed, failed, abandoned...) are applied through
+      `PaymentManager.handle_gateway_payment`, one savepoint per payment
+      and one commit per page. Payments still pending at the gateway, or
+      whose verification failed, are left for the next run.
+
+Run it from a scheduler (e.g. cron) with `flask payments reconcile`.
+
+@author: Emmanuel Olowu
+@link: https://github.com/zeddyemy
+'''
+from datetime import timedelta
+from threading import Lock
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, current_app
+
+from ...extensions import db
+from ...models import Payment
+from ...enums import PaymentStatus
+from ..date_time import DateTimeUtils
+from ..helpers.loggers import console_log, log_exception
+from .processor import PaymentVerificationResponse
+from .registry import get_gateway_config
+
+
+# Gateway statuses that settle a payment; anything else is checked again later
+FINAL_STATUSES = {
+    PaymentStatus.COMPLETED,
+    PaymentStatus.FAILED,
+    PaymentStatus.ABANDONED,
+    PaymentStatus.CANCELLED,
+    PaymentStatus.EXPIRED,
+}
+
+_last_run: dict = {}
+_last_run_lock = Lock()
+
+
+def get_stale_pending_payments(older_than: timedelta, batch_size: int, after_id: int = 0) -> list[Payment]:
+    """
+    Returns a page of pending payments created before `older_than` ago,
+    ordered by id (keyset on id, so settled payments do not shift pages).
+    """
+    created_before = DateTimeUtils.aware_utcnow() - older_than
+    return (
+        Payment.query
+        .filter(
+            Payment.status == str(PaymentStatus.PENDING),
+            Payment.created_at <= created_before,
+            Payment.id > after_id,
+        )
+        .order_by(Payment.id)
+        .limit(batch_size)
+        .all()
+    )
+
+
+def _verify_payment(payment_id: int) -> tuple[int, Optional[PaymentVerificationResponse], Optional[str]]:
+    from .payment_manager import PaymentManager
+
+    try:
+        payment = db.session.get(Payment, payment_id)
+        return payment_id, PaymentManager().verify_gateway_payment(payment, raise_errors=True), None
+    except Exception as e:
+        return payment_id, None, str(e)
+
+
+def _verify_in_app_context(app: Flask, payment_id: int):
+    # Worker threads use a session of their own
+    with app.app_context():
+        try:
+            return _verify_payment(payment_id)
+        finally:
+            db.session.remove()
+
+
+def _apply_results(payments: dict[int, Payment], results: list[tuple], stats: dict) -> None:
+    from .payment_manager import PaymentManager
+
+    payment_manager = PaymentManager()
+
+    for payment_id, verification, error in results:
+        if error is not None:
+            stats["errors"] += 1
+            continue
+
+        if verification["status"] not in FINAL_STATUSES:
+            stats["still_pending"] += 1
+            continue
+
+        try:
+            with db.session.begin_nested():
+                payment_manager.handle_gateway_payment(payments[payment_id], verification, commit=False)
+        except Exception as e:
+            log_exception(f"Reconciling payment {payment_id} failed", e)
+            stats["errors"] += 1
+            continue
+
+        stats[str(verification["status"])] = stats.get(str(verification["status"]), 0) + 1
+        stats["settled"] += 1
+
+    db.session.commit()
+
+
+def reconcile_pending_payments(
+        min_age_minutes: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        limit: Optional[int] = None,
+        progress: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+    """
+    Settles pending gateway payments with the provider's verdict.
+
+    Args:
+        min_age_minutes: Only payments at least this old (RECONCILE_MIN_AGE_MINUTES)
+        batch_size: Payments read, verified and committed together (RECONCILE_BATCH_SIZE)
+        concurrency: Gateway calls in flight per provider (RECONCILE_CONCURRENCY);
+            0 verifies in the calling thread
+        limit: Maximum number of payments to check in this run
+        progress: Called with the running stats after each page
+
+    Returns:
+        dict: Stats of the run: checked, settled, still_pending, skipped,
+            errors, a count per final status and the duration in seconds
+    """
+    config = current_app.config
+    min_age_minutes = config.get("RECONCILE_MIN_AGE_MINUTES", 15) if min_age_minutes is None else min_age_minutes
+    batch_size = batch_size or config.get("RECONCILE_BATCH_SIZE", 50)
+    concurrency = config.get("RECONCILE_CONCURRENCY", 4) if concurrency is None else concurrency
+
+    started = DateTimeUtils.aware_utcnow()
+    stats = {"checked": 0, "settled": 0, "still_pending": 0, "skipped": 0, "errors": 0}
+    executors: dict[str, ThreadPoolExecutor] = {}
+    app = current_app._get_current_object()
+    provider = get_gateway_config().provider
+    after_id = 0
+
+    try:
+        while limit is None or stats["checked"] + stats["skipped"] < limit:
+            page_size = batch_size if limit is None else min(batch_size, limit - stats["checked"] - stats["skipped"])
+            payments = get_stale_pending_payments(timedelta(minutes=min_age_minutes), page_size, after_id)
+            if not payments:
+                break
+            after_id = payments[-1].id
+
+            # Only the configured gateway has credentials to verify with
+            to_verify = {payment.id: payment for payment in payments if payment.payment_method == provider}
+            stats["skipped"] += len(payments) - len(to_verify)
+            stats["checked"] += len(to_verify)
+
+            if concurrency <= 0:
+                results = [_verify_payment(payment_id) for payment_id in to_verify]
+            else:
+                executor = executors.get(provider)
+                if executor is None:
+                    executor = executors[provider] = ThreadPoolExecutor(concurrency, thread_name_prefix=f"reconcile-{provider}")
+                futures = [executor.submit(_verify_in_app_context, app, payment_id) for payment_id in to_verify]
+                results = [future.result() for future in futures]
+
+            _apply_results(to_verify, results, stats)
+
+            if progress:
+                progress(dict(stats))
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+
+    stats["duration_seconds"] = round((DateTimeUtils.aware_utcnow() - started).total_seconds(), 3)
+    console_log("payment reconciliation", stats)
+
+    with _last_run_lock:
+        _last_run.clear()
+        _last_run.update(stats, finished_at=DateTimeUtils.aware_utcnow().isoformat())
+
+    return stats
+
+
+def get_reconciliation_metrics() -> dict:
+    """
+    Returns the stats of the last run in this process and the number of
+    payments currently waiting to be reconciled.
+    """
+    with _last_run_lock:
+        last_run = dict(_last_run)
+
+    min_age = timedelta(minutes=current_app.config.get("RECONCILE_MIN_AGE_MINUTES", 15))
+    waiting = Payment.query.filter(
+        Payment.status == str(PaymentStatus.PENDING),
+        Payment.created_at <= DateTimeUtils.aware_utcnow() - min_age,
+    ).count()
+
+    return {"last_run": last_run, "waiting": waiting}
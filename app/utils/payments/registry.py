@@ -0,0 +1,104 @@
+'''
+Registry of the configured payment processor.
+
+The active gateway, its parsed credentials and its processor are built
+once per settings version and shared by every request of the process
+(top-ups, the payments API, webhooks). Saving payment settings bumps the
+settings version, so the next call rebuilds them.
+
+Processors are stateless: per-payment data such as the payment reference
+is passed to their methods, so one instance can serve concurrent requests.
+
+@author: Emmanuel Olowu
+@link: https://github.com/zeddyemy
+'''
+from threading import Lock
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from .processor import PaymentProcessor
+from .processor.bitpay import BitPayProcessor
+from .processor.flutterwave import FlutterwaveProcessor
+from .processor.paystack import PaystackProcessor
+from ..helpers.settings import get_active_payment_gateway, get_settings_snapshot
+
+
+PROCESSOR_CLASSES: dict[str, type[PaymentProcessor]] = {
+    "bitpay": BitPayProcessor,
+    "flutterwave": FlutterwaveProcessor,
+    "paystack": PaystackProcessor,
+}
+
+
+class GatewayConfig(NamedTuple):
+    """Active payment gateway of one settings version."""
+    version: int
+    provider: str
+    credentials: MappingProxyType
+    test_mode: bool
+    processor: Optional[PaymentProcessor]
+
+
+_config: Optional[GatewayConfig] = None
+_config_lock = Lock()
+
+
+def _build_gateway_config(version: int) -> GatewayConfig:
+    payment_gateway = get_active_payment_gateway()
+    provider = payment_gateway.get("provider", "")
+    credentials = payment_gateway.get("credentials") or {}
+
+    # Convert test_mode to boolean
+    test_mode = str(credentials.get("test_mode", "false")).lower() == "true"
+
+    processor = None
+    processor_class = PROCESSOR_CLASSES.get(provider)
+    if processor_class and credentials:
+        processor = processor_class(
+            secret_key=credentials.get("test_secret_key" if test_mode else "secret_key", ""),
+            public_key=credentials.get("test_public_key" if test_mode else "public_key", ""),
+            api_key=credentials.get("test_api_key" if test_mode else "api_key", ""),
+        )
+
+    return GatewayConfig(version, provider, MappingProxyType(credentials), test_mode, processor)
+
+
+def get_gateway_config() -> GatewayConfig:
+    """
+    Returns the active gateway of the current settings version.
+
+    Returns:
+        GatewayConfig: Provider, credentials and processor (`provider` is
+            empty and `processor` None when no gateway is set up)
+    """
+    global _config
+
+    version = get_settings_snapshot().version
+    config = _config
+
+    if config is None or config.version != version:
+        with _config_lock:
+            config = _config
+            if config is None or config.version != version:
+                config = _config = _build_gateway_config(version)
+
+    return config
+
+
+def get_payment_processor() -> Optional[PaymentProcessor]:
+    """
+    Returns the shared processor of the configured gateway.
+
+    Returns:
+        Optional[PaymentProcessor]: The processor, or None if no supported
+            gateway is set up
+    """
+    return get_gateway_config().processor
+
+
+def reset_payment_registry() -> None:
+    """Drops the cached gateway, e.g. in tests."""
+    global _config
+
+    with _config_lock:
+        _config = None
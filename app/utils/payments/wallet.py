@@ -4,144 +4,287 @@ This module defines helper functions to carry out user wallet operations.
 These functions assist with operations such as:
     * crediting wallet
     * debiting wallet
-    * fetching wallet balance. e.t.c...
+    * refunding to wallet
+    * crediting many wallets at once. e.t.c...
+
+Every operation is a wallet ledger posting: the balance is changed with a
+single conditional `UPDATE` (so two concurrent debits can never both pass
+the balance check) and an append-only `WalletEntry` records the change.
+Postings are made in a savepoint, so a failed one leaves the caller's
+transaction untouched, and postings with an idempotency key are applied
+only once.
 
 @author: Emmanuel Olowu
 @link: https://github.com/zeddyemy
 '''
 from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
 
 from ...extensions import db
-from ...models import Wallet, AppUser
-from ..date_time import DateTimeUtils
+from ...models import Wallet, WalletEntry, AppUser
+from ...models.stats import bump_stat_counter
+from ...enums import WalletEntryType
 from ..helpers.loggers import console_log, log_exception
-from ..helpers.basics import generate_random_string
-from ..helpers.http_response import error_response, success_response
 from ..helpers.money import quantize_amount
 
 from config import Config
 
 
+def _wallet_error(user_id: int) -> str:
+    """Explains why a wallet update matched no row."""
+    if db.session.execute(db.select(Wallet.id).where(Wallet.user_id == user_id)).first():
+        return "Insufficient balance."
+    if db.session.execute(db.select(AppUser.id).where(AppUser.id == user_id)).first():
+        return "User does not have a wallet."
+    return "User not found."
+
 
-def debit_wallet(user_id: int, amount: int, payment_type=None, commit: bool = True) -> Decimal:
+def _update_balances(amounts: dict[int, Decimal], require_funds: bool = False) -> dict[int, tuple[int, Decimal]]:
     """
-    Debit the user's wallet.
+    Adds signed amounts to the balances of several users' wallets in one
+    UPDATE, which also locks the wallet rows until the transaction ends.
+
+    Returns:
+        dict: {user_id: (wallet_id, new_balance)} for the wallets updated
+    """
+    table = Wallet.__table__
+    balance = func.coalesce(table.c._balance, 0)
+
+    if len(amounts) == 1:
+        [(user_id, amount)] = amounts.items()
+        change = amount
+        statement = table.update().where(table.c.user_id == user_id)
+        if require_funds and amount < 0:
+            statement = statement.where(balance >= -amount)
+    else:
+        change = case(amounts, value=table.c.user_id)
+        statement = table.update().where(table.c.user_id.in_(amounts))
+
+    statement = statement.values(_balance=balance + change)
+
+    if db.engine.dialect.update_returning:
+        rows = db.session.execute(statement.returning(table.c.user_id, table.c.id, table.c._balance)).all()
+    else:
+        # No RETURNING (e.g. MySQL): the rows stay locked by the UPDATE, so
+        # reading them back in the same transaction sees our own change
+        if not db.session.execute(statement).rowcount:
+            return {}
+        rows = db.session.execute(
+            db.select(table.c.user_id, table.c.id, table.c._balance).where(table.c.user_id.in_(amounts))
+        ).all()
+
+    # Core UPDATE: the dashboard's running total is not seen by the flush listener
+    bump_stat_counter("wallet_balance", amount=sum((amounts[user_id] for user_id, _, _ in rows), Decimal(0)))
+
+    return {user_id: (wallet_id, Decimal(balance)) for user_id, wallet_id, balance in rows}
+
+
+def _expire_balances(wallet_ids: Iterable[int]) -> None:
+    """Makes loaded Wallet objects reload the balances changed behind the ORM's back."""
+    for wallet_id in wallet_ids:
+        wallet = db.session.identity_map.get(db.inspect(Wallet).identity_key_from_primary_key((wallet_id,)))
+        if wallet is not None:
+            db.session.expire(wallet, ["_balance"])
+
+
+def _get_posted_entries(idempotency_keys: Iterable[str]) -> dict[str, WalletEntry]:
+    keys = [key for key in idempotency_keys if key]
+    if not keys:
+        return {}
+    entries = WalletEntry.query.filter(WalletEntry.idempotency_key.in_(keys)).all()
+    return {entry.idempotency_key: entry for entry in entries}
+
+
+def post_wallet_entry(
+        user_id: int,
+        amount: int | float | Decimal,
+        entry_type: WalletEntryType = WalletEntryType.CREDIT,
+        idempotency_key: Optional[str] = None,
+        narration: Optional[str] = None,
+        commit: bool = True,
+    ) -> Decimal:
+    """
+    Posts a single entry to a user's wallet.
 
     Args:
         user_id (int): ID of the user
-        amount (int): Amount to debit
+        amount (int | float | Decimal): Amount to post (positive)
+        entry_type (WalletEntryType): Debits are subtracted, everything else added
+        idempotency_key (str, optional): Key of the operation (e.g. a payment
+            reference); posting the same key twice only applies it once
+        narration (str, optional): Description of the entry
+        commit (bool): Commit the session when True
 
     Returns:
-        Decimal: Updated wallet balance
+        Decimal: Updated wallet balance (for a replayed key, the balance the
+            original posting left)
+
+    Raises:
+        ValueError: If the user or wallet does not exist, or funds are insufficient
     """
-    user: AppUser = AppUser.query.get(user_id)
-    
-    if user is None:
-        raise ValueError("User not found.")
-    
-    wallet: Wallet = user.wallet
-
-    if wallet is None:
-        raise ValueError("User does not have a wallet.")
-
-    current_balance = wallet.balance
-    amount =  Decimal(amount)
-    amount = quantize_amount(amount)
-    
-    console_log('current_balance', current_balance)
-    
-    if current_balance < amount:
-        raise ValueError("Insufficient balance.")
+    amount = quantize_amount(Decimal(amount))
+    signed_amount = -amount if entry_type == WalletEntryType.DEBIT else amount
+
+    if idempotency_key:
+        posted = _get_posted_entries([idempotency_key]).get(idempotency_key)
+        if posted:
+            console_log("wallet entry already posted", idempotency_key)
+            return posted.balance_after
 
-    
     try:
-        # Debit the wallet
-        wallet.balance -= amount
-        key = generate_random_string(16)
-        
+        with db.session.begin_nested():
+            updated = _update_balances({user_id: signed_amount}, require_funds=True)
+            if user_id not in updated:
+                raise ValueError(_wallet_error(user_id))
+
+            wallet_id, balance = updated[user_id]
+            db.session.execute(db.insert(WalletEntry), [{
+                "wallet_id": wallet_id,
+                "entry_type": str(entry_type),
+                "amount": signed_amount,
+                "balance_after": balance,
+                "idempotency_key": idempotency_key,
+                "narration": narration,
+            }])
+    except IntegrityError:
+        # The same key was posted by a concurrent request; its posting wins
+        posted = _get_posted_entries([idempotency_key]).get(idempotency_key)
+        if posted:
+            return posted.balance_after
+        raise
+
+    _expire_balances([wallet_id])
+    if commit:
+        db.session.commit()
+
+    return balance
+
+
+def credit_wallets(
+        credits: Iterable[tuple],
+        entry_type: WalletEntryType = WalletEntryType.CREDIT,
+        narration: Optional[str] = None,
+        commit: bool = True,
+    ) -> dict[int, Decimal]:
+    """
+    Credits many wallets with one balance UPDATE and one entries INSERT.
+
+    Args:
+        credits: `(user_id, amount)` or `(user_id, amount, idempotency_key)`
+            tuples; a user may appear more than once
+        entry_type (WalletEntryType): Type of the entries (credit or refund)
+        narration (str, optional): Description of the entries
+        commit (bool): Commit the session when True
+
+    Returns:
+        dict: {user_id: updated wallet balance} for the wallets credited
+
+    Raises:
+        ValueError: If any of the users has no wallet (nothing is credited)
+    """
+    credits = [
+        (user_id, quantize_amount(Decimal(amount)), rest[0] if rest else None)
+        for user_id, amount, *rest in credits
+    ]
+
+    # Drop operations that were already applied
+    posted = _get_posted_entries(key for _, _, key in credits)
+    credits = [credit for credit in credits if not credit[2] or credit[2] not in posted]
+    if not credits:
+        return {}
+
+    totals: dict[int, Decimal] = {}
+    for user_id, amount, _ in credits:
+        totals[user_id] = totals.get(user_id, Decimal(0)) + amount
+
+    try:
+        with db.session.begin_nested():
+            updated = _update_balances(totals)
+            missing = [user_id for user_id in totals if user_id not in updated]
+            if missing:
+                raise ValueError(f"Users without a wallet: {missing}")
+
+            # Rebuild each entry's running balance from the wallet's final one
+            running = {user_id: updated[user_id][1] - total for user_id, total in totals.items()}
+            entries = []
+            for user_id, amount, key in credits:
+                running[user_id] += amount
+                entries.append({
+                    "wallet_id": updated[user_id][0],
+                    "entry_type": str(entry_type),
+                    "amount": amount,
+                    "balance_after": running[user_id],
+                    "idempotency_key": key,
+                    "narration": narration,
+                })
+            db.session.execute(db.insert(WalletEntry), entries)
+    except IntegrityError:
+        # A key was posted concurrently: post one by one so the rest still go through
+        console_log("batch credit conflict", "falling back to single postings")
+        balances = {}
+        for user_id, amount, key in credits:
+            balances[user_id] = post_wallet_entry(user_id, amount, entry_type, key, narration, commit=False)
         if commit:
             db.session.commit()
-        console_log('current_balance', wallet.balance)
-        return wallet.balance
-    except Exception as e:
-        # Handle the exception appropriately (rollback, log the error, etc.)
-        db.session.rollback()
-        raise e
+        return balances
 
+    _expire_balances(wallet_id for wallet_id, _ in updated.values())
+    if commit:
+        db.session.commit()
 
-def credit_wallet(user_id: int, amount: int | float | Decimal, commit: bool = True) -> Decimal:
+    return {user_id: balance for user_id, (_, balance) in updated.items()}
+
+
+def debit_wallet(user_id: int, amount: int, payment_type=None, commit: bool = True, idempotency_key: Optional[str] = None) -> Decimal:
     """
-    Credit the user's wallet.
+    Debit the user's wallet.
 
     Args:
         user_id (int): ID of the user
-        amount (int | float | Decimal): Amount to credit
+        amount (int): Amount to debit
+        idempotency_key (str, optional): Key making retries of the same debit safe
 
     Returns:
         Decimal: Updated wallet balance
     """
-    user: AppUser = AppUser.query.get(user_id)
-    
-    if user is None:
-        raise ValueError("User not found.")
-    
-    wallet: Wallet = user.wallet
-
-    if wallet is None:
-        raise ValueError("User does not have a wallet.")
-    
-    amount =  Decimal(amount)
-    amount = quantize_amount(amount)
+    narration = f"{payment_type} payment" if payment_type else None
+    return post_wallet_entry(user_id, amount, WalletEntryType.DEBIT, idempotency_key, narration, commit)
 
 
-    try:
-        # Credit the wallet
-        wallet.balance += amount
-        if commit:
-            db.session.commit()
-        return wallet.balance
-    except Exception as e:
-        # Handle the exception appropriately (rollback, log the error, etc.)
-        db.session.rollback()
-        raise e
+def credit_wallet(user_id: int, amount: int | float | Decimal, commit: bool = True, idempotency_key: Optional[str] = None) -> Decimal:
+    """
+    Credit the user's wallet.
+
+    Args:
+        user_id (int): ID of the user
+        amount (int | float | Decimal): Amount to credit
+        idempotency_key (str, optional): Key making retries of the same credit safe
+
+    Returns:
+        Decimal: Updated wallet balance
+    """
+    return post_wallet_entry(user_id, amount, WalletEntryType.CREDIT, idempotency_key, commit=commit)
 
 
-def refund_to_wallet(user_id: int, amount: int | float | Decimal, commit: bool = True) -> Decimal:
+def refund_to_wallet(user_id: int, amount: int | float | Decimal, commit: bool = True, idempotency_key: Optional[str] = None) -> Decimal:
     """
     This function processes a refund for a user with a 1.5% fee deduction.
 
     Args:
         user_id: The ID of the user to be refunded.
         amount: The original amount paid.
+        idempotency_key (str, optional): Key making retries of the same refund safe
 
     Returns:
         wallet ballance if the refund was successful, raises exception otherwise.
     """
-    user: AppUser = AppUser.query.get(user_id)
-    
-    if user is None:
-        raise ValueError("User not found.")
-    
-    wallet: Wallet = user.wallet
-
-    if wallet is None:
-        raise ValueError("User does not have a wallet.")
-    
     amount = quantize_amount(amount)
-    
+
     fee_percentage = Decimal('0.015')  # Represents 1.5% as a decimal
     fee = amount * fee_percentage
     refund_amount = amount - fee
-    
-    try:
-        # Credit the wallet
-        wallet.balance += Decimal(refund_amount)
-        if commit:
-            db.session.commit()
-        
-        return wallet.balance
-    except Exception as e:
-        # Handle the exception appropriately (rollback, log the error, etc.)
-        db.session.rollback()
-        raise e
 
+    return post_wallet_entry(user_id, refund_amount, WalletEntryType.REFUND, idempotency_key, "Refund (less 1.5% fee)", commit)
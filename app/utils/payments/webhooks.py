@@ -0,0 +1,317 @@
+'''
+Webhook inbox for payment provider events.
+
+Webhooks are stored and acknowledged in the request; applying them
+(`PaymentManager.handle_gateway_webhook`) happens in a pool of worker
+threads:
+
+    * an event is stored once per (provider, event id), so provider
+      retries of an event already received are dropped,
+    * a worker must claim an event with a conditional UPDATE before
+      applying it, so it is applied by one worker only,
+    * the event is marked processed in the same transaction as the
+      payment changes it causes,
+    * failed events are retried with exponential backoff (see the
+      `flask webhooks process` command) until WEBHOOK_MAX_ATTEMPTS.
+
+@author: Emmanuel Olowu
+@link: https://github.com/zeddyemy
+'''
+import os
+from datetime import timedelta
+from decimal import Decimal
+from threading import Lock
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, current_app
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from ...extensions import db
+from ...models import WebhookEvent
+from ...enums import PaymentStatus
+from ..date_time import DateTimeUtils
+from ..helpers.loggers import console_log, log_exception
+from ..instrumentation import observe_webhook_event
+from .types import PaymentWebhookData, TransferWebhookData
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = Lock()
+
+_metrics = {
+    "received": 0,
+    "duplicates": 0,
+    "processed": 0,
+    "failed": 0,
+    "retries": 0,
+    "dead": 0,
+    "lag_seconds_total": 0.0,
+    "lag_seconds_max": 0.0,
+}
+_metrics_lock = Lock()
+
+
+def _record(**changes) -> None:
+    with _metrics_lock:
+        for name, value in changes.items():
+            _metrics[name] += value
+
+
+def _record_lag(lag: float) -> None:
+    with _metrics_lock:
+        _metrics["lag_seconds_total"] += lag
+        _metrics["lag_seconds_max"] = max(_metrics["lag_seconds_max"], lag)
+
+
+def _as_aware(value):
+    # SQLite hands back naive datetimes
+    return value if value is None or value.tzinfo else value.replace(tzinfo=DateTimeUtils.aware_utcnow().tzinfo)
+
+
+def get_webhook_event_id(payload: dict, webhook_data: PaymentWebhookData | TransferWebhookData) -> str:
+    """
+    Builds the key identifying an event of a provider.
+
+    The provider's transaction id alone is not enough: the same transaction
+    is reported by several events (e.g. pending then successful).
+    """
+    event = payload.get("event") or webhook_data.get("event_type", "")
+    identifier = webhook_data.get("provider_reference") or webhook_data.get("reference", "")
+    return f"{event}:{identifier}:{webhook_data.get('status')}"
+
+
+def _serialize_webhook_data(webhook_data: PaymentWebhookData | TransferWebhookData) -> dict:
+    data = {key: value for key, value in webhook_data.items() if key != "raw_data"}
+    data["amount"] = str(data.get("amount", 0))
+    data["status"] = str(data.get("status", ""))
+    return data
+
+
+def _deserialize_webhook_data(event: WebhookEvent) -> PaymentWebhookData | TransferWebhookData:
+    data = dict(event.data)
+    data["amount"] = Decimal(data.get("amount", 0))
+    if data.get("event_type") == "payment" and data.get("status") in PaymentStatus._value2member_map_:
+        data["status"] = PaymentStatus(data["status"])
+    data["raw_data"] = event.payload
+    return data
+
+
+def enqueue_webhook_event(provider: str, payload: dict, webhook_data: PaymentWebhookData | TransferWebhookData) -> Optional[int]:
+    """
+    Stores a verified webhook event in the inbox.
+
+    Args:
+        provider: Name of the payment provider
+        payload: Raw webhook payload
+        webhook_data: Payload parsed by the provider's processor
+
+    Returns:
+        int | None: ID of the stored event, or None if the event was
+            already received
+    """
+    event = WebhookEvent(
+        provider=provider,
+        event_id=get_webhook_event_id(payload, webhook_data),
+        event_type=webhook_data.get("event_type"),
+        reference=webhook_data.get("reference"),
+        payload=payload,
+        data=_serialize_webhook_data(webhook_data),
+        status=WebhookEvent.PENDING,
+    )
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(event)
+    except IntegrityError:
+        console_log("duplicate webhook event", event.event_id)
+        _record(duplicates=1)
+        return None
+
+    db.session.commit()
+    _record(received=1)
+    return event.id
+
+
+def claim_webhook_event(event_id: int) -> bool:
+    """
+    Marks an event as being processed, unless another worker holds it.
+
+    Events stuck in `processing` (their worker died) can be claimed again
+    once their lease (WEBHOOK_LEASE_SECONDS) has run out.
+    """
+    now = DateTimeUtils.aware_utcnow()
+    lease_expired = now - timedelta(seconds=current_app.config.get("WEBHOOK_LEASE_SECONDS", 300))
+    table = WebhookEvent.__table__
+
+    result = db.session.execute(
+        table.update()
+        .where(
+            table.c.id == event_id,
+            or_(
+                and_(table.c.status.in_([WebhookEvent.PENDING, WebhookEvent.FAILED]), table.c.next_attempt_at <= now),
+                and_(table.c.status == WebhookEvent.PROCESSING, table.c.locked_at < lease_expired),
+            )
+        )
+        .values(status=WebhookEvent.PROCESSING, locked_at=now, attempts=table.c.attempts + 1)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _record_failure(event_id: int, error: Exception) -> None:
+    event: WebhookEvent = db.session.get(WebhookEvent, event_id)
+    event.last_error = str(error)[:1000]
+    event.locked_at = None
+
+    if event.attempts >= current_app.config.get("WEBHOOK_MAX_ATTEMPTS", 8):
+        event.status = WebhookEvent.DEAD
+        _record(failed=1, dead=1)
+    else:
+        backoff = current_app.config.get("WEBHOOK_RETRY_BASE_SECONDS", 30) * 2 ** (event.attempts - 1)
+        event.status = WebhookEvent.FAILED
+        event.next_attempt_at = DateTimeUtils.aware_utcnow() + timedelta(seconds=backoff)
+        _record(failed=1)
+
+    db.session.commit()
+
+
+def process_webhook_event(event_id: int) -> bool:
+    """
+    Applies a stored webhook event, if it can be claimed.
+
+    Returns:
+        bool: True if the event was applied by this call
+    """
+    from .payment_manager import PaymentManager
+
+    if not claim_webhook_event(event_id):
+        return False
+
+    event: WebhookEvent = db.session.get(WebhookEvent, event_id)
+    if event.attempts > 1:
+        _record(retries=1)
+
+    try:
+        webhook_data = _deserialize_webhook_data(event)
+
+        # Committed together with the payment changes the event causes
+        event.status = WebhookEvent.PROCESSED
+        event.processed_at = DateTimeUtils.aware_utcnow()
+        event.locked_at = None
+        event.last_error = None
+
+        PaymentManager().handle_gateway_webhook(webhook_data)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        log_exception(f"Processing webhook event {event_id} failed", e)
+        _record_failure(event_id, e)
+        observe_webhook_event(event.provider, "failed")
+        return False
+
+    lag = (_as_aware(event.processed_at) - _as_aware(event.received_at)).total_seconds()
+    _record(processed=1)
+    _record_lag(lag)
+    observe_webhook_event(event.provider, "processed", lag)
+    return True
+
+
+def process_due_webhook_events(limit: int = 100) -> int:
+    """
+    Applies events waiting for a (re)try, oldest first.
+
+    Returns:
+        int: Number of events applied
+    """
+    now = DateTimeUtils.aware_utcnow()
+    lease_expired = now - timedelta(seconds=current_app.config.get("WEBHOOK_LEASE_SECONDS", 300))
+
+    event_ids = db.session.execute(
+        db.select(WebhookEvent.id)
+        .where(or_(
+            and_(WebhookEvent.status.in_([WebhookEvent.PENDING, WebhookEvent.FAILED]), WebhookEvent.next_attempt_at <= now),
+            and_(WebhookEvent.status == WebhookEvent.PROCESSING, WebhookEvent.locked_at < lease_expired),
+        ))
+        .order_by(WebhookEvent.id)
+        .limit(limit)
+    ).scalars().all()
+
+    return sum(process_webhook_event(event_id) for event_id in event_ids)
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        # Threads do not survive a fork: every worker process needs its own pool
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="webhooks")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _process_in_app_context(app: Flask, event_id: int) -> None:
+    with app.app_context():
+        try:
+            process_webhook_event(event_id)
+        except Exception as e:
+            log_exception(f"Webhook worker failed on event {event_id}", e)
+        finally:
+            db.session.remove()
+
+
+def dispatch_webhook_event(event_id: int) -> None:
+    """
+    Hands a stored event to the worker pool.
+
+    With WEBHOOK_WORKERS set to 0 the event is applied right away, in the
+    calling thread.
+    """
+    max_workers = current_app.config.get("WEBHOOK_WORKERS", 4)
+    if max_workers <= 0:
+        process_webhook_event(event_id)
+        return
+
+    _get_executor(max_workers).submit(_process_in_app_context, current_app._get_current_object(), event_id)
+
+
+def get_webhook_metrics() -> dict:
+    """
+    Returns counters of this worker process and the state of the inbox.
+
+    Returns:
+        dict: {
+            "counters": received, duplicates, processed, failed, retries, dead,
+                average and max lag (received -> processed) in seconds,
+            "events": number of events per status,
+            "oldest_waiting_seconds": age of the oldest unprocessed event,
+        }
+    """
+    with _metrics_lock:
+        counters = dict(_metrics)
+
+    lag_total = counters.pop("lag_seconds_total")
+    counters["lag_seconds_avg"] = round(lag_total / counters["processed"], 3) if counters["processed"] else 0.0
+
+    events = dict(
+        db.session.execute(db.select(WebhookEvent.status, func.count()).group_by(WebhookEvent.status)).all()
+    )
+
+    return {
+        "counters": counters,
+        "events": events,
+        "oldest_waiting_seconds": get_oldest_waiting_seconds(),
+    }
+
+
+def get_oldest_waiting_seconds() -> float:
+    """Returns the age of the oldest event not applied yet (0 if none)."""
+    oldest_waiting = db.session.execute(
+        db.select(func.min(WebhookEvent.received_at))
+        .where(WebhookEvent.status.in_([WebhookEvent.PENDING, WebhookEvent.PROCESSING, WebhookEvent.FAILED]))
+    ).scalar()
+
+    return (DateTimeUtils.aware_utcnow() - _as_aware(oldest_waiting)).total_seconds() if oldest_waiting else 0.0
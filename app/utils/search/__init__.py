@@ -0,0 +1,25 @@
+"""
+Product search.
+
+Two interchangeable backends rank products by relevance and match word
+prefixes:
+
+    - ``PostgresSearchBackend``: a GIN-indexed tsvector over the product name,
+      slug and description, with a pg_trgm similarity fallback for typos and
+      partial words.
+    - ``InMemorySearchBackend``: a pure-Python inverted index, used on SQLite
+      (development and tests), kept up to date incrementally as products are
+      committed and rebuilt when another worker commits product changes.
+
+``SEARCH_BACKEND`` picks one explicitly ("postgres" or "memory"); by default
+it follows the database dialect.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from .backends import get_search_backend, search_products, SearchBackend
+from .postgres import PostgresSearchBackend
+from .inverted_index import InvertedIndex, InMemorySearchBackend, tokenize
@@ -0,0 +1,144 @@
+"""
+Search backend selection and the session hooks that keep indexes current.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from __future__ import annotations
+
+from threading import Lock
+from typing import Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Query, Session
+
+from ...extensions import db
+from ...models.product import Product, SearchIndexVersion
+
+
+class SearchBackend:
+    """Base class of the product search backends."""
+    name = "base"
+
+    def apply(self, query: Query, search_term: str) -> Query:
+        """
+        Filters `query` to products matching `search_term`, most relevant first.
+        """
+        raise NotImplementedError
+
+    def apply_changes(self, documents: dict[int, dict[str, str]], removed: set[int], base_version: int, version: int) -> None:
+        """
+        Applies committed product changes to the index. No-op for
+        database-maintained indexes.
+
+        Args:
+            documents: Added or changed products, by id
+            removed: Ids of the deleted products
+            base_version: `SearchIndexVersion` the transaction started from
+            version: `SearchIndexVersion` the transaction committed
+        """
+
+
+_backends: dict[str, SearchBackend] = {}
+_backends_lock = Lock()
+
+
+def get_search_backend() -> SearchBackend:
+    """
+    Returns the product search backend for the current app.
+
+    Returns:
+        SearchBackend: Postgres full text search or the in-memory inverted index.
+    """
+    from .postgres import PostgresSearchBackend
+    from .inverted_index import InMemorySearchBackend
+
+    name = current_app.config.get("SEARCH_BACKEND") or "auto"
+    if name == "auto":
+        name = "postgres" if db.engine.dialect.name == "postgresql" else "memory"
+
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = PostgresSearchBackend() if name == "postgres" else InMemorySearchBackend()
+                _backends[name] = backend
+
+    return backend
+
+
+def search_products(query: Query, search_term: Optional[str]) -> Query:
+    """
+    Applies a relevance-ranked product search to a query.
+
+    Args:
+        query: Product query to filter
+        search_term: Words to look for (prefixes match too)
+
+    Returns:
+        Query: The filtered query, or the original query for an empty term.
+    """
+    search_term = (search_term or "").strip()
+    if not search_term:
+        return query
+
+    return get_search_backend().apply(query, search_term)
+
+
+def product_document(product: Product) -> dict[str, str]:
+    """Text fields of a product that are indexed, by weight class."""
+    return {
+        "A": f"{product.name or ''} {product.slug or ''}",
+        "B": product.description or "",
+    }
+
+
+# Product changes bump the search index version with the change, so every
+# worker's in-memory index notices them; this worker's index is updated in
+# place once the change is committed
+@event.listens_for(Session, "after_flush")
+def collect_product_changes(session: Session, flush_context):
+    documents = session.info.setdefault("search_documents", {})
+    removed = session.info.setdefault("search_removed", set())
+    changed = False
+
+    for instance in (*session.new, *session.dirty):
+        if isinstance(instance, Product) and instance.id is not None:
+            documents[instance.id] = product_document(instance)
+            removed.discard(instance.id)
+            changed = True
+
+    for instance in session.deleted:
+        if isinstance(instance, Product) and instance.id is not None:
+            documents.pop(instance.id, None)
+            removed.add(instance.id)
+            changed = True
+
+    if changed:
+        version = SearchIndexVersion.bump(session.connection())
+        session.info.setdefault("search_base_version", version - 1)
+        session.info["search_version"] = version
+
+
+@event.listens_for(Session, "after_commit")
+def apply_product_changes(session: Session):
+    documents = session.info.pop("search_documents", None)
+    removed = session.info.pop("search_removed", None)
+    base_version = session.info.pop("search_base_version", None)
+    version = session.info.pop("search_version", None)
+
+    if version is None or not has_app_context():
+        return
+
+    get_search_backend().apply_changes(documents or {}, removed or set(), base_version, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_product_changes(session: Session):
+    for key in ("search_documents", "search_removed", "search_base_version", "search_version"):
+        session.info.pop(key, None)
@@ -0,0 +1,186 @@
+"""
+Pure-Python inverted index search backend, for databases without full text
+search (SQLite in development and tests).
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from threading import RLock
+from typing import Optional
+
+from sqlalchemy import case
+from sqlalchemy.orm import Query
+
+from ...extensions import db
+from ...models.product import Product, SearchIndexVersion
+from .backends import SearchBackend
+
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Score of a match in each weight class of a document
+FIELD_WEIGHTS = {"A": 1.0, "B": 0.4}
+
+# A word that only starts with the searched prefix scores less than an exact match
+PREFIX_MATCH_FACTOR = 0.5
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Splits text into lowercase words, e.g. "Blue T-Shirt" -> ["blue", "t", "shirt"]."""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+class InvertedIndex:
+    """
+    Maps every word to the documents containing it, with a weight per
+    document. Prefix lookups use a sorted vocabulary and binary search.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, dict[int, float]] = {}
+        self.documents: dict[int, set[str]] = {}
+        self._vocabulary: list[str] = []
+        self._vocabulary_dirty = False
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id: int, fields: dict[str, str]) -> None:
+        """Indexes a document, replacing any previous version of it."""
+        self.remove(doc_id)
+
+        weights: dict[str, float] = {}
+        for weight_class, text in fields.items():
+            weight = FIELD_WEIGHTS.get(weight_class, FIELD_WEIGHTS["B"])
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0.0), weight)
+
+        for token, weight in weights.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                self._vocabulary_dirty = True
+            postings[doc_id] = weight
+
+        self.documents[doc_id] = set(weights)
+
+    def remove(self, doc_id: int) -> None:
+        for token in self.documents.pop(doc_id, ()):
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[token]
+                self._vocabulary_dirty = True
+
+    def _expand(self, prefix: str) -> list[str]:
+        """Returns every indexed word starting with `prefix`."""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+
+        words = []
+        index = bisect_left(self._vocabulary, prefix)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(prefix):
+            words.append(self._vocabulary[index])
+            index += 1
+        return words
+
+    def search(self, search_term: str, limit: Optional[int] = None) -> list[tuple[int, float]]:
+        """
+        Returns (doc_id, score) pairs of documents matching every word of the
+        term (as a word or a word prefix), best scores first.
+        """
+        scores: Optional[dict[int, float]] = None
+
+        for query_token in dict.fromkeys(tokenize(search_term)):
+            token_scores: dict[int, float] = {}
+            for word in self._expand(query_token):
+                factor = 1.0 if word == query_token else PREFIX_MATCH_FACTOR
+                for doc_id, weight in self.postings[word].items():
+                    token_scores[doc_id] = max(token_scores.get(doc_id, 0.0), weight * factor)
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: score + token_scores[doc_id] for doc_id, score in scores.items() if doc_id in token_scores}
+
+            if not scores:
+                return []
+
+        ranked = sorted((scores or {}).items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit] if limit else ranked
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Searches an inverted index held in the worker's memory.
+
+    The index is built from one query on first use and remembers the
+    `SearchIndexVersion` it was built at. Products committed by this worker
+    are applied to it in place; each search compares the version in the
+    database, so a change committed by another worker makes it rebuild.
+    """
+    name = "memory"
+
+    # Matches past this rank are still returned, after the ranked ones by id
+    # (descending), so the CASE expression sent to the database stays small
+    MAX_RANKED = 1000
+
+    def __init__(self):
+        self.index: Optional[InvertedIndex] = None
+        self.version: Optional[int] = None
+        self._lock = RLock()
+
+    def build(self) -> InvertedIndex:
+        from .backends import product_document
+
+        index = InvertedIndex()
+        rows = db.session.execute(db.select(Product.id, Product.name, Product.slug, Product.description))
+        for row in rows:
+            index.add(row.id, product_document(row))
+        return index
+
+    def get_index(self) -> InvertedIndex:
+        if "search_version" in db.session.info:
+            # The session holds uncommitted product changes: search them
+            # without keeping an index that a rollback would make wrong
+            return self.build()
+
+        with self._lock:
+            version = SearchIndexVersion.current()
+            if self.index is None or version != self.version:
+                self.index = self.build()
+                self.version = version
+            return self.index
+
+    def apply_changes(self, documents: dict[int, dict[str, str]], removed: set[int], base_version: int, version: int) -> None:
+        with self._lock:
+            if self.index is None or self.version != base_version:
+                # Another worker committed in between, rebuild on the next search
+                self.index = None
+                return
+
+            for doc_id, fields in documents.items():
+                self.index.add(doc_id, fields)
+            for doc_id in removed:
+                self.index.remove(doc_id)
+            self.version = version
+
+    def apply(self, query: Query, search_term: str) -> Query:
+        results = self.get_index().search(search_term)
+        if not results:
+            return query.filter(False)
+
+        # Inlined, as the ids of a broad term can exceed the bound parameter limit
+        doc_ids = db.bindparam("search_doc_ids", [doc_id for doc_id, _ in results], expanding=True, literal_execute=True)
+        ranks = {doc_id: position for position, (doc_id, _) in enumerate(results[:self.MAX_RANKED])}
+        return query.filter(Product.id.in_(doc_ids)).order_by(case(ranks, value=Product.id, else_=len(ranks)))
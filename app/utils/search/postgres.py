@@ -0,0 +1,59 @@
+"""
+PostgreSQL full text search backend.
+
+Author: Emmanuel Olowu
+Link: https://github.com/zeddyemy
+Copyright: © 2024 Emmanuel Olowu <zeddyemy@gmail.com>
+License: GNU, see LICENSE for more details.
+Package: StoreZed
+"""
+from __future__ import annotations
+
+from flask import current_app
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query
+
+from ...models.product import Product, product_search_document
+from .backends import SearchBackend
+from .inverted_index import tokenize
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Matches `product_search_document()` (backed by the `ix_product_search_tsv`
+    GIN index) against a prefix tsquery, ranked with `ts_rank`.
+
+    With `SEARCH_TRIGRAM_FALLBACK` enabled (the default, requires pg_trgm),
+    names similar to the whole term also match, through the
+    `ix_product_name_trgm` index, which catches typos and mid-word fragments
+    that a tsquery can't.
+    """
+    name = "postgres"
+
+    def build_tsquery(self, search_term: str):
+        tokens = tokenize(search_term)
+        if not tokens:
+            return None
+
+        # Every word must match, each one as a prefix: "blu shi" -> "blu:* & shi:*"
+        return func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+
+    def apply(self, query: Query, search_term: str) -> Query:
+        document = product_search_document()
+        tsquery = self.build_tsquery(search_term)
+        use_trigram = current_app.config.get("SEARCH_TRIGRAM_FALLBACK", True)
+
+        conditions, rank = [], None
+        if tsquery is not None:
+            conditions.append(document.op("@@")(tsquery))
+            rank = func.ts_rank(document, tsquery)
+
+        if use_trigram:
+            conditions.append(Product.name.op("%")(search_term))
+            similarity = func.similarity(Product.name, search_term)
+            rank = similarity if rank is None else rank + similarity
+
+        if not conditions:
+            return query.filter(False)
+
+        return query.filter(or_(*conditions)).order_by(rank.desc())
@@ -1,9 +1,9 @@
 import os
-import logging
 from flask import Flask
 from typing import Optional, List
 
 from app.utils.helpers.basics import parse_bool
+from app.utils.helpers.loggers import parse_levels, setup_logging
 from app.utils.date_time import timedelta
 
 class Config:
@@ -58,9 +58,87 @@ class Config:
     CLOUDINARY_API_KEY: Optional[str] = os.getenv("CLOUDINARY_API_KEY")
     CLOUDINARY_API_SECRET: Optional[str] = os.getenv("CLOUDINARY_API_SECRET")
     
+    # Media uploads are staged on local disk and stored by a thread pool (0
+    # stores them in the request). MEDIA_STORAGE is "cloudinary" or "local";
+    # local files go to MEDIA_LOCAL_ROOT (default: app/static/uploads)
+    MEDIA_STORAGE: str = os.getenv("MEDIA_STORAGE", "cloudinary")
+    MEDIA_WORKERS: int = int(os.getenv("MEDIA_WORKERS", 2))
+    MEDIA_STAGING_DIR: str = os.getenv("MEDIA_STAGING_DIR", os.path.join(os.getcwd(), "instance", "media_staging"))
+    MEDIA_LOCAL_ROOT: Optional[str] = os.getenv("MEDIA_LOCAL_ROOT")
+    MEDIA_LOCAL_URL: str = os.getenv("MEDIA_LOCAL_URL", "/static/uploads")
+    MEDIA_URL_CACHE_SIZE: int = int(os.getenv("MEDIA_URL_CACHE_SIZE", 4096))  # media URLs kept in memory per worker
+    MEDIA_URL_CACHE_TTL: int = int(os.getenv("MEDIA_URL_CACHE_TTL", 3600))
+    
+    # Cache configurations
+    # SimpleCache keeps entries per worker, FileSystemCache shares them between
+    # the workers of one host and RedisCache between every worker of every host.
+    CACHE_TYPE: str = os.getenv("CACHE_TYPE", "SimpleCache")
+    CACHE_DEFAULT_TIMEOUT: int = int(os.getenv("CACHE_DEFAULT_TIMEOUT", 300))
+    CACHE_THRESHOLD: int = int(os.getenv("CACHE_THRESHOLD", 1000))  # max entries for SimpleCache/FileSystemCache
+    CACHE_KEY_PREFIX: str = os.getenv("CACHE_KEY_PREFIX", "storezed:")
+    CACHE_DIR: Optional[str] = os.getenv("CACHE_DIR", os.path.join(os.getcwd(), "instance", "cache"))
+    CACHE_REDIS_URL: Optional[str] = os.getenv("CACHE_REDIS_URL")
+    PRINCIPAL_CACHE_TTL: int = int(os.getenv("PRINCIPAL_CACHE_TTL", 300))  # user id, roles and wallet id used by role checks
+    
+    # Product search: "auto" uses Postgres full text search on PostgreSQL and an in-memory index elsewhere
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "auto")
+    SEARCH_TRIGRAM_FALLBACK: bool = parse_bool(os.getenv("SEARCH_TRIGRAM_FALLBACK", "true"))  # needs pg_trgm
+    
+    # Order numbers reserved per round trip. Above 1, each worker (or Postgres
+    # connection) hands out numbers from its own block, so numbers stay unique
+    # but are no longer in creation order and unused ones are skipped on restart
+    ORDER_NUMBER_BLOCK_SIZE: int = int(os.getenv("ORDER_NUMBER_BLOCK_SIZE", 1))
+    
+    # Payment webhooks are acknowledged at once and applied by a thread pool
+    # (0 applies them in the request); failures are retried with backoff
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", 4))
+    WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 8))
+    WEBHOOK_RETRY_BASE_SECONDS: int = int(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", 30))
+    WEBHOOK_LEASE_SECONDS: int = int(os.getenv("WEBHOOK_LEASE_SECONDS", 300))  # reclaim events of dead workers after this
+    
+    # Sweeper settling gateway payments left pending (`flask payments reconcile`)
+    RECONCILE_MIN_AGE_MINUTES: int = int(os.getenv("RECONCILE_MIN_AGE_MINUTES", 15))
+    RECONCILE_BATCH_SIZE: int = int(os.getenv("RECONCILE_BATCH_SIZE", 50))
+    RECONCILE_CONCURRENCY: int = int(os.getenv("RECONCILE_CONCURRENCY", 4))  # gateway calls in flight per provider
+    
+    # HTTP calls to payment gateways
+    GATEWAY_CONNECT_TIMEOUT: float = float(os.getenv("GATEWAY_CONNECT_TIMEOUT", 3.05))
+    GATEWAY_READ_TIMEOUT: float = float(os.getenv("GATEWAY_READ_TIMEOUT", 15))
+    GATEWAY_MAX_RETRIES: int = int(os.getenv("GATEWAY_MAX_RETRIES", 2))
+    GATEWAY_BACKOFF_FACTOR: float = float(os.getenv("GATEWAY_BACKOFF_FACTOR", 0.3))
+    GATEWAY_POOL_SIZE: int = int(os.getenv("GATEWAY_POOL_SIZE", 10))  # kept-alive connections per gateway and worker
+    GATEWAY_CIRCUIT_FAILURES: int = int(os.getenv("GATEWAY_CIRCUIT_FAILURES", 5))  # consecutive failures opening the circuit
+    GATEWAY_CIRCUIT_RESET_SECONDS: float = float(os.getenv("GATEWAY_CIRCUIT_RESET_SECONDS", 30))
+    
+    # Logging: levels per module (e.g. "app.core.web_front=WARNING,sqlalchemy.engine=INFO"),
+    # "text" or "json" output, and the share of DEBUG/INFO records kept for noisy loggers
+    LOG_LEVEL: Optional[str] = os.getenv("LOG_LEVEL")  # DEBUG in debug mode, INFO otherwise
+    LOG_LEVELS: dict = parse_levels(os.getenv("LOG_LEVELS"))
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_QUEUE: bool = parse_bool(os.getenv("LOG_QUEUE", "true"))  # write logs from a background thread
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # records dropped past this backlog
+    LOG_SAMPLE_RATES: dict = {name: float(rate) for name, rate in parse_levels(os.getenv("LOG_SAMPLE_RATES")).items()}
+    
+    # Per-request SQL/template/HTTP timings, and the `Server-Timing` response header showing them
+    INSTRUMENTATION_ENABLED: bool = parse_bool(os.getenv("INSTRUMENTATION_ENABLED", "true"))
+    SERVER_TIMING_HEADER: bool = parse_bool(os.getenv("SERVER_TIMING_HEADER", "true"))
+    
+    # Prometheus `/metrics` endpoint, only served with METRICS_TOKEN set; scrapers send "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = parse_bool(os.getenv("METRICS_ENABLED", "true"))
+    METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN")
+    
+    # Slow query log: statements over the threshold are kept (last N per worker) and, optionally, explained
+    SLOW_QUERY_LOG: bool = parse_bool(os.getenv("SLOW_QUERY_LOG", "true"))
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+    SLOW_QUERY_BUFFER_SIZE: int = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", 100))
+    SLOW_QUERY_EXPLAIN: bool = parse_bool(os.getenv("SLOW_QUERY_EXPLAIN", "false"))
+    SLOW_QUERY_EXPLAIN_SAMPLE: float = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", 1.0))  # share of slow queries explained
+    
     #  ExchangeRate-API
     EXCHANGE_RATE_API_KEY: Optional[str] = os.getenv("EXCHANGE_RATE_API_KEY")
     EXCHANGE_RATE_API_URL: str = f"https://v6.exchangerate-api.com/v6/{EXCHANGE_RATE_API_KEY}/latest"
+    EXCHANGE_RATE_TTL: int = int(os.getenv("EXCHANGE_RATE_TTL", 43200))  # rates older than 12 hours are refreshed in the background
+    EXCHANGE_RATE_MAX_STALE: int = int(os.getenv("EXCHANGE_RATE_MAX_STALE", 864000))  # past 10 days a request waits for fresh rates
 
 
 class DevelopmentConfig(Config):
@@ -75,6 +153,7 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SAMESITE: str = "Lax"  # Recommended for security
     SESSION_COOKIE_DOMAIN = os.getenv("SESSION_COOKIE_DOMAIN", None)
     SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "app_session")
+    SERVER_TIMING_HEADER: bool = parse_bool(os.getenv("SERVER_TIMING_HEADER", "false"))  # timings are not shown to visitors
 
 class TestingConfig(Config):
     TESTING: bool = True
@@ -90,16 +169,4 @@ config_by_name = {
 
 def configure_logging(app: Flask) -> None:
     """Replace Flask's default logging with a custom setup."""
-    
-    # Remove all handlers
-    app.logger.handlers.clear()
-    
-    if not app.logger.handlers:
-        formatter = logging.Formatter("[%(asctime)s] ==> %(levelname)s in %(module)s: %(message)s")
-        
-        # Stream handler
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(formatter)
-    
-        app.logger.addHandler(stream_handler)
-        app.logger.setLevel(logging.DEBUG if app.config["DEBUG"] else logging.INFO) # Set the desired logging level
\ No newline at end of file
+    setup_logging(app)
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings read at startup (the command line still sets bind,
+workers and worker class).
+
+With PROMETHEUS_MULTIPROC_DIR set, workers share their metrics through
+files in that directory: it is emptied when the server starts, and the
+files of a worker are dropped when it exits.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
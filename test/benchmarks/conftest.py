@@ -0,0 +1,203 @@
+"""
+Benchmarks of the storefront, admin and API hot paths.
+
+They seed a database of BENCHMARK_SIZE users, products, orders and payments
+and are skipped unless BENCHMARKS=1:
+
+    BENCHMARKS=1 python -m pytest test/benchmarks -q
+    BENCHMARKS=1 BENCHMARK_SIZE=100000 python -m pytest test/benchmarks -q
+    BENCHMARKS=1 BENCHMARK_DATABASE_URL=postgresql://localhost/storezed_bench python -m pytest test/benchmarks -q
+
+Each benchmark reports latency percentiles and the number of queries per
+call, and fails when it runs more queries than `baseline.json` (same
+database dialect and size). Latencies depend on the machine, so comparing
+them with the baseline is opt-in (BENCHMARK_CHECK_LATENCY=1), for a
+baseline recorded on the same host.
+
+Settings (environment):
+    BENCHMARK_SIZE: rows seeded per table (default 10000)
+    BENCHMARK_DATABASE_URL: database to use, EMPTIED FIRST (default: a
+        temporary SQLite file)
+    BENCHMARK_ROUNDS: measured calls per benchmark (default 30)
+    BENCHMARK_CHECK_LATENCY=1: also fail when p50 is slower than the baseline
+    BENCHMARK_TOLERANCE: allowed p50 slowdown over the baseline (default 0.5)
+    BENCHMARK_UPDATE_BASELINE=1: record the results as the new baseline
+"""
+import os
+import json
+import statistics
+from time import perf_counter
+from typing import Callable, Optional
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import create_db_defaults
+from config import DevelopmentConfig, config_by_name
+
+from .seed import seed_dataset
+
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+ENABLED = os.getenv("BENCHMARKS") == "1"
+SIZE = int(os.getenv("BENCHMARK_SIZE", 10000))
+ROUNDS = int(os.getenv("BENCHMARK_ROUNDS", 30))
+TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", 0.5))
+UPDATE_BASELINE = os.getenv("BENCHMARK_UPDATE_BASELINE") == "1"
+CHECK_LATENCY = os.getenv("BENCHMARK_CHECK_LATENCY") == "1"
+
+# Slowdowns smaller than this (ms) are noise, whatever the tolerance
+NOISE_MS = 2.0
+
+_results: dict[str, dict] = {}
+
+
+def pytest_collection_modifyitems(config, items):
+    if ENABLED:
+        return
+    skip = pytest.mark.skip(reason="benchmarks run with BENCHMARKS=1")
+    for item in items:
+        if str(item.fspath).startswith(BENCHMARKS_DIR):
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section(f"benchmarks ({_dataset_key()})")
+    terminalreporter.write_line(f"{'benchmark':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'queries':>9}")
+    for name, result in _results.items():
+        terminalreporter.write_line(
+            f"{name:<28}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['mean_ms']:>10.2f}{result['queries']:>9}"
+        )
+
+    if UPDATE_BASELINE:
+        baseline = _load_baseline()
+        baseline[_dataset_key()] = {
+            name: {key: result[key] for key in ("p50_ms", "p95_ms", "queries")} for name, result in _results.items()
+        }
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write("\n")
+        terminalreporter.write_line(f"baseline written to {BASELINE_PATH}")
+
+
+_dialect: Optional[str] = None
+
+
+def _dataset_key() -> str:
+    return f"{_dialect}-{SIZE}"
+
+
+def _load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope="session")
+def bench_app(tmp_path_factory):
+    """App on a freshly seeded database, shared by every benchmark."""
+    global _dialect
+
+    database_url = os.getenv("BENCHMARK_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('benchmarks') / 'bench.db'}"
+    config_by_name["benchmark"] = type("BenchmarkConfig", (DevelopmentConfig,), {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SERVER_NAME": "localhost",  # the defaults build URLs outside requests
+        "DEFAULT_SUPER_ADMIN_USERNAME": "admin",
+        "DEFAULT_SUPER_ADMIN_PASSWORD": "admin",
+        "LOG_LEVEL": "WARNING",
+        "SLOW_QUERY_LOG": False,
+        "WEBHOOK_WORKERS": 0,
+    })
+    try:
+        app = create_app("benchmark", create_defaults=False)
+    finally:
+        config_by_name.pop("benchmark")
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        _dialect = db.engine.dialect.name
+    create_db_defaults(app)
+    with app.app_context():
+        seed_dataset(SIZE)
+
+    yield app
+
+    with app.app_context():
+        db.drop_all()
+
+
+class Benchmark:
+    """
+    Calls a function `rounds` times, each in a fresh app context (so with a
+    fresh session, as a request would), after two warm-up calls.
+
+    `setup`, if given, runs before each call, untimed, and its return value
+    is passed to the function.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.queries = 0
+        self._counting = False
+
+    def _count(self, *args) -> None:
+        if self._counting:
+            self.queries += 1
+
+    def _call(self, func: Callable, setup: Optional[Callable]) -> tuple[float, int]:
+        argument = ()
+        if setup is not None:
+            with self.app.app_context():
+                argument = (setup(),)
+
+        with self.app.app_context():
+            self.queries, self._counting = 0, True
+            started = perf_counter()
+            try:
+                func(*argument)
+            finally:
+                elapsed = (perf_counter() - started) * 1000
+                self._counting = False
+        return elapsed, self.queries
+
+    def __call__(self, name: str, func: Callable, setup: Optional[Callable] = None, rounds: int = ROUNDS) -> dict:
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", self._count)
+        try:
+            for _ in range(2):
+                self._call(func, setup)
+            durations, query_counts = zip(*(self._call(func, setup) for _ in range(rounds)))
+        finally:
+            event.remove(engine, "before_cursor_execute", self._count)
+
+        percentiles = statistics.quantiles(durations, n=100, method="inclusive")
+        result = _results[name] = {
+            "p50_ms": round(percentiles[49], 3),
+            "p95_ms": round(percentiles[94], 3),
+            "p99_ms": round(percentiles[98], 3),
+            "mean_ms": round(statistics.fmean(durations), 3),
+            "queries": int(statistics.median(query_counts)),
+        }
+
+        baseline = _load_baseline().get(_dataset_key(), {}).get(name)
+        if baseline and not UPDATE_BASELINE:
+            if result["queries"] > baseline["queries"]:
+                pytest.fail(f"{name}: {result['queries']} queries per call, baseline {baseline['queries']}")
+            allowed = max(baseline["p50_ms"] * (1 + TOLERANCE), baseline["p50_ms"] + NOISE_MS)
+            if CHECK_LATENCY and result["p50_ms"] > allowed:
+                pytest.fail(f"{name}: p50 {result['p50_ms']}ms, baseline {baseline['p50_ms']}ms (+{TOLERANCE:.0%} allowed)")
+        return result
+
+
+@pytest.fixture
+def benchmark(bench_app):
+    return Benchmark(bench_app)
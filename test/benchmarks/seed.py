@@ -0,0 +1,79 @@
+"""
+Seeds a benchmark database: `size` users, products, orders (two items each)
+and payments, inserted in batches with ORM bulk inserts.
+
+Bulk inserts skip the flush listeners, so the dashboard rollups are rebuilt
+afterwards and the search index is built on first use.
+"""
+import uuid
+from decimal import Decimal
+from datetime import timedelta
+
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.enums import PaymentStatus
+from app.models import AppUser, CustomerOrder, OrderItem, Payment, Product, Profile, Wallet
+from app.utils.date_time import DateTimeUtils
+from app.utils.helpers.stats import rebuild_stats
+
+
+BATCH_SIZE = 5000
+
+ADJECTIVES = ("red", "blue", "classic", "leather", "cotton", "vintage", "slim", "wireless", "organic", "premium")
+NOUNS = ("shirt", "shoe", "bag", "watch", "headphones", "jacket", "lamp", "mug", "wallet", "chair")
+
+
+def product_name(number: int) -> str:
+    return f"{ADJECTIVES[number % len(ADJECTIVES)].title()} {NOUNS[number // len(ADJECTIVES) % len(NOUNS)]} {number}"
+
+
+def _insert(model, rows) -> list[int]:
+    """Inserts rows in batches. Returns their ids, in order."""
+    ids = []
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    for start in range(0, len(rows), BATCH_SIZE):
+        ids.extend(db.session.scalars(statement, rows[start:start + BATCH_SIZE]).all())
+    return ids
+
+
+def seed_dataset(size: int) -> None:
+    now = DateTimeUtils.aware_utcnow()
+    user_ids = _insert(AppUser, [
+        {"username": f"bench{number}", "email": f"bench{number}@example.com", "date_joined": now - timedelta(minutes=number)}
+        for number in range(size)
+    ])
+    _insert(Profile, [{"user_id": user_id, "firstname": f"Bench {user_id}"} for user_id in user_ids])
+    _insert(Wallet, [{"user_id": user_id} for user_id in user_ids])
+
+    product_ids = _insert(Product, [
+        {
+            "uuid": str(uuid.uuid4()), "name": product_name(number), "slug": f"bench-product-{number}",
+            "description": f"{product_name(number)} for benchmarks", "selling_price": Decimal(10 + number % 90),
+            "pub_status": "published", "user_id": user_ids[number % size],
+        }
+        for number in range(size)
+    ])
+
+    order_ids = _insert(CustomerOrder, [
+        {
+            "order_number": f"BENCH-{number + 1:08d}", "user_id": user_ids[number],
+            "total_amount": Decimal("30.00"), "created_at": now - timedelta(minutes=number),
+        }
+        for number in range(size)
+    ])
+    _insert(OrderItem, [
+        {"order_id": order_ids[number // 2], "product_id": product_ids[(number * 7) % size], "quantity": 1 + number % 2, "unit_price": Decimal("10.00")}
+        for number in range(size * 2)
+    ])
+    _insert(Payment, [
+        {
+            "key": f"bench_pay_{number + 1}", "amount": Decimal("30.00"), "payment_method": "paystack",
+            "status": str(PaymentStatus.COMPLETED), "user_id": user_ids[number], "order_id": order_ids[number],
+            "created_at": now - timedelta(minutes=number),
+        }
+        for number in range(size)
+    ])
+
+    rebuild_stats()
+    db.session.commit()
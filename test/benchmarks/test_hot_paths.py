@@ -0,0 +1,106 @@
+from decimal import Decimal
+from itertools import count
+
+import pytest
+from flask_login import login_user
+
+from app.context_processors import app_context_Processor
+from app.extensions import db
+from app.enums import PaymentStatus, TransactionType
+from app.models import AppUser, Payment, Product, Transaction
+from app.utils.helpers.cart import add_to_cart
+from app.utils.helpers.customer_orders import fetch_customer_orders
+from app.utils.helpers.stats import get_stats_for_admin
+from app.utils.payments.webhooks import enqueue_webhook_event, process_webhook_event
+
+
+@pytest.fixture
+def customer_client(bench_app):
+    """Client signed in as a customer (the store pages show their wallet)."""
+    with bench_app.app_context():
+        user_id = AppUser.query.filter_by(username="bench1").first().id
+    client = bench_app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
+
+
+def test_store_listing(customer_client, benchmark):
+    def store():
+        assert customer_client.get("/store").status_code == 200
+
+    benchmark("store_listing", store)
+
+
+def test_store_search(customer_client, benchmark):
+    def search():
+        assert customer_client.get("/store?search=leather+watch").status_code == 200
+
+    benchmark("store_search", search)
+
+
+def test_fetch_customer_orders(bench_app, benchmark):
+    def orders_page():
+        with bench_app.test_request_context("/shop-admin/orders"):
+            orders = fetch_customer_orders(serialize=("items", "user")).items
+            assert [order.to_dict(include_user=True, include_items=True) for order in orders]
+
+    benchmark("fetch_customer_orders", orders_page)
+
+
+def test_admin_stats(bench_app, benchmark):
+    def stats():
+        with bench_app.test_request_context("/shop-admin/dashboard"):
+            assert get_stats_for_admin("month")["total_users"]
+
+    benchmark("get_stats_for_admin", stats)
+
+
+def test_app_context_processor(bench_app, benchmark):
+    def context():
+        with bench_app.test_request_context("/"):
+            assert "GENERAL_SETTINGS" in app_context_Processor()
+
+    benchmark("app_context_processor", context)
+
+
+def test_cart_add(bench_app, benchmark):
+    with bench_app.app_context():
+        user_id = AppUser.query.filter_by(username="bench1").first().id
+        product_ids = iter(db.session.scalars(db.select(Product.id).order_by(Product.id).limit(100)).all() * 10)
+
+    def add(product_id):
+        with bench_app.test_request_context("/cart"):
+            login_user(db.session.get(AppUser, user_id))
+            assert add_to_cart(product_id)
+
+    benchmark("cart_add", add, setup=lambda: next(product_ids))
+
+
+def test_webhook_processing(bench_app, benchmark):
+    references = count(1)
+
+    def store_event():
+        """Stores a pending wallet top-up and the webhook confirming it."""
+        reference = f"bench_webhook_{next(references)}"
+        user = AppUser.query.filter_by(username="bench2").first()
+        Payment.create_payment_record(reference, Decimal("50.00"), "paystack", PaymentStatus.PENDING, user, commit=False, meta_info={"payment_type": "wallet_top_up"})
+        Transaction.create_transaction(reference, Decimal("50.00"), TransactionType.CREDIT, "Top up", PaymentStatus.PENDING, user, commit=False)
+        db.session.commit()
+
+        payload = {"event": "charge.success", "data": {"id": reference, "reference": reference, "amount": 5000}}
+        return enqueue_webhook_event("paystack", payload, {
+            "event_type": "payment",
+            "status": PaymentStatus.COMPLETED,
+            "reference": reference,
+            "provider_reference": reference,
+            "amount": Decimal("50.00"),
+            "currency": "NGN",
+            "raw_data": payload,
+        })
+
+    def process(event_id):
+        assert process_webhook_event(event_id)
+
+    benchmark("webhook_processing", process, setup=store_event)
@@ -1,4 +1,7 @@
 import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+
 from app import create_app  # Replace with your app factory or app import
 from app.extensions import db
 from app.models import AppUser
@@ -30,4 +33,26 @@ def test_user(app):
         user = AppUser(username="testuser", email="test@example.com")
         db.session.add(user)
         db.session.commit()
-        return user
\ No newline at end of file
+        return user
+
+@pytest.fixture
+def count_queries(app):
+    """
+    Context manager recording the SQL statements run inside it:
+
+        with count_queries() as statements:
+            ...
+        assert len(statements) == 3
+    """
+    @contextmanager
+    def counter():
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        with app.app_context():
+            engine = app.extensions["sqlalchemy"].engine
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+    return counter
@@ -0,0 +1,87 @@
+import uuid
+import pytest
+
+from app.extensions import db
+from app.models import AppUser, Category, Media, Product
+from app.models.media import clear_media_url_cache, get_media_url, resolve_media_urls
+
+
+@pytest.fixture
+def products(app_context, test_user):
+    clear_media_url_cache()
+    user = AppUser.query.filter_by(username="testuser").first()
+    media = [Media(filename=f"shoe-{i}.jpg", media_path=f"https://cdn.example.com/shoe-{i}.jpg") for i in range(5)]
+    db.session.add_all(media)
+    db.session.flush()
+    db.session.add_all([
+        Product(uuid=str(uuid.uuid4()), name=f"Shoe {i}", slug=f"shoe-{i}", user_id=user.id, media_id=item.id)
+        for i, item in enumerate(media)
+    ])
+    db.session.add(Category(name="Shoes", slug="shoes", media_id=media[0].id))
+    db.session.commit()
+    paths = {item.id: item.media_path for item in media}
+    db.session.expunge_all()
+    yield paths
+    clear_media_url_cache()
+
+
+def test_media_of_a_page_is_loaded_in_one_query(products, count_queries):
+    with count_queries() as statements:
+        urls = [product.get_media() for product in Product.query.order_by(Product.id).all()]
+
+    assert urls == [f"https://cdn.example.com/shoe-{i}.jpg" for i in range(5)]
+    assert len(statements) == 2  # products, then their media
+    assert Category.query.first().get_thumbnail() == urls[0]
+
+
+def test_media_urls_are_resolved_in_batch_and_cached(products, count_queries):
+    ids = list(products)
+
+    with count_queries() as statements:
+        assert resolve_media_urls(ids + [None]) == products
+        assert get_media_url(ids[2]) == products[ids[2]]
+    assert len(statements) == 1
+
+    # Changes made through the session evict the cached URL
+    db.session.get(Media, ids[2]).media_path = "https://cdn.example.com/new.jpg"
+    db.session.commit()
+    assert get_media_url(ids[2]) == "https://cdn.example.com/new.jpg"
+
+
+def test_pending_media_are_not_cached(app_context):
+    clear_media_url_cache()
+    media = Media(filename="upload.png", status=Media.PENDING)
+    db.session.add(media)
+    db.session.commit()
+    assert get_media_url(media.id) is None
+
+    Media.query.filter_by(id=media.id).update({"status": Media.READY, "media_path": "/static/uploads/upload.png"})
+    db.session.commit()
+    assert get_media_url(media.id) == "/static/uploads/upload.png"
+
+
+def test_admin_category_list_resolves_thumbnails_from_the_tree(app, products, count_queries):
+    user_id = AppUser.query.filter_by(username="testuser").first().id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+
+    with count_queries() as statements:
+        response = client.get("/shop-admin/categories")
+
+    assert response.status_code == 200
+    assert "https://cdn.example.com/shoe-0.jpg" in response.get_data(as_text=True)
+    assert len([statement for statement in statements if "FROM media" in statement]) == 1
+
+
+def test_url_cache_is_sized_from_the_app_config(app, products):
+    from app.models import media as media_module
+
+    app.config.update(MEDIA_URL_CACHE_SIZE=2, MEDIA_URL_CACHE_TTL=60)
+    clear_media_url_cache()
+    resolve_media_urls(list(products))
+
+    assert media_module._media_urls.maxsize == 2
+    assert media_module._media_urls.ttl == 60
+    assert len(media_module._media_urls) == 2
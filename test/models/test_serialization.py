@@ -0,0 +1,118 @@
+import uuid
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.extensions import db
+from app.enums import PaymentStatus
+from app.enums.auth import RoleNames
+from app.models import (
+    Address, AppUser, Cart, CartItem, CustomerOrder, OrderItem, Payment, Product, Profile, Role, Transaction, UserRole, Wallet
+)
+from app.utils.helpers.customer_orders import fetch_customer_orders
+from app.utils.payments.rates import fetch_exchange_rates, rate_service
+
+
+@pytest.fixture
+def shop(app, app_context):
+    role = Role(name=RoleNames.CUSTOMER, slug="customer")
+    db.session.add(role)
+    db.session.commit()
+    role_id = role.id
+
+    def add_customers(count: int):
+        """Adds customers, each with an order of two items, a payment and a cart."""
+        start = AppUser.query.count()
+        for number in range(start, start + count):
+            user = AppUser(
+                username=f"customer{number}", email=f"customer{number}@example.com",
+                profile=Profile(firstname=f"Customer {number}"), address=Address(country="Nigeria"), wallet=Wallet(),
+            )
+            product = Product(uuid=str(uuid.uuid4()), name=f"Product {number}", slug=f"product-{number}", app_user=user)
+            order = CustomerOrder(app_user=user, total_amount=Decimal("30.00"), items=[
+                OrderItem(product=product, quantity=1, unit_price=Decimal("10.00")),
+                OrderItem(product=product, quantity=2, unit_price=Decimal("10.00")),
+            ])
+            db.session.add_all([user, product, order, Cart(app_user=user, items=[CartItem(product=product, price=Decimal("10.00"))])])
+            db.session.flush()
+            db.session.add(UserRole(app_user_id=user.id, role_id=role_id))
+            Payment.create_payment_record(f"pay_{number}", Decimal("30.00"), "paystack", PaymentStatus.COMPLETED, user, commit=False, customer_order=order)
+        db.session.commit()
+        db.session.expunge_all()
+
+    return add_customers
+
+
+def queries_for(count_queries, serialize) -> int:
+    with count_queries() as statements:
+        serialize()
+    db.session.expunge_all()
+    return len(statements)
+
+
+@pytest.mark.parametrize("listing", ["orders", "users", "payments"])
+def test_listing_query_count_does_not_grow_with_rows(app, shop, count_queries, listing):
+    def serialize():
+        with app.test_request_context("/"):
+            if listing == "orders":
+                orders = fetch_customer_orders(serialize=("items", "user"), keyset=False).items
+                assert len({order.to_dict(include_user=True, include_items=True)["order_number"] for order in orders}) == len(orders)
+            elif listing == "users":
+                assert all(user["roles"] == ["Customer"] for user in [user.to_dict() for user in AppUser.query_for().all()])
+            else:
+                payments = Payment.query.order_by(Payment.id).all()
+                assert len(Payment.to_dict_many(payments, user=True)) == len(payments)
+
+    shop(2)
+    rate_service.clear()
+    with patch("app.utils.payments.rates._request_rates", return_value={"NGN": 1}):
+        fetch_exchange_rates()  # rates are looked up once per process, not per listing
+    few = queries_for(count_queries, serialize)
+    shop(6)
+    assert queries_for(count_queries, serialize) == few
+
+
+def test_cart_api_query_count(app, shop, client, count_queries):
+    shop(1)
+    cart = Cart.query.first()
+    cart_id = cart.id
+    for number in range(5):
+        # A product per item, so the product and variant queries have to batch
+        product = Product(uuid=str(uuid.uuid4()), name=f"Cart product {number}", slug=f"cart-product-{number}", user_id=cart.user_id)
+        db.session.add(CartItem(cart_id=cart_id, product=product, price=Decimal(number + 1)))
+    db.session.commit()
+
+    with count_queries() as statements:
+        response = client.get(f"/api/cart?cart_id={cart_id}")
+
+    assert response.status_code == 200
+    assert len(response.get_json()["data"]["cart_items"]) == 6
+    assert len(statements) <= 4  # count, page of items, products, variants
+
+
+@pytest.mark.parametrize("listing", ["payments", "transactions"])
+def test_payment_history_api_query_count(app, shop, count_queries, listing):
+    from app.core.api.controllers.payments import PaymentController
+    from app.enums import TransactionType
+
+    shop(1)
+    user = AppUser.query.first()
+    for number in range(5):
+        Payment.create_payment_record(f"top_up_{number}", Decimal("5.00"), "paystack", PaymentStatus.COMPLETED, user, commit=False)
+        Transaction.create_transaction(f"top_up_{number}", Decimal("5.00"), TransactionType.CREDIT, "Top up", PaymentStatus.COMPLETED, user, commit=False)
+    db.session.commit()
+    user_id = user.id
+    db.session.expunge_all()
+
+    rate_service.clear()
+    with patch("app.utils.payments.rates._request_rates", return_value={"NGN": 1}):
+        fetch_exchange_rates()
+
+    view = PaymentController.get_payments if listing == "payments" else PaymentController.get_transactions
+    with app.test_request_context(f"/api/{listing}"), patch("app.core.api.controllers.payments.get_current_user", side_effect=lambda: db.session.get(AppUser, user_id)):
+        with count_queries() as statements:
+            response = view()
+
+    assert response.status_code == 200, response.get_json()
+    assert len(response.get_json()["data"][listing]) == (6 if listing == "payments" else 5)
+    assert len(statements) <= 5  # user, count, page, users, wallets
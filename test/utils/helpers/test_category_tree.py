@@ -0,0 +1,124 @@
+import pytest
+
+from app.extensions import db
+from app.models import AppUser, Category, CategoryClosure, Product
+from app.utils.helpers.category_tree import get_category_tree
+from app.utils.helpers.products import fetch_all_products
+
+
+@pytest.fixture
+def categories(app_context):
+    clothing = Category(name="Clothing", slug="clothing")
+    db.session.add(clothing)
+    db.session.flush()
+    
+    men = Category(name="Men", slug="men", parent_id=clothing.id)
+    db.session.add(men)
+    db.session.flush()
+    
+    shirts = Category(name="Shirts", slug="shirts", parent_id=men.id)
+    shoes = Category(name="Shoes", slug="shoes")
+    db.session.add_all([shirts, shoes])
+    db.session.commit()
+    
+    return clothing, men, shirts, shoes
+
+
+def closure_pairs():
+    return {(row.ancestor_id, row.descendant_id, row.depth) for row in CategoryClosure.query.all()}
+
+
+def test_closure_table_follows_category_changes(categories):
+    clothing, men, shirts, shoes = categories
+    
+    assert (clothing.id, shirts.id, 2) in closure_pairs()
+    assert (shirts.id, shirts.id, 0) in closure_pairs()
+    
+    # Moving a branch moves all its descendants
+    men.parent_id = shoes.id
+    db.session.commit()
+    
+    assert (clothing.id, shirts.id, 2) not in closure_pairs()
+    assert (shoes.id, shirts.id, 2) in closure_pairs()
+
+
+def test_closure_table_is_updated_incrementally(categories, count_queries):
+    clothing, men, shirts, shoes = categories
+    before = closure_pairs()
+    
+    # Edits that do not move a category leave the closure table alone
+    with count_queries() as statements:
+        shirts.name = "Tops"
+        db.session.commit()
+    assert not [statement for statement in statements if "category_closure" in statement]
+    
+    # A new branch is linked to its ancestors in one flush
+    boots = Category(name="Boots", slug="boots", parent=shoes)
+    hiking = Category(name="Hiking", slug="hiking", parent=boots)
+    db.session.add_all([hiking, boots])
+    db.session.commit()
+    assert {(shoes.id, hiking.id, 2), (boots.id, hiking.id, 1), (hiking.id, hiking.id, 0)} <= closure_pairs()
+    
+    # Deleting a category turns its children into roots
+    db.session.delete(boots)
+    db.session.commit()
+    assert {row for row in closure_pairs() if hiking.id in row[:2]} == {(hiking.id, hiking.id, 0)}
+    assert closure_pairs() - {(hiking.id, hiking.id, 0)} == before
+
+
+def test_tree_is_loaded_in_memory(categories):
+    clothing, men, shirts, shoes = categories
+    tree = get_category_tree()
+    
+    assert [node.id for node in tree.roots] == [clothing.id, shoes.id]
+    assert tree.descendant_ids(clothing.id) == [clothing.id, men.id, shirts.id]
+    assert [node.id for node in tree.ancestors(shirts.id)] == [men.id, clothing.id]
+    assert clothing.to_dict(include_children=True)["children"][0]["id"] == men.id
+
+
+def test_tree_cache_is_invalidated_on_commit(categories):
+    clothing, men, shirts, shoes = categories
+    assert len(get_category_tree()) == 4
+    
+    db.session.add(Category(name="Women", slug="women", parent_id=clothing.id))
+    db.session.commit()
+    
+    assert len(get_category_tree()) == 5
+
+
+def test_products_of_descendant_categories_are_included(app, test_user, categories):
+    clothing, men, shirts, shoes = categories
+    user = AppUser.query.filter_by(username="testuser").first()
+    shirt = Product(uuid="shirt", name="Shirt", slug="shirt", user_id=user.id, categories=[shirts])
+    boot = Product(uuid="boot", name="Boot", slug="boot", user_id=user.id, categories=[shoes])
+    db.session.add_all([shirt, boot])
+    db.session.commit()
+    
+    with app.test_request_context():
+        assert [p.id for p in fetch_all_products(cat_id=clothing.id, paginate=False)] == [shirt.id]
+        assert fetch_all_products(cat_id=clothing.id, include_subcategories=False, paginate=False) == []
+
+
+def test_category_field_fragments_are_cached_until_categories_change(categories):
+    from sqlalchemy import event
+    from app.utils.forms.web_admin.products import generate_category_field
+    clothing, men, shirts, shoes = categories
+    
+    html = generate_category_field(format='checkbox', sel_cats=[shirts])
+    assert f'value="{shirts.id}" checked' in html
+    
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        assert generate_category_field(format='checkbox', sel_cats=[shirts.id]) == html
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert statements == []
+    
+    db.session.add(Category(name="Hats", slug="hats"))
+    db.session.commit()
+    
+    assert "Hats" in generate_category_field(format='select')
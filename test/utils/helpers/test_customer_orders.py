@@ -2,8 +2,11 @@ import pytest
 from decimal import Decimal
 from unittest.mock import patch
 
+from sqlalchemy import event
+
 from app.extensions import db
-from app.models import CustomerOrder
+from app.models import AppUser, CustomerOrder, OrderItem, Product
+from app.utils.helpers.customer_orders import create_customer_order
 from app.utils.helpers.loggers import console_log
 
 def test_order_number_generation(test_user, app_context):
@@ -20,4 +23,77 @@ def test_order_number_generation(test_user, app_context):
     db.session.add(order2)
     db.session.commit()
     console_log("Info", f"Second Generated Order Number is: {order2.order_number}")
-    assert order2.order_number == 'ORD-0002'
\ No newline at end of file
+    assert order2.order_number == 'ORD-0002'
+
+def test_order_numbers_are_unique_within_one_flush(test_user, app_context):
+    orders = [CustomerOrder(app_user=test_user, total_amount=10) for _ in range(3)]
+    db.session.add_all(orders)
+    db.session.commit()
+    
+    assert [order.order_number for order in orders] == ['ORD-0001', 'ORD-0002', 'ORD-0003']
+
+
+def test_order_number_counter_takes_over_from_existing_orders(test_user, app_context):
+    # An order numbered before the counter existed
+    legacy_order = CustomerOrder(app_user=test_user, total_amount=10, order_number='ORD-0041')
+    db.session.add(legacy_order)
+    db.session.commit()
+    
+    order = CustomerOrder(app_user=test_user, total_amount=10)
+    db.session.add(order)
+    db.session.commit()
+    assert order.order_number == 'ORD-0042'
+    
+    # A rolled back order gives its number back
+    db.session.add(CustomerOrder(app_user=test_user, total_amount=10))
+    db.session.flush()
+    db.session.rollback()
+    
+    order = CustomerOrder(app_user=test_user, total_amount=10)
+    db.session.add(order)
+    db.session.commit()
+    assert order.order_number == 'ORD-0043'
+
+
+@pytest.fixture
+def products(test_user, app_context):
+    user = AppUser.query.filter_by(username="testuser").first()
+    products = [Product(name=f"Product {i}", slug=f"product-{i}", uuid=f"product-{i}", user_id=user.id) for i in range(3)]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+def test_order_total_follows_item_changes(test_user, products, app_context):
+    order = CustomerOrder(app_user=test_user, total_amount=0)
+    order.items = [
+        OrderItem(product_id=products[0].id, quantity=2, unit_price=Decimal("10.00")),
+        OrderItem(product_id=products[1].id, quantity=1, unit_price=Decimal("5.50")),
+    ]
+    db.session.add(order)
+    db.session.commit()
+    assert order.total_amount == Decimal("25.50")
+    
+    order.items[0].quantity = 3
+    db.session.delete(order.items[1])
+    db.session.commit()
+    assert order.total_amount == Decimal("30.00")
+
+
+def test_create_customer_order_inserts_items_in_one_statement(test_user, products, app_context):
+    statements = []
+    def count_item_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO order_item"):
+            statements.append(executemany)
+    
+    items = [{"product_id": product.id, "quantity": 2, "unit_price": "4.25"} for product in products]
+    
+    event.listen(db.engine, "before_cursor_execute", count_item_inserts)
+    try:
+        order = create_customer_order(products[0].user_id, items)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_item_inserts)
+    
+    assert len(statements) == 1
+    assert order.total_amount == Decimal("25.50")
+    assert len(order.items) == 3
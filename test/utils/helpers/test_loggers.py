@@ -0,0 +1,77 @@
+import json
+import logging
+import pytest
+
+from app.utils.helpers.loggers import JSONFormatter, SamplingFilter, console_log, parse_levels, setup_logging
+
+
+class Costly:
+    """Counts how often it is turned into a string."""
+    def __init__(self):
+        self.calls = 0
+
+    def __repr__(self):
+        self.calls += 1
+        return "<Costly>"
+
+    __str__ = __repr__
+
+
+def test_disabled_levels_do_not_build_messages(app, caplog):
+    data = Costly()
+    logging.getLogger(__name__).setLevel(logging.INFO)
+    try:
+        with caplog.at_level(logging.INFO, logger=__name__):
+            console_log("skipped", data, level="DEBUG")
+            console_log("skipped", "%s and %s", data, data, level="DEBUG")
+            assert data.calls == 0
+
+            console_log("kept", "value: %s", data)
+    finally:
+        logging.getLogger(__name__).setLevel(logging.NOTSET)
+
+    record, = [record for record in caplog.records if record.name == __name__]
+    assert record.label == "kept"
+    assert record.getMessage() == "value: <Costly>"
+
+
+@pytest.fixture
+def logging_config(app):
+    """Puts the logging setup of the app back once the test changed it."""
+    config = {key: app.config.get(key) for key in ("LOG_FORMAT", "LOG_QUEUE", "LOG_LEVELS")}
+    loggers = [logging.getLogger(name) for name in ("app.noisy", "app.quiet")]
+    states = [(logger.level, list(logger.handlers), logger.propagate) for logger in loggers]
+    yield app.config
+    app.config.update(config)
+    setup_logging(app)  # restores the app logger's level and handlers, and restarts its queue listener
+    for logger, (level, handlers, propagate) in zip(loggers, states):
+        logger.setLevel(level)
+        logger.handlers[:] = handlers
+        logger.propagate = propagate
+
+
+def test_per_module_levels_and_json_output(app, logging_config):
+    logging_config.update(LOG_FORMAT="json", LOG_QUEUE=False, LOG_LEVELS=parse_levels("app.noisy=warning, app.quiet = ERROR"))
+    setup_logging(app)
+
+    assert logging.getLogger("app.noisy.routes").getEffectiveLevel() == logging.WARNING
+    assert not logging.getLogger("app.quiet").isEnabledFor(logging.WARNING)
+    assert isinstance(app.logger.handlers[0].formatter, JSONFormatter)
+
+    record = logging.LogRecord("app.noisy", logging.WARNING, __file__, 1, "%s", ({"id": 1},), None)
+    record.label = "Webhook payload"
+    entry = json.loads(app.logger.handlers[0].format(record))
+    assert entry["level"] == "WARNING"
+    assert entry["label"] == "Webhook payload"
+    assert entry["message"] == "{'id': 1}"
+
+
+def test_sampling_keeps_warnings():
+    sampling = SamplingFilter({"app.webhooks": 0.25, "app": 1})
+
+    def kept(name, level=logging.INFO):
+        return sum(sampling.filter(logging.LogRecord(name, level, __file__, 1, "event", None, None)) for _ in range(100))
+
+    assert kept("app.webhooks.paystack") == 25
+    assert kept("app.webhooks", logging.WARNING) == 100
+    assert kept("app.routes") == 100
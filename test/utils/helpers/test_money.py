@@ -1,7 +1,8 @@
 import pytest
 from decimal import Decimal
 from unittest.mock import patch
-from app.utils.helpers.money import format_monetary_value
+from flask import current_app
+from app.utils.helpers.money import CurrencyFormatter, format_monetary_value, get_currency_formatter
 
 # Helper to mock currency settings
 def mock_currency_settings(currency, decimal_places, position, thousand_sep, decimal_sep):
@@ -37,4 +38,19 @@ def test_format_monetary_value_currency_right(mock_get_settings, app_context):
     mock_get_settings.return_value = mock_currency_settings("USD", 2, "right", ",", ".")
     amount = Decimal('1234.56')
     formatted = format_monetary_value(amount)
-    assert formatted == "1,234.56$"  # Adjust based on your function's logic
\ No newline at end of file
+    assert formatted == "1,234.56$"  # Adjust based on your function's logic
+
+def test_currency_formatter_separators_and_decimals():
+    formatter = CurrencyFormatter("EUR", "0", "right_space", ".", ",")
+    assert formatter.format(Decimal("1234567.5")) == "1.234.568 €"
+    
+    formatter = CurrencyFormatter("NGN", "2", "left_space", " ", ",")
+    assert formatter.format_many([Decimal("1234.5"), None, "-0.5"]) == ["₦ 1 234,50", "₦ 0,00", "₦ -0,50"]
+
+
+@patch('app.utils.helpers.money.get_currency_settings')
+def test_money_filter(mock_get_settings, app_context):
+    mock_get_settings.return_value = mock_currency_settings("USD", 2, "left", ",", ".")
+    
+    assert current_app.jinja_env.from_string("{{ amount|money }}").render(amount=Decimal("1234.5")) == "$1,234.50"
+    assert get_currency_formatter() is get_currency_formatter()
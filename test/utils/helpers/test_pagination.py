@@ -0,0 +1,68 @@
+import pytest
+from datetime import timedelta
+
+from app.extensions import db
+from app.models import AppUser, CustomerOrder, Tag
+from app.utils.date_time import DateTimeUtils
+from app.utils.helpers.customer_orders import fetch_customer_orders
+from app.utils.helpers.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_paginate
+
+
+@pytest.fixture
+def orders(test_user, app_context):
+    user = AppUser.query.filter_by(username="testuser").first()
+    now = DateTimeUtils.aware_utcnow()
+    
+    # Two orders share a timestamp, so the id has to break the tie
+    created = [now - timedelta(minutes=minutes) for minutes in (5, 4, 3, 3, 2, 1, 0)]
+    orders = [CustomerOrder(app_user=user, total_amount=10, created_at=created_at) for created_at in created]
+    db.session.add_all(orders)
+    db.session.commit()
+    
+    return orders
+
+
+def test_cursor_round_trip():
+    now = DateTimeUtils.aware_utcnow()
+    
+    assert decode_cursor(encode_cursor([now, 7])) == [now, 7]
+    
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_pages_walk_forward_and_back(orders):
+    expected = [order.id for order in sorted(orders, key=lambda order: (order.created_at, order.id), reverse=True)]
+    
+    seen, after, pages = [], None, []
+    while True:
+        query = CustomerOrder.query.filter(CustomerOrder.is_deleted == False)
+        page = keyset_paginate(query, (CustomerOrder.created_at, CustomerOrder.id), after=after, per_page=3)
+        pages.append(page)
+        seen.extend(order.id for order in page.items)
+        if not page.has_next:
+            break
+        after = page.next_cursor
+    
+    assert seen == expected
+    assert [len(page.items) for page in pages] == [3, 3, 1]
+    assert not pages[0].has_prev and pages[1].has_prev
+    
+    # Going back from the last page returns the middle page again, in display order
+    query = CustomerOrder.query.filter(CustomerOrder.is_deleted == False)
+    previous = keyset_paginate(query, (CustomerOrder.created_at, CustomerOrder.id), before=pages[2].prev_cursor, per_page=3)
+    assert [order.id for order in previous.items] == [order.id for order in pages[1].items]
+    assert previous.has_prev and previous.has_next
+
+
+def test_fetch_helpers_switch_to_keyset_on_cursor_args(app, orders):
+    with app.test_request_context("/?cursor=1"):
+        page = fetch_customer_orders(with_total=True)
+        assert page.is_keyset
+        assert page.total == len(orders)
+        assert len(page.items) == 7
+        assert page.next_cursor is None
+    
+    with app.test_request_context("/?after=garbage"):
+        with pytest.raises(InvalidCursorError):
+            fetch_customer_orders()
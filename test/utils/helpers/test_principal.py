@@ -0,0 +1,73 @@
+import pytest
+
+from app.extensions import db
+from app.enums.auth import RoleNames
+from app.models import AppUser, Role, UserRole, Wallet
+from app.utils.cache import principal_cache
+from app.utils.helpers.user import get_principal
+
+
+@pytest.fixture
+def customer(app_context):
+    principal_cache.invalidate()
+    db.session.add_all([Role(name=RoleNames.CUSTOMER, slug="customer"), Role(name=RoleNames.ADMIN, slug="admin")])
+    user = AppUser(username="customer", email="customer@example.com", wallet=Wallet())
+    db.session.add(user)
+    db.session.commit()
+    UserRole.assign_role(user, Role.query.filter_by(slug="customer").first())
+    yield user
+    principal_cache.invalidate()
+
+
+def test_principal_is_loaded_once_and_cached(app, customer, count_queries):
+    with app.app_context(), count_queries() as statements:
+        principal = get_principal(customer.id)
+        assert get_principal(str(customer.id)) is principal
+    assert len(statements) == 2  # version, then the principal
+
+    assert principal.roles == frozenset({"customer"})
+    assert principal.wallet_id == customer.wallet.id
+    assert principal.has_role("Admin", "Customer ") and not principal.has_role("Admin")
+
+    # Another request is served from the cache, once its version is checked
+    with app.app_context(), count_queries() as statements:
+        assert get_principal(customer.id) == principal
+    assert len(statements) == 1
+
+    assert get_principal(None) is None
+
+
+def test_role_changes_invalidate_the_principal(app, customer):
+    admin_role = Role.query.filter_by(slug="admin").first()
+    assert not get_principal(customer.id).has_role("admin")
+
+    UserRole.assign_role(customer, admin_role)
+    assert get_principal(customer.id).roles == frozenset({"customer", "admin"})
+
+    UserRole.revoke_role(customer, admin_role, customer)
+    with app.app_context():
+        assert get_principal(customer.id).roles == frozenset({"customer"})
+
+
+def test_revoked_role_is_seen_by_workers_with_their_own_cache(app, customer, monkeypatch):
+    from flask_caching import Cache
+    from app.utils.cache import namespace
+
+    admin_role = Role.query.filter_by(slug="admin").first()
+    UserRole.assign_role(customer, admin_role)
+
+    this_worker = namespace.app_cache
+    other_worker = Cache(app, config={"CACHE_TYPE": "SimpleCache"})
+
+    # The other worker caches the principal while the user is an admin
+    monkeypatch.setattr(namespace, "app_cache", other_worker)
+    with app.app_context():
+        assert get_principal(customer.id).has_role("admin")
+
+    # The role is revoked through this worker, which only clears its own cache
+    monkeypatch.setattr(namespace, "app_cache", this_worker)
+    UserRole.revoke_role(customer, admin_role, customer)
+
+    monkeypatch.setattr(namespace, "app_cache", other_worker)
+    with app.app_context():
+        assert get_principal(customer.id).roles == frozenset({"customer"})
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import event
+
+from app.extensions import db
+from app.enums.payments import PaymentMethods
+from app.enums.settings import GeneralSettingsKeys, PaymentMethodSettingKeys
+from app.utils.helpers.settings import (
+    get_settings_snapshot, get_general_setting, get_currency_settings,
+    save_general_setting, save_payment_method_setting, get_payment_method_setting
+)
+
+
+def count_queries(func):
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_snapshot_is_reused_within_app_context(app):
+    save_general_setting(GeneralSettingsKeys.CURRENCY, "USD")
+    
+    with app.app_context():
+        get_settings_snapshot()
+        
+        statements = count_queries(lambda: (
+            get_general_setting(GeneralSettingsKeys.CURRENCY),
+            get_currency_settings(),
+            get_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PROVIDER),
+        ))
+    
+    assert statements == []
+
+
+def test_snapshot_is_shared_across_app_contexts_until_version_changes(app):
+    save_general_setting(GeneralSettingsKeys.CURRENCY, "USD")
+    
+    with app.app_context():
+        first = get_settings_snapshot()
+    
+    with app.app_context():
+        # Only the version counter is checked, the snapshot itself is reused
+        statements = count_queries(get_settings_snapshot)
+        assert get_settings_snapshot() is first
+    
+    assert len(statements) == 1
+
+
+def test_saving_settings_invalidates_snapshot(app):
+    save_general_setting(GeneralSettingsKeys.CURRENCY, "USD")
+    save_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PROVIDER, "paystack")
+    
+    with app.app_context():
+        assert get_general_setting(GeneralSettingsKeys.CURRENCY) == "USD"
+        version = get_settings_snapshot().version
+    
+    save_general_setting(GeneralSettingsKeys.CURRENCY, "NGN")
+    
+    with app.app_context():
+        assert get_general_setting(GeneralSettingsKeys.CURRENCY) == "NGN"
+        assert get_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PROVIDER) == "paystack"
+        assert get_settings_snapshot().version > version
+
+
+def test_version_bump_upserts_the_counter_row(app):
+    from app.models import SettingsVersion
+    
+    with app.app_context():
+        SettingsVersion.bump()
+        db.session.commit()
+        assert SettingsVersion.current() == 1
+        
+        # A row created elsewhere (e.g. by a concurrent first save) is incremented, not re-inserted
+        db.session.execute(db.update(SettingsVersion).values(version=5))
+        SettingsVersion.bump()
+        db.session.commit()
+        assert SettingsVersion.current() == 6
+        assert db.session.query(SettingsVersion).count() == 1
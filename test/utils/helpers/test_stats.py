@@ -0,0 +1,91 @@
+import pytest
+from decimal import Decimal
+
+from app.extensions import db
+from app.enums import PaymentStatus
+from app.models import AppUser, DailyStat, Payment, StatCounter, StatDelta, Wallet
+from app.utils.helpers.stats import fold_stat_deltas, get_stat_series, get_stats_for_admin, rebuild_stats
+from app.utils.payments.wallet import credit_wallet
+
+
+def rollups():
+    daily = {(row.metric, row.dimension): (row.count, row.amount) for row in DailyStat.query.all() if row.count or row.amount}
+    counters = {row.name: (row.count, row.amount) for row in StatCounter.query.all() if row.count or row.amount}
+    return daily, counters
+
+
+@pytest.fixture
+def payments(app_context):
+    user = AppUser(username="buyer", email="buyer@example.com", wallet=Wallet(balance=10))
+    db.session.add(user)
+    for key, method in (("pay_1", "paystack"), ("pay_2", "paystack"), ("pay_3", "wallet")):
+        Payment.create_payment_record(key, Decimal("25.00"), method, PaymentStatus.PENDING, user, commit=False)
+    db.session.commit()
+    return user
+
+
+def test_rollups_follow_writes(payments):
+    payment = Payment.query.filter_by(key="pay_1").first()
+    payment.status = str(PaymentStatus.COMPLETED)
+    Payment.query.filter_by(key="pay_3").first().status = str(PaymentStatus.COMPLETED)
+    db.session.commit()
+    credit_wallet(payments.id, 5)
+
+    stats = get_stats_for_admin("day")
+    assert stats["total_users"] == AppUser.query.count()
+    assert stats["new_users"] == 1
+    assert stats["total_payments"] == Decimal("25.00")  # wallet payments excluded
+    assert stats["payments_by_status"]["pending"] == {"count": 1, "amount": Decimal("25.00")}
+    assert stats["total_wallet_balance"] == Decimal("15.00")
+
+    # Incremental rollups match a rebuild from the source tables
+    assert fold_stat_deltas(batch_size=2) > 0
+    assert StatDelta.query.count() == 0
+    assert get_stats_for_admin("day")["total_wallet_balance"] == Decimal("15.00")
+    incremental = rollups()
+    rebuild_stats()
+    db.session.commit()
+    assert rollups() == incremental
+
+
+def test_stat_series(payments):
+    series = get_stat_series("payments", days=7, dimension="pending")
+
+    assert len(series) == 7
+    assert series[-1]["count"] == 3
+    assert series[-1]["amount"] == Decimal("75.00")
+    assert [day["count"] for day in series[:-1]] == [0] * 6
+
+    with pytest.raises(ValueError):
+        get_stat_series("refunds")
+
+
+def test_writes_only_append_deltas(payments, count_queries):
+    with count_queries() as statements:
+        Payment.query.filter_by(key="pay_2").first().status = str(PaymentStatus.COMPLETED)
+        db.session.commit()
+        credit_wallet(payments.id, 5)
+
+    # The shared rollup rows are only written by the fold
+    assert not [statement for statement in statements if "daily_stat" in statement or "stat_counter" in statement]
+    assert StatDelta.query.count() > 0
+
+
+def test_rebuild_keeps_deltas_written_while_it_runs(payments, monkeypatch):
+    from app.utils.helpers import stats
+
+    compute_rows = stats._rollup_rows
+
+    def rollup_rows_during_a_write():
+        rows = compute_rows()
+        credit_wallet(payments.id, 5, commit=False)
+        return rows
+
+    monkeypatch.setattr(stats, "_rollup_rows", rollup_rows_during_a_write)
+    rebuild_stats()
+    db.session.commit()
+
+    # Only the delta of the write the rebuild did not see is left to fold
+    assert [(delta.metric, delta.amount) for delta in StatDelta.query.all()] == [("wallet_balance", Decimal("5.00"))]
+    fold_stat_deltas()
+    assert StatCounter.query.filter_by(name="wallet_balance").first().amount == Decimal("15.00")
@@ -9,7 +9,7 @@ def flutterwave_processor():
     return FlutterwaveProcessor(secret_key="test_secret")
 
 # Test successful payment initialization
-@patch("requests.post")  # Mock the API call
+@patch("app.utils.payments.http.GatewayClient.post")  # Mock the API call
 def test_initialize_payment_success(mock_post, flutterwave_processor, app_context):
     # Simulate a successful API response
     mock_response = {
@@ -37,7 +37,7 @@ def test_initialize_payment_success(mock_post, flutterwave_processor, app_contex
     assert response["authorization_url"] == "https://flutterwave.com/pay/12345"
 
 # Test failed payment initialization
-@patch("requests.post")
+@patch("app.utils.payments.http.GatewayClient.post")
 def test_initialize_payment_failure(mock_post, flutterwave_processor, app_context):
     # Simulate an error response
     mock_post.return_value.json.return_value = {
@@ -0,0 +1,92 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app.utils.payments.exceptions import CircuitOpenError
+from app.utils.payments.http import GatewayClient
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        server = self.server
+        server.calls.append((self.path, self.client_address[1]))
+        
+        if self.path == "/flaky" and server.failures_left > 0:
+            server.failures_left -= 1
+            return self.reply(503, {"status": False})
+        if self.path == "/down":
+            return self.reply(502, {"status": False})
+        self.reply(200, {"status": True})
+    
+    def reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def stub_gateway():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGatewayHandler)
+    server.calls, server.failures_left = [], 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_reuses_connections_and_retries(stub_gateway):
+    server, base_url = stub_gateway
+    client = GatewayClient("stub", max_retries=2, backoff_factor=0)
+    
+    assert client.get(f"{base_url}/ok").json() == {"status": True}
+    assert client.get(f"{base_url}/ok").status_code == 200
+    
+    # Both calls went over the same kept-alive connection
+    assert server.calls[0][1] == server.calls[1][1]
+    
+    # Transient 5xx answers are retried
+    server.failures_left = 2
+    assert client.get(f"{base_url}/flaky").status_code == 200
+    assert len([path for path, _ in server.calls if path == "/flaky"]) == 3
+
+
+def test_circuit_opens_after_repeated_failures(stub_gateway):
+    server, base_url = stub_gateway
+    client = GatewayClient("stub", max_retries=0, failure_threshold=2, reset_timeout=60)
+    
+    assert client.get(f"{base_url}/down").status_code == 502
+    assert client.get(f"{base_url}/down").status_code == 502
+    
+    calls = len(server.calls)
+    with pytest.raises(CircuitOpenError):
+        client.get(f"{base_url}/ok")
+    assert len(server.calls) == calls  # failed fast, the gateway was not called
+    
+    # After the reset timeout a trial call closes the circuit again
+    client.breaker.reset_timeout = 0
+    assert client.get(f"{base_url}/ok").status_code == 200
+    assert client.breaker.state == client.breaker.CLOSED
+
+
+def test_unreachable_gateway_counts_as_failure():
+    client = GatewayClient("stub", max_retries=0, connect_timeout=0.5, failure_threshold=1)
+    
+    with pytest.raises(requests.ConnectionError):
+        client.get("http://127.0.0.1:9/")  # discard port, nothing listens
+    
+    with pytest.raises(CircuitOpenError):
+        client.get("http://127.0.0.1:9/")
@@ -0,0 +1,46 @@
+import time
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.extensions import db
+from app.models import ExchangeRateSnapshot
+from app.utils.payments.rates import convert_amount, convert_many, rate_service, rates_cache
+
+
+@pytest.fixture
+def rates(app_context):
+    rate_service.clear()
+    rates_cache.invalidate()
+    yield
+    rate_service.clear()
+    rates_cache.invalidate()
+
+
+def test_cold_worker_converts_with_saved_rates(rates):
+    db.session.add(ExchangeRateSnapshot(base_currency="NGN", rates={"USD": 0.0025, "NGN": 1}))
+    db.session.commit()
+
+    # Saved rates are fresh: the API is not called
+    with patch("app.utils.payments.rates._request_rates") as request_rates:
+        assert convert_many([1000, "2000.50", None], "USD", format=False) == [Decimal("2.50"), Decimal("5.00"), Decimal("0.00")]
+        assert convert_amount(1_000_000, "USD") == "2,500.00"
+        assert convert_amount(100, "XYZ", format=False) == Decimal("100")  # no rate: left as is
+        request_rates.assert_not_called()
+
+
+def test_stale_rates_are_served_while_refreshing(rates):
+    with patch("app.utils.payments.rates._request_rates", return_value={"USD": 0.002}):
+        assert convert_amount(1000, "USD", format=False) == Decimal("2.00")
+
+    # Age the table past its TTL: the old rate is served, new one fetched in the background
+    fetched_at = time.time() - rate_service.ttl - 1
+    rate_service._tables["NGN"] = rate_service.get_table("NGN")._replace(fetched_at=fetched_at)
+    rates_cache.set("NGN", {"rates": {"USD": 0.002}, "fetched_at": fetched_at})
+    with patch("app.utils.payments.rates._request_rates", return_value={"USD": 0.003}) as request_rates:
+        assert convert_amount(1000, "USD", format=False) == Decimal("2.00")
+        rate_service._executor.submit(lambda: None).result(timeout=5)  # wait for the refresh
+        request_rates.assert_called_once_with("NGN")
+
+    assert convert_amount(1000, "USD", format=False) == Decimal("3.00")
+    assert db.session.get(ExchangeRateSnapshot, "NGN").rates == {"USD": 0.003}
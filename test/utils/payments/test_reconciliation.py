@@ -0,0 +1,62 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.extensions import db
+from app.enums import PaymentMethods, PaymentMethodSettingKeys, PaymentStatus, TransactionType
+from app.models import AppUser, Payment, Transaction, Wallet
+from app.utils.date_time import DateTimeUtils
+from app.utils.helpers.settings import save_payment_method_setting
+from app.utils.payments.registry import reset_payment_registry
+from app.utils.payments.reconciliation import reconcile_pending_payments
+
+
+@pytest.fixture
+def pending_payments(app_context):
+    reset_payment_registry()
+    save_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PROVIDER, "paystack")
+    save_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PAYSTACK_SECRET_KEY, "sk_test")
+
+    user = AppUser(username="payer", email="payer@example.com", wallet=Wallet(balance=0))
+    db.session.add(user)
+    an_hour_ago = DateTimeUtils.aware_utcnow() - timedelta(hours=1)
+    for key in ("pst_paid", "pst_waiting", "pst_recent"):
+        payment = Payment.create_payment_record(key, Decimal("50.00"), "paystack", PaymentStatus.PENDING, user, commit=False, meta_info={"payment_type": "wallet_top_up"})
+        if key != "pst_recent":
+            payment.created_at = an_hour_ago
+        Transaction.create_transaction(key, Decimal("50.00"), TransactionType.CREDIT, "Top up", PaymentStatus.PENDING, user, commit=False)
+    db.session.commit()
+
+    yield user
+    reset_payment_registry()
+
+
+def verify_payment(self, reference):
+    status = PaymentStatus.COMPLETED if reference == "pst_paid" else PaymentStatus.PENDING
+    return {"status": status, "amount": Decimal("50.00"), "currency": "NGN", "provider_reference": reference, "meta_info": {}}
+
+
+@pytest.mark.parametrize("concurrency", [0, 2])
+def test_reconcile_settles_final_payments_only(pending_payments, concurrency):
+    with patch("app.utils.payments.processor.paystack.PaystackProcessor.verify_payment", verify_payment):
+        stats = reconcile_pending_payments(min_age_minutes=15, batch_size=1, concurrency=concurrency)
+
+    # The recent payment is not old enough to be checked
+    assert stats["checked"] == 2
+    assert stats["settled"] == 1
+    assert stats["still_pending"] == 1
+    assert stats["errors"] == 0
+
+    statuses = dict(db.session.execute(db.select(Payment.key, Payment.status)).all())
+    assert statuses == {"pst_paid": "completed", "pst_waiting": "pending", "pst_recent": "pending"}
+    assert AppUser.query.filter_by(username="payer").first().wallet.balance == Decimal("50.00")
+
+
+def test_reconcile_leaves_payments_pending_when_gateway_fails(pending_payments):
+    with patch("app.utils.payments.processor.paystack.PaystackProcessor.verify_payment", side_effect=ConnectionError("down")):
+        stats = reconcile_pending_payments(min_age_minutes=15, concurrency=0)
+
+    assert stats["errors"] == 2
+    assert stats["settled"] == 0
+    assert Payment.query.filter_by(status="pending").count() == 3
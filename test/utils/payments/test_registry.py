@@ -0,0 +1,33 @@
+import pytest
+
+from app.enums import PaymentMethods, PaymentMethodSettingKeys
+from app.utils.helpers.settings import save_payment_method_setting
+from app.utils.payments.payment_manager import PaymentManager
+from app.utils.payments.processor.paystack import PaystackProcessor
+from app.utils.payments.registry import get_payment_processor, reset_payment_registry
+
+
+@pytest.fixture
+def paystack(app_context):
+    reset_payment_registry()
+    save_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PROVIDER, "paystack")
+    save_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PAYSTACK_SECRET_KEY, "sk_live")
+    yield
+    reset_payment_registry()
+
+
+def test_processor_is_shared_until_settings_change(paystack):
+    processor = get_payment_processor()
+
+    assert isinstance(processor, PaystackProcessor)
+    assert processor.secret_key == "sk_live"
+    assert PaymentManager().get_payment_processor() is processor
+    assert PaymentManager().payment_gateway["provider"] == "paystack"
+
+    # Each payment gets its own reference from the shared processor
+    assert processor.new_reference() != processor.new_reference()
+
+    save_payment_method_setting(PaymentMethods.GATEWAY, PaymentMethodSettingKeys.PAYSTACK_SECRET_KEY, "sk_rotated")
+
+    assert get_payment_processor() is not processor
+    assert get_payment_processor().secret_key == "sk_rotated"
@@ -0,0 +1,62 @@
+import pytest
+from decimal import Decimal
+
+from app.extensions import db
+from app.models import AppUser, Wallet, WalletEntry
+from app.utils.payments.wallet import credit_wallet, credit_wallets, debit_wallet, refund_to_wallet
+
+
+@pytest.fixture
+def users(app_context):
+    users = [AppUser(username=f"user{i}", email=f"user{i}@example.com") for i in range(3)]
+    for user in users:
+        user.wallet = Wallet(balance=0)
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def test_wallet_postings_keep_ledger_and_balance_in_step(users):
+    user = users[0]
+    
+    assert credit_wallet(user.id, 100) == Decimal("100.00")
+    assert debit_wallet(user.id, 30) == Decimal("70.00")
+    assert refund_to_wallet(user.id, 10) == Decimal("79.85")
+    assert user.wallet.balance == Decimal("79.85")
+    
+    # A debit above the balance fails without touching anything
+    with pytest.raises(ValueError, match="Insufficient balance"):
+        debit_wallet(user.id, 1000)
+    
+    entries = user.wallet.entries.order_by(WalletEntry.id).all()
+    assert [entry.amount for entry in entries] == [Decimal("100.00"), Decimal("-30.00"), Decimal("9.85")]
+    assert entries[-1].balance_after == user.wallet.balance
+    
+    with pytest.raises(ValueError, match="User not found"):
+        credit_wallet(9999, 10)
+
+
+def test_idempotency_key_applies_a_posting_once(users):
+    user = users[0]
+    
+    credit_wallet(user.id, 50, idempotency_key="payment:abc")
+    assert credit_wallet(user.id, 50, idempotency_key="payment:abc") == Decimal("50.00")
+    
+    assert user.wallet.balance == Decimal("50.00")
+    assert user.wallet.entries.count() == 1
+
+
+def test_credit_wallets_posts_a_batch(users):
+    first, second, third = users
+    credit_wallet(first.id, 5, idempotency_key="already-done")
+    
+    balances = credit_wallets([
+        (first.id, 10),
+        (second.id, 20, "topup:2"),
+        (first.id, 1),
+        (third.id, 7, "already-done"),  # replay, skipped
+    ])
+    
+    assert balances == {first.id: Decimal("16.00"), second.id: Decimal("20.00")}
+    assert [entry.balance_after for entry in first.wallet.entries.order_by(WalletEntry.id)] == [Decimal("5.00"), Decimal("15.00"), Decimal("16.00")]
+    assert third.wallet.balance == Decimal("0.00")
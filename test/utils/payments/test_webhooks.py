@@ -0,0 +1,66 @@
+import pytest
+from decimal import Decimal
+
+from app.extensions import db
+from app.enums import PaymentStatus, TransactionType
+from app.models import AppUser, Payment, Transaction, Wallet, WebhookEvent
+from app.utils.payments.webhooks import enqueue_webhook_event, get_webhook_metrics, process_webhook_event
+
+
+@pytest.fixture
+def payment(app_context):
+    user = AppUser(username="payer", email="payer@example.com", wallet=Wallet(balance=0))
+    db.session.add(user)
+    payment = Payment.create_payment_record("ref_123", Decimal("50.00"), "paystack", PaymentStatus.PENDING, user, commit=False, meta_info={"payment_type": "wallet_top_up"})
+    Transaction.create_transaction("ref_123", Decimal("50.00"), TransactionType.CREDIT, "Top up", PaymentStatus.PENDING, user, commit=False)
+    db.session.commit()
+    return payment
+
+
+def webhook(reference="ref_123"):
+    payload = {"event": "charge.success", "data": {"id": 987, "reference": reference, "amount": 5000}}
+    webhook_data = {
+        "event_type": "payment",
+        "status": PaymentStatus.COMPLETED,
+        "reference": reference,
+        "provider_reference": "987",
+        "amount": Decimal("50.00"),
+        "currency": "NGN",
+        "raw_data": payload,
+    }
+    return payload, webhook_data
+
+
+def test_webhook_event_is_stored_and_applied_once(payment):
+    event_id = enqueue_webhook_event("paystack", *webhook())
+    
+    # The provider retrying the same event is acknowledged but not stored again
+    assert enqueue_webhook_event("paystack", *webhook()) is None
+    
+    assert process_webhook_event(event_id) is True
+    assert process_webhook_event(event_id) is False
+    
+    event = db.session.get(WebhookEvent, event_id)
+    assert event.status == WebhookEvent.PROCESSED
+    assert event.attempts == 1
+    assert payment.status == str(PaymentStatus.COMPLETED)
+    assert payment.app_user.wallet.balance == Decimal("50.00")
+    
+    metrics = get_webhook_metrics()
+    assert metrics["events"] == {WebhookEvent.PROCESSED: 1}
+    assert metrics["oldest_waiting_seconds"] == 0.0
+
+
+def test_failed_webhook_event_is_scheduled_for_retry(payment):
+    event_id = enqueue_webhook_event("paystack", *webhook(reference="unknown"))
+    
+    assert process_webhook_event(event_id) is False
+    
+    event = db.session.get(WebhookEvent, event_id)
+    assert event.status == WebhookEvent.FAILED
+    assert event.attempts == 1
+    assert "Payment not found" in event.last_error
+    
+    # Not claimable again before its backoff has passed
+    assert process_webhook_event(event_id) is False
+    assert db.session.get(WebhookEvent, event_id).attempts == 1
@@ -0,0 +1,58 @@
+import pytest
+
+from app.utils.cache import CacheNamespace, invalidate_tags, get_cache_stats, reset_cache_stats
+
+
+def test_memoize_counts_hits_and_misses(app_context):
+    reset_cache_stats()
+    namespace = CacheNamespace("test_memoize", ttl=60)
+    calls = []
+    
+    @namespace.memoize
+    def load(value):
+        calls.append(value)
+        return None  # `None` results are cached as well
+    
+    load(1)
+    load(1)
+    load(2)
+    
+    assert calls == [1, 2]
+    assert get_cache_stats()["test_memoize"]["hits"] == 1
+    assert get_cache_stats()["test_memoize"]["misses"] == 2
+
+
+def test_tag_invalidation_spans_namespaces(app_context):
+    products = CacheNamespace("test_products", tags=("catalog",))
+    categories = CacheNamespace("test_categories", tags=("catalog",))
+    settings = CacheNamespace("test_settings")
+    
+    products.set("list", [1, 2])
+    categories.set("tree", {"id": 1})
+    settings.set("currency", "NGN")
+    
+    invalidate_tags("catalog")
+    
+    assert products.get("list") is None
+    assert categories.get("tree") is None
+    assert settings.get("currency") == "NGN"
+
+
+def test_cache_clear_only_drops_own_namespace(app_context):
+    first = CacheNamespace("test_first")
+    second = CacheNamespace("test_second")
+    
+    calls = []
+    
+    @first.memoize
+    def load():
+        calls.append(1)
+        return "value"
+    
+    load()
+    second.set("key", "other")
+    load.cache_clear()
+    load()
+    
+    assert len(calls) == 2
+    assert second.get("key") == "other"
@@ -0,0 +1,98 @@
+from flask import render_template_string
+
+from app.extensions import db
+from app.models import AppUser
+from app.utils.instrumentation import Histogram, clear_slow_queries, get_slow_queries, request_histograms, timed
+from app.utils.instrumentation.prometheus import init_metrics
+from app.utils.instrumentation.slow_queries import init_slow_query_log
+
+
+def test_request_timings(app, client, count_queries):
+    request_histograms.clear()
+
+    @app.route("/timed-page")
+    def timed_page():
+        with timed("http"):
+            AppUser.query.count()
+        db.session.execute(db.text("SELECT 1"))
+        return render_template_string("{% for i in range(3) %}{{ i }}{% endfor %}")
+
+    with count_queries() as statements:
+        response = client.get("/timed-page")
+
+    assert response.status_code == 200
+    timings = dict(item.split(";", 1) for item in response.headers["Server-Timing"].split(", "))
+    assert timings["sql"].endswith(f'desc="{len(statements)} queries"')  # context processors query too
+    assert timings["http"].endswith('desc="1 calls"')
+    assert set(timings) == {"sql", "tpl", "http", "total"}
+
+    metrics = request_histograms.to_dict()["timed_page"]
+    assert metrics["total_ms"]["count"] == 1
+    assert metrics["sql_queries"]["sum"] == len(statements)
+    assert metrics["http_ms"]["count"] == 1
+
+
+def test_server_timing_header_can_be_disabled(app, client):
+    app.config["SERVER_TIMING_HEADER"] = False
+    assert "Server-Timing" not in client.get("/api/info").headers
+
+
+def test_histogram_percentiles():
+    histogram = Histogram((10, 100))
+    for value in [1] * 90 + [50] * 9 + [500]:
+        histogram.observe(value)
+
+    assert histogram.percentile(0.5) == 10
+    assert histogram.percentile(0.95) == 100
+    assert histogram.percentile(1) == 500
+    assert histogram.to_dict()["buckets"] == {"10": 90, "100": 9, "+Inf": 1}
+
+
+def test_prometheus_metrics(app, client):
+    # Not served without a token
+    assert "metrics" not in app.view_functions
+
+    app.config["METRICS_TOKEN"] = "scraper-token"
+    init_metrics(app)
+    client.get("/api/info")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scraper-token"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'storezed_http_requests_total{blueprint="api",endpoint="api.site_info",method="GET",status="200"}' in body
+    assert "storezed_http_request_duration_seconds_bucket" in body
+    assert "storezed_webhook_oldest_waiting_seconds 0.0" in body
+
+
+def test_slow_query_log(app, client):
+    app.config.update(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN=True)
+    init_slow_query_log(app)
+    clear_slow_queries()
+    try:
+        client.get("/api/info")
+        recorded = get_slow_queries()
+    finally:
+        app.config.update(SLOW_QUERY_THRESHOLD_MS=200, SLOW_QUERY_EXPLAIN=False)
+        init_slow_query_log(app)
+        clear_slow_queries()
+
+    assert recorded
+    assert {query["route"] for query in recorded} == {"GET /api/info"}
+    select = next(query for query in recorded if query["statement"].startswith("SELECT"))
+    assert select["call_site"].startswith("app/")
+    assert select["plan"]  # EXPLAIN QUERY PLAN on SQLite
+
+
+def test_explain_uses_its_own_unpooled_engine(app_context):
+    from sqlalchemy.pool import NullPool
+    from app.utils.instrumentation.slow_queries import _explain_engine
+
+    engine = _explain_engine(db.engine)
+    assert engine is not db.engine
+    assert isinstance(engine.pool, NullPool)
+    assert engine.url == db.engine.url
+    assert _explain_engine(db.engine) is engine
@@ -0,0 +1,129 @@
+import io
+import os
+import pytest
+from datetime import timedelta
+from werkzeug.datastructures import FileStorage
+
+from app.extensions import db
+from app.models import Media
+from app.utils.helpers.media import save_media
+from app.utils.date_time import DateTimeUtils
+from app.utils.media import IMAGE_VARIANTS, process_pending_media, stage_media
+from app.utils.media.pipeline import claim_media
+
+
+def upload(content: bytes, filename: str = "logo.svg") -> FileStorage:
+    return FileStorage(stream=io.BytesIO(content), filename=filename)
+
+
+@pytest.fixture
+def local_media(app, app_context, tmp_path):
+    app.config.update(
+        MEDIA_STORAGE="local",
+        MEDIA_WORKERS=0,
+        MEDIA_STAGING_DIR=str(tmp_path / "staging"),
+        MEDIA_LOCAL_ROOT=str(tmp_path / "uploads"),
+        MEDIA_LOCAL_URL="/static/uploads",
+    )
+    return tmp_path
+
+
+def test_upload_is_stored_locally_and_deduplicated(local_media):
+    media = save_media(upload(b"<svg></svg>"))
+    media = db.session.get(Media, media.id)
+
+    assert media.status == Media.READY
+    assert media.storage == "local"
+    assert media.media_path.startswith("/static/uploads/") and media.media_path.endswith(".svg")
+    stored = local_media / "uploads" / media.media_path.removeprefix("/static/uploads/")
+    assert stored.read_bytes() == b"<svg></svg>"
+    assert os.listdir(local_media / "staging") == []  # staged file removed
+
+    # The same file again reuses the stored one
+    duplicate = db.session.get(Media, save_media(upload(b"<svg></svg>", "copy.svg")).id)
+    assert duplicate.is_ready
+    assert duplicate.media_path == media.media_path
+    assert duplicate.content_hash == media.content_hash
+    assert len(list((local_media / "uploads").rglob("*.svg"))) == 1
+
+
+def test_unsupported_upload_is_rejected(local_media):
+    with pytest.raises(ValueError):
+        save_media(upload(b"MZ", "setup.exe"))
+    assert Media.query.count() == 0
+
+
+def test_failed_upload_can_be_retried(local_media, app):
+    app.config["MEDIA_STORAGE"] = "nowhere"
+    media_id = save_media(upload(b"<svg/>")).id
+    media = db.session.get(Media, media_id)
+    assert media.status == Media.FAILED
+    assert "nowhere" in media.error
+    assert os.path.exists(media.staging_path)  # kept for a retry
+
+    app.config["MEDIA_STORAGE"] = "local"
+    assert process_pending_media(retry_failed=True) == 1
+    assert db.session.get(Media, media_id).is_ready
+
+
+def test_only_media_claimed_long_ago_are_reprocessed(local_media):
+    media = stage_media(upload(b"<svg/>"))
+    media.date_created = DateTimeUtils.aware_utcnow() - timedelta(hours=2)  # waited long in the queue
+    db.session.commit()
+    assert claim_media(media.id)
+
+    # Claimed just now: still held by its worker
+    assert process_pending_media() == 0
+    assert db.session.get(Media, media.id).status == Media.PROCESSING
+
+    Media.query.filter_by(id=media.id).update({"processing_started_at": DateTimeUtils.aware_utcnow() - timedelta(hours=1)})
+    db.session.commit()
+    assert process_pending_media() == 1
+    assert db.session.get(Media, media.id).is_ready
+
+
+def test_images_are_stripped_of_metadata_and_resized(local_media):
+    Image = pytest.importorskip("PIL.Image")
+
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"  # Make
+    exif[0x8825] = {1: "N", 2: (6.0, 27.0, 0.0)}  # GPSInfo
+    original = io.BytesIO()
+    Image.new("RGB", (1600, 800), "red").save(original, "JPEG", exif=exif)
+    assert Image.open(io.BytesIO(original.getvalue())).getexif()
+
+    media = db.session.get(Media, save_media(upload(original.getvalue(), "photo.jpg")).id)
+    assert media.is_ready
+
+    def stored(url: str):
+        return Image.open(local_media / "uploads" / url.removeprefix("/static/uploads/"))
+
+    with stored(media.media_path) as image:
+        assert image.size == (1600, 800)
+        assert not image.getexif()
+        assert "exif" not in image.info
+
+    assert set(media.variants) == set(IMAGE_VARIANTS)
+    for name, size in IMAGE_VARIANTS.items():
+        with stored(media.variants[name]) as variant:
+            assert variant.size == (size, size // 2)
+            assert not variant.getexif()
+
+
+def test_image_transparency_is_kept(local_media):
+    Image = pytest.importorskip("PIL.Image")
+
+    # Palette PNG whose transparency lives in image.info, not in an alpha band
+    original = io.BytesIO()
+    logo = Image.new("P", (1600, 800), 0)
+    logo.putpalette([255, 255, 255, 255, 0, 0] + [0] * 762)
+    logo.paste(1, (400, 200, 1200, 600))
+    logo.save(original, "PNG", transparency=0)
+
+    media = db.session.get(Media, save_media(upload(original.getvalue(), "logo.png")).id)
+    assert media.is_ready
+
+    for url in (media.media_path, *media.variants.values()):
+        with Image.open(local_media / "uploads" / url.removeprefix("/static/uploads/")) as image:
+            assert image.info.get("transparency") == 0
+            assert image.convert("RGBA").getpixel((0, 0))[3] == 0
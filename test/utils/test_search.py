@@ -0,0 +1,102 @@
+import pytest
+
+from app.extensions import db
+from app.models import AppUser, Product
+from app.utils.search import InvertedIndex, tokenize
+from app.utils.helpers.products import fetch_all_products
+
+
+def test_tokenize():
+    assert tokenize("Blue T-Shirt (XL)") == ["blue", "t", "shirt", "xl"]
+
+
+def test_inverted_index_ranks_and_matches_prefixes():
+    index = InvertedIndex()
+    index.add(1, {"A": "Blue shirt", "B": "Cotton"})
+    index.add(2, {"A": "Shirt dress", "B": "A blue summer dress"})
+    index.add(3, {"A": "Shoes", "B": ""})
+    
+    # Exact title matches rank above description and prefix matches
+    assert [doc_id for doc_id, _ in index.search("blue")] == [1, 2]
+    assert [doc_id for doc_id, _ in index.search("sh")] == [3, 2, 1]
+    # Every word has to match
+    assert [doc_id for doc_id, _ in index.search("blue dress")] == [2]
+    
+    index.remove(2)
+    assert index.search("dress") == []
+
+
+def search(app, term):
+    with app.test_request_context():
+        return [product.name for product in fetch_all_products(search_term=term, paginate=False)]
+
+
+def test_product_search_follows_commits(app, test_user):
+    user = AppUser.query.filter_by(username="testuser").first()
+    db.session.add_all([
+        Product(uuid="1", name="Blue Shirt", slug="blue-shirt", user_id=user.id),
+        Product(uuid="2", name="Red Shirt", slug="red-shirt", user_id=user.id, description="Not blue"),
+    ])
+    db.session.commit()
+    
+    assert search(app, "blu") == ["Blue Shirt", "Red Shirt"]
+    
+    # Updates and deletes are applied to the index incrementally on commit
+    red_shirt = Product.query.filter_by(slug="red-shirt").first()
+    red_shirt.update(name="Crimson Shirt", description="")
+    assert search(app, "blue") == ["Blue Shirt"]
+    assert search(app, "crim") == ["Crimson Shirt"]
+    
+    db.session.delete(red_shirt)
+    db.session.commit()
+    assert search(app, "shirt") == ["Blue Shirt"]
+
+
+def test_every_match_is_returned_and_searches_keep_their_ranking(app, test_user, monkeypatch):
+    from app.utils.search.inverted_index import InMemorySearchBackend
+    
+    monkeypatch.setattr(InMemorySearchBackend, "MAX_RANKED", 2)
+    user = AppUser.query.filter_by(username="testuser").first()
+    db.session.add_all([
+        Product(uuid="1", name="Blue Shirt", slug="blue-shirt", user_id=user.id),
+        Product(uuid="2", name="Shirt", slug="shirt", user_id=user.id, description="Blue cotton"),
+        Product(uuid="3", name="Blue Hat", slug="blue-hat", user_id=user.id),
+    ])
+    db.session.commit()
+    
+    # Matches past the ranking cap come after the ranked ones, newest first
+    assert search(app, "blue") == ["Blue Hat", "Blue Shirt", "Shirt"]
+    
+    # A cursor request falls back to offset pagination, which keeps the ranking
+    with app.test_request_context("/?cursor="):
+        page = fetch_all_products(search_term="blue", keyset=True)
+        assert [product.name for product in page.items] == ["Blue Hat", "Blue Shirt", "Shirt"]
+        assert page.total == 3
+
+
+def test_product_changes_reach_the_index_of_other_workers(app, test_user):
+    from app.utils.search.inverted_index import InMemorySearchBackend
+    
+    user = AppUser.query.filter_by(username="testuser").first()
+    db.session.add(Product(uuid="1", name="Blue Shirt", slug="blue-shirt", user_id=user.id))
+    db.session.commit()
+    
+    other_worker = InMemorySearchBackend()
+    assert [doc_id for doc_id, _ in other_worker.get_index().search("shirt")] == [1]
+    
+    # Committed here, so only this worker's index is updated in place
+    db.session.add(Product(uuid="2", name="Red Shirt", slug="red-shirt", user_id=user.id))
+    db.session.commit()
+    assert search(app, "shirt") == ["Red Shirt", "Blue Shirt"]
+    
+    # The other worker sees the version moved and rebuilds its index
+    with app.test_request_context():
+        assert [product.name for product in other_worker.apply(Product.query, "shirt")] == ["Red Shirt", "Blue Shirt"]
+    
+    # Its stale index is not updated in place from a later commit either
+    other_worker.version -= 1
+    db.session.delete(Product.query.filter_by(slug="blue-shirt").first())
+    db.session.commit()
+    assert other_worker.index is not None
+    with app.test_request_context():
+        assert [product.name for product in other_worker.apply(Product.query, "shirt")] == ["Red Shirt"]